@@ -1,107 +1,439 @@
 """Simple AI Agent for the Acme Dental Clinic."""
 
+import functools
 import logging
 import operator
 import os
-from pprint import pformat
+import time
+from collections.abc import Callable
 from string import Template
-from typing import Annotated, Literal
+from typing import TYPE_CHECKING, Annotated, Any, Literal, get_args
 
-from langchain.chat_models import init_chat_model
-from langchain.messages import AnyMessage, SystemMessage, ToolMessage
-from langchain.tools import BaseTool
+from langchain.messages import AIMessage, AnyMessage, SystemMessage, ToolMessage
 from langchain_core.language_models import BaseChatModel
+from langchain_core.messages.tool import ToolCall
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.types import Command, interrupt
 from typing_extensions import TypedDict
 
 from src.api.calendly import CalendlyClient
-from src.tools import (
-    build_cancelling_tools,
-    build_questions_tools,
-    build_rescheduling_tools,
-    build_reviewing_tools,
-    build_scheduling_tools,
+from src.background import INTERIM_MESSAGE, PENDING_RESULT, BackgroundTools
+from src.blobs import BlobStore
+from src.deadline import (
+    DEADLINE_MESSAGE,
+    DeadlineExceeded,
+    OutcomeUnknown,
+    call_within,
+    config_deadline,
+    deadline_scope,
+    expired,
 )
+from src.limits import UsageLimits, limit_reply, message_tokens, usage_update
+from src.llm_scheduler import LLMScheduler
+from src.metrics import REGISTRY, record_llm_usage, span
+from src.models import ModelRouter
+from src.responses import Responder
+from src.tenants import TenantRegistry, current_tenant, tenant_file
+from src.tracing import TRACER
+
+# Only passed in when enabled, their modules are imported by the caller
+if TYPE_CHECKING:
+    from src.event_mirror import EventMirror
+    from src.prefetch import CalendlyPrefetcher
+    from src.slot_calendar import SlotCalendar
 
 
 class IntentClassification(TypedDict):
+    """Classification of what the client wants right now"""
+
     intent: Literal["question", "schedule", "review", "reschedule", "cancel", "unclear", "leave"]
     topic: str
     summary: str
 
 
+INTENT_TOOL = IntentClassification.__name__
+
+
+class RouteClassification(IntentClassification):
+    """
+    Classification of what the client wants right now, and the reply when it needs no tool
+
+    Args:
+        answer: The full reply to the client when no tool is needed, empty when calling a tool
+    """
+
+    answer: str
+
+
+ROUTE_TOOL = RouteClassification.__name__
+
+DEADLINE_RESULT = "not run, the turn ran out of time"
+UNCONFIRMED_RESULT = "unconfirmed, the turn ran out of time before Calendly answered, check before trying again"
+
+
 class AssistantState(TypedDict):
     request_content: str
     intent: IntentClassification | None
     messages: Annotated[list[AnyMessage], operator.add]
     llm_calls: int
+    tool_calls: int
+    tokens: int
+    turn_usage: dict[str, Any]
+    background_tasks: list[dict]
+
+
+def message_text(message: AIMessage) -> str:
+    """Returns the text parts of a model message, which may be a string or a list of content blocks"""
+    if isinstance(message.content, str):
+        return message.content
+    return "".join(block.get("text", "") for block in message.content if isinstance(block, dict))
+
+
+def resolve(value: Any) -> Any:
+    """Prompts and tool sets that differ per tenant are passed as functions returning the current tenant's"""
+    return value() if callable(value) else value
+
+
+def resolve_messages(messages: list[AnyMessage], blob_store: BlobStore | None) -> list[AnyMessage]:
+    """Restores tool results that were stored by reference, right before a model needs to read them"""
+    return blob_store.resolve(messages) if blob_store else messages
+
+
+def instrument_node(name: str, node: Callable) -> Callable:
+    """Wraps a graph node so each execution is recorded as a graph_node span and traced, within the turn's deadline"""
+
+    @functools.wraps(node)
+    def instrumented(state, *args, **kwargs):
+        TRACER.node_start(name, state)
+        start = time.perf_counter()
+        with span("graph_node", node=name), deadline_scope(config_deadline()):
+            output = node(state, *args, **kwargs)
+        TRACER.node_end(name, output, time.perf_counter() - start)
+        return output
+
+    return instrumented
+
+
+def scheduled_call(
+    model: Runnable,
+    messages: list[AnyMessage],
+    node: str,
+    scheduler: LLMScheduler | Callable[[], LLMScheduler] | None,
+) -> Any:
+    """
+    Invokes the model within an llm_call span, once the scheduler (the current tenant's, given as a function) admits
+    the call. Raises DeadlineExceeded when the turn's budget runs out first, the scheduler's slot is given back right
+    away.
+    """
+    scheduler = resolve(scheduler)
+
+    def invoke():
+        with span("llm_call", node=node):
+            return model.invoke(messages)
+
+    def call():
+        return call_within(invoke)
+
+    return scheduler.run(node, messages, call) if scheduler else call()
+
+
+def invoke_model(
+    model: Runnable,
+    messages: list[AnyMessage],
+    node: str,
+    scheduler: LLMScheduler | Callable[[], LLMScheduler] | None = None,
+) -> AIMessage:
+    """Invokes the model (see `scheduled_call`) and accounts for its token usage"""
+    response = scheduled_call(model, messages, node, scheduler)
+    record_llm_usage(node, response)
+    return response
 
 
-def build_intent_detector(model: BaseChatModel, prompt: str):
-    """Returns a configured closure for the llm_calls in the graph"""
-    intent_model = model.with_structured_output(IntentClassification)
+def deadline_reply() -> AIMessage:
+    """The answer of a turn whose budget ran out"""
+    return AIMessage(content=DEADLINE_MESSAGE, response_metadata={"deadline": "exceeded"})
+
+
+def build_intent_detector(
+    model: Callable[[], BaseChatModel],
+    prompt: str | Callable[[], str],
+    blob_store: BlobStore | None = None,
+    on_intent: Callable[[str], None] | None = None,
+    limits: UsageLimits | None = None,
+    scheduler: LLMScheduler | Callable[[], LLMScheduler] | None = None,
+):
+    """
+    Returns a configured closure for the llm_calls in the graph, `on_intent` is told every detected intent.
+    Past the `limits`, the turn ends with a fixed answer instead. The model is created on the first call.
+    """
+
+    @functools.cache
+    def intent_model() -> Runnable:
+        return model().with_structured_output(IntentClassification, include_raw=True)
 
     def llm_call(state: AssistantState):
         """LLM decides whether to call a tool or not"""
 
-        logging.debug(f"{pformat(state)}")
-        intent = intent_model.invoke([SystemMessage(content=prompt)] + state["messages"])
-        logging.debug(f"{pformat(intent)}")
-
-        return Command(update={"intent": intent}, goto=intent["intent"])
+        if limits and (limit := limits.exceeded(state)):
+            return Command(update={"messages": [limit_reply(limit)]}, goto="user_input")
+        messages = [SystemMessage(content=resolve(prompt))] + resolve_messages(state["messages"], blob_store)
+        try:
+            output = scheduled_call(intent_model(), messages, "detect_intent", scheduler)
+        except DeadlineExceeded:
+            return Command(update={"messages": [deadline_reply()]}, goto="user_input")
+        record_llm_usage("detect_intent", output["raw"])
+        if output["parsing_error"]:
+            raise output["parsing_error"]
+        intent = output["parsed"]
+        if on_intent:
+            on_intent(intent["intent"])
+
+        usage = usage_update(state, llm_calls=1, tokens=message_tokens(output["raw"]))
+        return Command(update={"intent": intent, **usage}, goto=intent["intent"])
 
     return llm_call
 
 
-def build_llm_call(model_with_tools: BaseChatModel, prompt: str):
-    """Returns a configured closure for the llm_calls in the graph"""
+def build_single_call_router(
+    model: Callable[[], BaseChatModel],
+    prompt: str | Callable[[], str],
+    intent_tool_sets: dict[str, dict[str, BaseTool] | Callable[[], dict[str, BaseTool]]],
+    blob_store: BlobStore | None = None,
+    on_intent: Callable[[str], None] | None = None,
+    limits: UsageLimits | None = None,
+    scheduler: LLMScheduler | Callable[[], LLMScheduler] | None = None,
+    responder: Responder | None = None,
+):
+    """
+    Returns a configured closure that classifies the intent and starts acting on it with a single LLM call.
+    The model may call the chosen intent's tools alongside the classification, calls to tools outside that
+    intent's set are dropped. When it calls no tool, its answer is the reply of the turn, so greetings and questions
+    it can answer cost one call too, unless the `responder` has a template for the intent's node. Only without a
+    usable classification or answer it falls back to the two-step detect_intent path.
+    `on_intent` is told every intent the router classifies. Past the `limits`, the turn ends with a fixed answer.
+    The model is created on the first call.
+    """
 
-    def llm_call(state: AssistantState):
+    @functools.cache
+    def router_model() -> Runnable:
+        all_tools = {name: tool for tools in intent_tool_sets.values() for name, tool in resolve(tools).items()}
+        return model().bind_tools([RouteClassification, *all_tools.values()], tool_choice="any")
+
+    intents = get_args(IntentClassification.__annotations__["intent"])
+
+    def route(state: AssistantState):
+        """LLM picks the intent and possibly the first tool call for it"""
+
+        if limits and (limit := limits.exceeded(state)):
+            return Command(update={"messages": [limit_reply(limit)]}, goto="user_input")
+        messages = [SystemMessage(content=resolve(prompt))] + resolve_messages(state["messages"], blob_store)
+        try:
+            response = invoke_model(router_model(), messages, "route", scheduler)
+        except DeadlineExceeded:
+            return Command(update={"messages": [deadline_reply()]}, goto="user_input")
+        usage = usage_update(state, llm_calls=1, tokens=message_tokens(response))
+
+        def reply(content: str, tool_calls: list | None = None) -> AIMessage:
+            return AIMessage(
+                content=content,
+                tool_calls=tool_calls or [],
+                id=response.id,
+                response_metadata=response.response_metadata,
+                usage_metadata=response.usage_metadata,
+            )
+
+        decision = next((c["args"] for c in response.tool_calls if c["name"] == ROUTE_TOOL), None)
+        if not decision or decision.get("intent") not in intents:
+            if not response.tool_calls and message_text(response).strip():
+                return Command(update={"messages": [reply(message_text(response))], **usage}, goto="user_input")
+            logging.info("Single-call routing gave no intent, falling back to detect_intent")
+            return Command(update=usage, goto="detect_intent")
+
+        intent = decision["intent"]
+        classification = {key: decision.get(key, "") for key in ("intent", "topic", "summary")}
+        if on_intent:
+            on_intent(intent)
+        allowed = resolve(intent_tool_sets.get(intent, {}))
+        tool_calls = [c for c in response.tool_calls if c["name"] in allowed]
+        if dropped := [c["name"] for c in response.tool_calls if c["name"] != ROUTE_TOOL and c["name"] not in allowed]:
+            logging.warning(f"Dropped tool calls outside of the '{intent}' tool set: {dropped}")
+        if not tool_calls:
+            answer = str(decision.get("answer") or message_text(response)).strip()
+            if not answer or (responder and responder.for_node(intent)):
+                return Command(update={"intent": classification, **usage}, goto=intent)
+            # Final, the intent's node would only make a second call to write it again
+            update = {"intent": classification, "messages": [reply(answer)], **usage}
+            return Command(update=update, goto=END if intent == "leave" else "user_input")
+
+        # Rebuilt so the classification call does not linger in the history as a call without a result
+        return Command(
+            update={"intent": classification, "messages": [reply(message_text(response), tool_calls)], **usage},
+            goto=f"{intent}_tools_node",
+        )
+
+    return route
+
+
+def build_llm_call(
+    model_with_tools: Callable[[], Runnable],
+    prompt: str | Callable[[], str],
+    blob_store: BlobStore | None = None,
+    limits: UsageLimits | None = None,
+    responder: Responder | None = None,
+    scheduler: LLMScheduler | Callable[[], LLMScheduler] | None = None,
+):
+    """
+    Returns a configured closure for the llm_calls in the graph, answering with a fixed reply past the `limits`.
+    A node with a template in the `responder` answers from it without a model call.
+    `model_with_tools` returns the model to call, see `ModelRouter.lazy`.
+    """
+
+    def llm_call(state: AssistantState, config: RunnableConfig):
         """LLM decides whether to call a tool or not"""
 
-        logging.debug(f"{pformat(state)}")
-        return {
-            "messages": [model_with_tools.invoke([SystemMessage(content=prompt)] + state["messages"])],
-        }
+        if responder and (reply := responder.for_node(config["metadata"]["langgraph_node"])):
+            return {"messages": [reply]}
+        if limits and (limit := limits.exceeded(state)):
+            # Without tool calls, the reply ends the turn
+            return {"messages": [limit_reply(limit)]}
+        messages = [SystemMessage(content=resolve(prompt))] + resolve_messages(state["messages"], blob_store)
+        try:
+            response = invoke_model(model_with_tools(), messages, config["metadata"]["langgraph_node"], scheduler)
+        except DeadlineExceeded:
+            # Without tool calls, the reply ends the turn
+            return {"messages": [deadline_reply()]}
+        return {"messages": [response], **usage_update(state, llm_calls=1, tokens=message_tokens(response))}
 
     return llm_call
 
 
-def build_tool_node(tools_by_name: dict[str, BaseTool]):
-    """Returns a configured closure for the tool_node calls in the graph"""
+def tool_message(observation, tool_call_id: str, blob_store: BlobStore | None = None) -> ToolMessage:
+    wrapper = {"result": observation, "type": "json"}
+    if blob_store:
+        return blob_store.tool_message(str(wrapper), tool_call_id=tool_call_id)
+    return ToolMessage(content=wrapper, tool_call_id=tool_call_id)
+
+
+def build_tool_node(
+    tools_by_name: dict[str, BaseTool] | Callable[[], dict[str, BaseTool]],
+    blob_store: BlobStore | None = None,
+    background: BackgroundTools | None = None,
+    limits: UsageLimits | None = None,
+    responder: Responder | None = None,
+    intent: str | None = None,
+):
+    """
+    Returns a configured closure for the tool_node calls in the graph.
+    With a blob store, large results are kept out of the state and only referenced by the ToolMessage.
+    With background tools, slow read-only calls that outlast the foreground wait are left running, their calls get a
+    pending result and the node ends the turn with an interim message.
+    Once the turn's budget is spent, the remaining calls are not run, and neither are calls refused by the `limits`.
+    A successful terminal call with a template for the `intent` in the `responder` ends the turn with its reply.
+    """
+
+    def run_tool(tools: dict[str, BaseTool], tool_call: ToolCall):
+        tool = tools[tool_call["name"]]
+        if expired():
+            return DEADLINE_RESULT
+        try:
+            with span("tool_call", tool=tool.name):
+                return tool.invoke(tool_call["args"])
+        except OutcomeUnknown:
+            return UNCONFIRMED_RESULT
+        except DeadlineExceeded:
+            return DEADLINE_RESULT
+        except Exception as e:
+            logging.error(f"{e}")
+            return "tool failed"  # TODO: handle errors better
 
     def tool_node(state: AssistantState):
         """Performs the tool call"""
-        result = []
-        for tool_call in state["messages"][-1].tool_calls:
-            tool = tools_by_name[tool_call["name"]]
-            try:
-                observation = tool.invoke(tool_call["args"])
-            except Exception as e:
-                logging.error(f"{e}")
-                observation = "tool failed"  # TODO: handle errors better
-            wrapper = {"result": observation, "type": "json"}
-            result.append(ToolMessage(content=wrapper, tool_call_id=tool_call["id"]))
-        return {"messages": result}
+        tool_calls = state["messages"][-1].tool_calls
+        # Resolved here, background calls run on threads without the tenant current
+        run = functools.partial(run_tool, resolve(tools_by_name))
+        refused = limits.refused(state, tool_calls) if limits else {}
+        allowed = [c for c in tool_calls if c["id"] not in refused]
+        usage = usage_update(state, tool_calls=allowed)
+        result = {c_id: tool_message(observation, c_id, blob_store) for c_id, observation in refused.items()}
+        if not background or not allowed or not background.defers(allowed):
+            observations = [run(c) for c in allowed]
+            for tool_call, observation in zip(allowed, observations, strict=True):
+                result[tool_call["id"]] = tool_message(observation, tool_call["id"], blob_store)
+            messages = [result[c["id"]] for c in tool_calls]
+            if responder and not refused and (reply := responder.after_tools(intent, tool_calls, observations)):
+                messages.append(reply)
+            return {"messages": messages, **usage}
+
+        pending = []
+        for tool_call, (task_id, future) in zip(allowed, background.start(allowed, run), strict=True):
+            if future.done():
+                result[tool_call["id"]] = tool_message(background.collect(task_id), tool_call["id"], blob_store)
+            else:
+                pending.append({"id": task_id, "name": tool_call["name"], "args": tool_call["args"]})
+                result[tool_call["id"]] = tool_message(PENDING_RESULT, tool_call["id"], blob_store)
+        messages = [result[c["id"]] for c in tool_calls]
+        if not pending:
+            return {"messages": messages, **usage}
+        interim = AIMessage(content=INTERIM_MESSAGE, response_metadata={"background": "pending"})
+        return {"messages": [*messages, interim], "background_tasks": pending, **usage}
 
     return tool_node
 
 
+def build_after_tools(intent: str):
+    def after_tools(state: AssistantState) -> Literal[intent, "user_input"]:
+        """Back to the intent's node with the results, or to the patient when the node answered or left tools running"""
+        return "user_input" if isinstance(state["messages"][-1], AIMessage) else intent
+
+    return after_tools
+
+
+def build_background_results_node(background: BackgroundTools, entry: str, blob_store: BlobStore | None = None):
+    """
+    Returns a configured closure that adds the results of the tools left running in the previous turn, as fresh
+    tool calls, then goes to `entry`, so the patient's reply is classified again and can change the intent.
+    """
+
+    def background_results(state: AssistantState):
+        tasks = state.get("background_tasks") or []
+        if not tasks:
+            return Command(goto=entry)
+
+        messages = []
+        for task in tasks:
+            try:
+                observation = background.collect(task["id"])
+            except (LookupError, TimeoutError) as e:
+                logging.error(f"Background {task['name']} call failed: {e!r}")
+                observation = "tool failed"
+            REGISTRY.inc("background_tools_total", result="failed" if observation == "tool failed" else "merged")
+            call_id = f"call_background_{task['id']}"
+            call = {"id": call_id, "name": task["name"], "args": task["args"]}
+            messages.append(AIMessage(content="", tool_calls=[call], response_metadata={"background": "result"}))
+            messages.append(tool_message(observation, call_id, blob_store))
+        return Command(update={"messages": messages, "background_tasks": []}, goto=entry)
+
+    return background_results
+
+
 def build_user_input_node():
     """Returns a configured closure for a user_input node in the graph"""
 
     def user_input_node(state: AssistantState):
         """Break out using an interrupt to get more input"""
 
-        logging.debug(f"{pformat(state)}")
+        TRACER.node_start("user_input", state)
         result = interrupt(
             {
                 "messages": state["messages"],
             }
         )
-        return result
+        # The patient's reply starts a new turn
+        return {**result, "turn_usage": {}}
 
     return user_input_node
 
@@ -121,12 +453,32 @@ def build_should_continue(tool_node_name: str):
     return should_continue
 
 
+def load_route_prompt(intent_tool_sets: dict[str, dict[str, BaseTool] | Callable[[], dict[str, BaseTool]]]) -> str:
+    """Combines the intent detection prompt with every intent's instructions and tools"""
+    instructions = []
+    for intent, tools in intent_tool_sets.items():
+        if intent == "greet":
+            continue
+        intent_prompt = load_prompt(intent, {"agent_prompt": ""}).strip()
+        instructions.append(f"## {intent}\n{intent_prompt}\nTools: {', '.join(resolve(tools)) or 'none'}")
+    return load_prompt(
+        "route",
+        {
+            "agent_prompt": load_prompt("agent", {}),
+            "intent_prompt": load_prompt("intent", {"agent_prompt": ""}).strip(),
+            "route_tool": ROUTE_TOOL,
+            "intent_instructions": "\n\n".join(instructions),
+        },
+    )
+
+
 def load_prompt(name: str, config: dict) -> str:
     """
-    Load prompts/<name>.txt and substitute placeholders using the provided config dict.
+    Load prompts/<name>.txt, or the current tenant's own version of it, and substitute placeholders using the
+    provided config dict.
     """
     base_dir = os.path.dirname(__file__)
-    path = os.path.join(base_dir, "prompts", f"{name}.txt")
+    path = tenant_file(f"{name}.txt") or os.path.join(base_dir, "prompts", f"{name}.txt")
 
     with open(path, encoding="utf-8") as f:
         content = f.read()
@@ -135,63 +487,229 @@ def load_prompt(name: str, config: dict) -> str:
     return tmpl.safe_substitute(config)
 
 
+# The intents of build_intent_tool_sets
+TOOL_INTENTS = ("question", "schedule", "review", "reschedule", "cancel", "greet", "leave")
+
+
+def build_intent_tool_sets(
+    calendly_client: CalendlyClient,
+    slot_calendar: "SlotCalendar | None" = None,
+    event_mirror: "EventMirror | None" = None,
+    knowledge_base: dict[str, str] | None = None,
+) -> dict[str, dict[str, BaseTool]]:
+    """The production tools of every intent"""
+    from src.tools import (
+        build_cancelling_tools,
+        build_questions_tools,
+        build_rescheduling_tools,
+        build_reviewing_tools,
+        build_scheduling_tools,
+    )
+
+    return {
+        "question": build_questions_tools(knowledge_base),
+        "schedule": build_scheduling_tools(calendly_client, slot_calendar),
+        "review": build_reviewing_tools(calendly_client, event_mirror),
+        "reschedule": build_rescheduling_tools(calendly_client, slot_calendar, event_mirror),
+        "cancel": build_cancelling_tools(calendly_client, event_mirror),
+        "greet": {},
+        "leave": {},
+    }
+
+
+def build_unclear_tools() -> dict[str, BaseTool]:
+    """The tools of the unclear node, answering from the built-in knowledge base"""
+    from src.tools import build_questions_tools
+
+    return build_questions_tools()
+
+
+def lazy_intent_tool_sets(build: Callable[[], dict[str, dict[str, BaseTool]]]) -> dict[str, Callable]:
+    """
+    The intent tool sets `build` returns, as functions built together on the first call of any, so that neither the
+    tool modules nor the tools are loaded before the first tool call or model call
+    """
+    build = functools.cache(build)
+    return {intent: lambda intent=intent: build()[intent] for intent in TOOL_INTENTS}
+
+
+def with_tools(tools: dict[str, BaseTool] | Callable[[], dict[str, BaseTool]]) -> Callable[[BaseChatModel], Runnable]:
+    return lambda model: model.bind_tools(resolve(tools).values())
+
+
 def create_acme_dental_agent(
     openai_api_key: str | None = None,
     calendly_api_token: str | None = None,
     intent_tool_sets: dict[str, dict[str, BaseTool]] | None = None,
     greet: bool = True,
+    checkpointer: BaseCheckpointSaver | None = None,
+    blob_store: BlobStore | None = None,
+    model_router: ModelRouter | None = None,
+    single_call_routing: bool = False,
+    calendly_client: CalendlyClient | None = None,
+    prefetcher: "CalendlyPrefetcher | None" = None,
+    background: BackgroundTools | None = None,
+    slot_calendar: "SlotCalendar | None" = None,
+    event_mirror: "EventMirror | None" = None,
+    limits: UsageLimits | None = None,
+    responder: Responder | None = None,
+    scheduler: LLMScheduler | Callable[[], LLMScheduler] | None = None,
+    tenants: TenantRegistry | None = None,
 ):
     """
     Build a LangChain agent that can reason about and call Calendly tools.
+    Conversation state is kept in the given checkpointer, or in process memory if none is given.
+    The production tools, and the modules defining them, are loaded on the first model or tool call that needs them.
+    Large tool results are kept in the blob store, if given, and only referenced from the state.
+    Each node uses the model the router assigns to it, by default as configured in config/models.toml, created on
+    the node's first model call so that startup does not wait for the provider SDKs.
+    With single_call_routing, a `route` node classifies the intent and issues its first tool call in one model
+    call, falling back to `detect_intent` when it cannot.
+    A prebuilt calendly_client takes precedence over calendly_api_token.
+    With a prefetcher, the Calendly reads a scheduling intent is about to make are started as soon as it is detected.
+    With background tools, slow lookups that do not finish in time continue while the agent answers the patient.
+    With a slot calendar, scheduling and rescheduling can search free slots locally with `find_available_slots`.
+    With an event mirror, a patient's appointments are looked up locally with `find_patient_appointments`.
+    Model and tool calls are accounted for per turn and per conversation, and capped by the `limits` (from the
+    environment by default), which also stop repeated identical tool calls.
+    With a responder, the nodes and tool results it has templates for are answered without a model call.
+    All model calls go through the scheduler (from the environment by default), which limits their concurrency and
+    token rate and lets booking, rescheduling and cancellation calls go first.
+    With a tenant registry, the graph serves every clinic in it: each node runs for the tenant of the thread, with
+    the tenant's Calendly client, knowledge base and prompts, built on the tenant's first use, and its model calls
+    go through the tenant's own scheduler unless one is given. The prefetcher, slot calendar and event mirror cover a
+    single Calendly account and cannot be combined with tenants.
     """
 
-    model = init_chat_model("claude-sonnet-4-5-20250929", temperature=0)
+    model_router = model_router or ModelRouter.from_config()
+    limits = limits or UsageLimits.from_env()
+    if not scheduler:
+        scheduler = (lambda: current_tenant().scheduler) if tenants else LLMScheduler.from_env()
+
+    if tenants and (prefetcher or slot_calendar or event_mirror):
+        raise ValueError("The prefetcher, slot calendar and event mirror cannot be combined with tenants")
 
-    calendly_client = CalendlyClient(api_token=calendly_api_token)
+    if tenants:
+        # The default tenant's tools only define the tool schemas bound to the models, the tenants run their own
+        calendly_client = tenants.default_tenant().calendly_client
+    calendly_client = calendly_client or CalendlyClient(api_token=calendly_api_token)
 
+    tenant_tool_sets = None
     if not intent_tool_sets:
-        intent_tool_sets = {
-            "question": build_questions_tools(),
-            "schedule": build_scheduling_tools(calendly_client),
-            "review": build_reviewing_tools(calendly_client),
-            "reschedule": build_rescheduling_tools(calendly_client),
-            "cancel": build_cancelling_tools(calendly_client),
-            "greet": {},
-            "leave": {},
-        }
+        intent_tool_sets = lazy_intent_tool_sets(
+            functools.partial(build_intent_tool_sets, calendly_client, slot_calendar, event_mirror)
+        )
+        if tenants:
+
+            def tenant_tool_sets(intent: str) -> Callable[[], dict[str, BaseTool]]:
+                def tools() -> dict[str, BaseTool]:
+                    tenant = current_tenant()
+                    build = functools.partial(
+                        build_intent_tool_sets, tenant.calendly_client, knowledge_base=tenant.knowledge_base
+                    )
+                    return tenant.memo("intent_tool_sets", build)[intent]
+
+                return tools
+
+    def prompt(name: str, build: Callable[[], str]) -> str | Callable[[], str]:
+        """The prompt `build` returns, with tenants built for each tenant on its first use"""
+        if not tenants:
+            return build()
+        return lambda: current_tenant().memo(f"prompt:{name}", build)
+
+    intents = get_args(IntentClassification.__annotations__["intent"])
+    model_router.validate(["detect_intent", "route", "greet", *intents, *intent_tool_sets])
+    if responder:
+        responder.validate(["greet", *intents, *intent_tool_sets])
 
     agent_builder = StateGraph(AssistantState)
-    agent_builder.add_node("detect_intent", build_intent_detector(model, load_prompt("intent", {})))
 
-    agent_builder.add_node(
-        "unclear", build_llm_call(model.bind_tools(build_questions_tools().values()), load_prompt("agent", {}))
+    def add_node(name: str, node: Callable) -> None:
+        agent_builder.add_node(name, instrument_node(name, tenants.scoped(node) if tenants else node))
+
+    add_node(
+        "detect_intent",
+        build_intent_detector(
+            functools.partial(model_router.for_node, "detect_intent"),
+            prompt("intent", lambda: load_prompt("intent", {})),
+            blob_store,
+            prefetcher.on_intent if prefetcher else None,
+            limits,
+            scheduler,
+        ),
+    )
+
+    add_node(
+        "unclear",
+        build_llm_call(
+            model_router.lazy("unclear", with_tools(build_unclear_tools)),
+            prompt("agent", lambda: load_prompt("agent", {})),
+            blob_store,
+            limits,
+            scheduler=scheduler,
+        ),
     )
 
     for intent in intent_tool_sets:
-        agent_builder.add_node(
+        add_node(
             intent,
             build_llm_call(
-                model.bind_tools(intent_tool_sets[intent].values()),
-                load_prompt(intent, {"agent_prompt": load_prompt("agent", {})}),
+                model_router.lazy(intent, with_tools(intent_tool_sets[intent])),
+                prompt(intent, lambda intent=intent: load_prompt(intent, {"agent_prompt": load_prompt("agent", {})})),
+                blob_store,
+                limits,
+                responder,
+                scheduler,
+            ),
+        )
+        add_node(
+            f"{intent}_tools_node",
+            build_tool_node(
+                tenant_tool_sets(intent) if tenant_tool_sets else intent_tool_sets[intent],
+                blob_store,
+                background,
+                limits,
+                responder,
+                intent,
             ),
         )
-        agent_builder.add_node(f"{intent}_tools_node", build_tool_node(intent_tool_sets[intent]))
         agent_builder.add_conditional_edges(
             intent, build_should_continue(f"{intent}_tools_node"), [f"{intent}_tools_node", "user_input"]
         )
-        agent_builder.add_edge(f"{intent}_tools_node", intent)
+        agent_builder.add_conditional_edges(f"{intent}_tools_node", build_after_tools(intent), [intent, "user_input"])
+
+    entry = "detect_intent"
+    if single_call_routing:
+        entry = "route"
+        add_node(
+            "route",
+            build_single_call_router(
+                functools.partial(model_router.for_node, "route"),
+                prompt("route", lambda: load_route_prompt(intent_tool_sets)),
+                intent_tool_sets,
+                blob_store,
+                prefetcher.on_intent if prefetcher else None,
+                limits,
+                scheduler,
+                responder,
+            ),
+        )
 
+    # Not instrumented, the node only parks the graph until the user replies
     agent_builder.add_node("user_input", build_user_input_node())
     if greet:
         agent_builder.add_edge(START, "greet")
         agent_builder.add_edge("greet", "user_input")
     else:
-        agent_builder.add_edge(START, "detect_intent")
-    agent_builder.add_edge("user_input", "detect_intent")
+        agent_builder.add_edge(START, entry)
+    if background:
+        add_node("background_results", build_background_results_node(background, entry, blob_store))
+        agent_builder.add_edge("user_input", "background_results")
+    else:
+        agent_builder.add_edge("user_input", entry)
     agent_builder.add_edge("unclear", "user_input")
     agent_builder.add_edge("leave", END)
 
-    memory = MemorySaver()
-    agent = agent_builder.compile(checkpointer=memory)
+    agent = agent_builder.compile(checkpointer=checkpointer or MemorySaver())
 
     return agent
@@ -1,27 +1,118 @@
 """Calendly API wrapper"""
 
+import hashlib
+import json
+import logging
 import os
-from typing import Any
+import threading
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 import requests
 
+from src import deadline
+from src.api.records import AvailableTime, EventType, Invitee, ScheduledEvent, User, decode_response
+from src.api.resilience import CircuitBreaker, Hedger
+from src.metrics import REGISTRY, endpoint_label, span
+
+# Passed in by worker processes, which import it
+if TYPE_CHECKING:
+    from src.shared_cache import SharedCache
+
 
 class CalendlyAPIError(Exception):
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SlotUnavailableError(CalendlyAPIError):
     pass
 
 
+def parse_time(value: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_max_stale(value: str) -> dict[str, float]:
+    """Parses 'endpoint=seconds' pairs separated by commas, e.g. '/event_types=3600,/scheduled_events=60'"""
+    pairs = (item.split("=", 1) for item in value.split(",") if "=" in item)
+    return {endpoint.strip(): float(seconds) for endpoint, seconds in pairs}
+
+
 class CalendlyClient:
     """
     Generated and then edited wrapper around Calendly v2 API.
     https://developer.calendly.com/api-docs
+
+    GET responses are cached for `cache_ttl` seconds (ACME_CALENDLY_CACHE_TTL, off by default) and any POST clears
+    the cache. While caching, bookings check their slot with a fresh request first. Concurrent identical reads share
+    one request, waited for at most the request timeout, and availability requests are served from a cached window
+    that covers them, which lets a prefetch warm the cache for the tool calls that follow.
+    Every successful POST is passed to the `write_listeners` as (path, payload, response); their errors are logged.
+
+    `max_stale` (ACME_CALENDLY_MAX_STALE) maps endpoints to how many seconds past `cache_ttl` their cached responses
+    may still be served while a background request refreshes them, so a slow Calendly does not stall the reads. The
+    tools report the age of such responses (`with_age`).
+
+    With a `breaker`, requests fail fast with CircuitOpenError while Calendly keeps failing or responding slowly, and
+    with a `hedger`, slow GETs are sent a second time and the first response wins.
+
+    With a `shared_cache`, the worker processes of a host share their GET responses: a read missing from this
+    process's cache is looked up there before it is sent, and a POST clears it for every process, whose own caches
+    notice and clear themselves on their next read.
+
+    Within a turn's deadline, requests wait at most the remaining budget and none is started once it is spent. A POST
+    cut short raises OutcomeUnknown, since it may still have gone through.
     """
 
-    def __init__(self, api_token: str | None = None):
+    MAX_CACHE_ENTRIES = 1024
+    REQUEST_TIMEOUT = 20.0
+
+    def __init__(
+        self,
+        api_token: str | None = None,
+        transport: Any = requests,
+        cache_ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        max_stale: dict[str, float] | None = None,
+        breaker: CircuitBreaker | None = None,
+        hedger: Hedger | None = None,
+        shared_cache: "SharedCache | None" = None,
+    ):
+        """`transport` sends the HTTP requests, anything with the `requests` get and post functions will do"""
+        self.transport = transport
+        self.cache_ttl = float(os.getenv("ACME_CALENDLY_CACHE_TTL", 0)) if cache_ttl is None else cache_ttl
+        self.clock = clock
+        if max_stale is None:
+            max_stale = parse_max_stale(os.getenv("ACME_CALENDLY_MAX_STALE", ""))
+        self.max_stale = max_stale
+        self.breaker = breaker
+        self.hedger = hedger
+        self.shared_cache = shared_cache
+        self.shared_generation = 0
+        # key -> (expires, response future, served until), served stale between expires and served until
+        self.cache: dict[str, tuple[float, Future, float]] = {}
+        # event type URI -> cached availability windows as (start, end, cache key)
+        self.windows: dict[str, list[tuple[datetime, datetime, str]]] = {}
+        self.cache_lock = threading.Lock()
+        self.generation = 0  # bumped by clear_cache, so a refresh started before a write is dropped
+        self.refreshing: set[str] = set()
+        self.served = threading.local()  # age of the stale response the thread's last read got
+        self.write_listeners: list[Callable[[str, dict[str, Any], dict[str, Any]], None]] = []
         self.api_token = api_token or os.getenv("CALENDLY_API_TOKEN")
         if not self.api_token:
             raise ValueError("Calendly API token must be provided or set in CALENDLY_API_TOKEN")
 
         self.base_url = "https://api.calendly.com"
+        # Accounts, e.g. the clinics of a tenant registry, have their own entries in the shared cache
+        self.namespace = "calendly:" + hashlib.sha256(self.api_token.encode()).hexdigest()[:16]
 
     # Helpers
 
@@ -32,18 +123,199 @@ class CalendlyClient:
         }
 
     def _get(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+        self.served.age = None
+        if not self.cache_ttl:
+            return self._fetch(path, params)
+        key = json.dumps([path, params], sort_keys=True)
+        generation = self._sync_shared()
+        now = self.clock()
+        with self.cache_lock:
+            expires, future, served_until = self.cache.get(key, (0.0, None, 0.0))
+            stale = expires <= now < served_until and future.done() and future.exception() is None
+            owner = not stale and (future is None or expires <= now)
+            if owner:
+                if len(self.cache) >= self.MAX_CACHE_ENTRIES:
+                    self._evict_expired(now)
+                future = Future()
+                self.cache[key] = (now + self.cache_ttl, future, self._served_until(path, now))
+        result = "stale" if stale else "miss" if owner else "hit"
+        REGISTRY.inc("calendly_cache_total", endpoint=endpoint_label(path), result=result)
+        if stale:
+            self._serve_stale(key, expires, now)
+        if owner:
+            try:
+                future.set_result(self._fetch_shared(key, path, params, generation))
+            except Exception as e:
+                with self.cache_lock:
+                    if self.cache.get(key, (0.0, None, 0.0))[1] is future:
+                        del self.cache[key]
+                future.set_exception(e)
+        return self._wait(future, path)
+
+    def _wait(self, future: Future, path: str) -> dict[str, Any]:
+        """The response of a read another thread is sending, waited for as long as a request of our own"""
+        timeout = deadline.timeout(self.REQUEST_TIMEOUT)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError as e:
+            if timeout < self.REQUEST_TIMEOUT:
+                raise deadline.DeadlineExceeded(f"GET {path} outlasted the turn") from e
+            raise requests.Timeout(f"GET {path} sent by another thread took more than {timeout}s") from e
+
+    def _sync_shared(self) -> int:
+        """Clears this process's cache once another process wrote to Calendly, returns the shared generation"""
+        if not self.shared_cache:
+            return 0
+        generation = self.shared_cache.generation(self.namespace)
+        if generation != self.shared_generation:
+            self.clear_cache()
+            self.shared_generation = generation
+        return generation
+
+    def _fetch_shared(self, key: str, path: str, params: dict[str, Any] | None, generation: int) -> dict[str, Any]:
+        if not self.shared_cache:
+            return self._fetch(path, params)
+        data = self.shared_cache.get(self.namespace, key)
+        if data is not None:
+            REGISTRY.inc("calendly_cache_total", endpoint=endpoint_label(path), result="shared")
+            return data
+        data = self._fetch(path, params)
+        self.shared_cache.put(self.namespace, key, data, self.cache_ttl, generation)
+        return data
+
+    def _served_until(self, path: str, now: float) -> float:
+        return now + self.cache_ttl + self.max_stale.get(endpoint_label(path), 0.0)
+
+    def _serve_stale(self, key: str, expires: float, now: float) -> None:
+        """Records the age of the stale response for `key` and refreshes it in the background, once at a time"""
+        self.served.age = now - expires + self.cache_ttl
+        with self.cache_lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+            generation = self.generation
+        threading.Thread(target=self._refresh, args=(key, generation), name="calendly-refresh", daemon=True).start()
+
+    def _refresh(self, key: str, generation: int) -> None:
+        path, params = json.loads(key)
+        try:
+            data = self._fetch(path, params)
+        except Exception as e:
+            logging.warning(f"Refreshing GET {path} failed, still serving the cached response: {e!r}")
+            return
+        else:
+            future = Future()
+            future.set_result(data)
+            now = self.clock()
+            with self.cache_lock:
+                if self.generation == generation:
+                    self.cache[key] = (now + self.cache_ttl, future, self._served_until(path, now))
+        finally:
+            with self.cache_lock:
+                self.refreshing.discard(key)
+
+    def with_age(self, result: Any) -> Any:
+        """The result of the thread's last read, wrapped with its age when it was served stale"""
+        age = getattr(self.served, "age", None)
+        if age is None:
+            return result
+        return {"collection": result, "stale": True, "age_seconds": round(age, 1)}
+
+    def _evict_expired(self, now: float) -> None:
+        self.cache = {key: entry for key, entry in self.cache.items() if entry[2] > now}
+        self.windows = {
+            event_type: live
+            for event_type, windows in self.windows.items()
+            if (live := [w for w in windows if w[2] in self.cache])
+        }
+        if len(self.cache) >= self.MAX_CACHE_ENTRIES:
+            self.clear_cache()
+
+    def clear_cache(self) -> None:
+        with self.cache_lock:
+            self.cache = {}
+            self.windows = {}
+            self.generation += 1
+
+    def _call(self, endpoint: str, send: Callable[[], dict[str, Any]], hedge: bool = False) -> dict[str, Any]:
+        """Sends a request through the circuit breaker and, for idempotent requests, the hedger"""
+        if self.breaker:
+            self.breaker.before()
+        started = time.monotonic()
+        try:
+            result = self.hedger.run(endpoint, send) if hedge and self.hedger else send()
+        except deadline.DeadlineExceeded:
+            # Says nothing about Calendly's health
+            if self.breaker:
+                self.breaker.release()
+            raise
+        except Exception as e:
+            if self.breaker:
+                # Client errors mean Calendly is up and answering
+                status = getattr(e, "status_code", None)
+                healthy = status is not None and status < 500 and status != 429
+                self.breaker.record(healthy, time.monotonic() - started)
+            raise
+        if self.breaker:
+            self.breaker.record(True, time.monotonic() - started)
+        return result
+
+    def _fetch(self, path: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         url = f"{self.base_url}{path}"
-        response = requests.get(url, headers=self._headers(), params=params, timeout=20)
-        if not response.ok:
-            raise CalendlyAPIError(f"GET {url} failed: {response.status_code} {response.text}")
-        return response.json()
+        endpoint = endpoint_label(path)
+        timeout = deadline.timeout(self.REQUEST_TIMEOUT)
+
+        def send() -> dict[str, Any]:
+            with span("calendly_request", method="GET", endpoint=endpoint):
+                try:
+                    response = self.transport.get(url, headers=self._headers(), params=params, timeout=timeout)
+                except requests.Timeout as e:
+                    if timeout < self.REQUEST_TIMEOUT:
+                        raise deadline.DeadlineExceeded(f"GET {url} outlasted the turn") from e
+                    raise
+            REGISTRY.inc("calendly_requests_total", method="GET", endpoint=endpoint, status=response.status_code)
+            if not response.ok:
+                raise CalendlyAPIError(
+                    f"GET {url} failed: {response.status_code} {response.text}", response.status_code
+                )
+            return decode_response(response)
+
+        return self._call(endpoint, send, hedge=True)
 
     def _post(self, path: str, payload: dict[str, Any]) -> dict[str, Any]:
+        # Writes change availability and listings, so nothing cached before them can be trusted
+        self.clear_cache()
+        if self.shared_cache:
+            self.shared_generation = self.shared_cache.clear(self.namespace)
         url = f"{self.base_url}{path}"
-        response = requests.post(url, headers=self._headers(), json=payload, timeout=20)
-        if not response.ok:
-            raise CalendlyAPIError(f"POST {url} failed: {response.status_code} {response.text}")
-        return response.json()
+        endpoint = endpoint_label(path)
+        if deadline.expired():
+            raise deadline.DeadlineExceeded(f"POST {url} not sent, the turn ran out of time")
+        timeout = deadline.timeout(self.REQUEST_TIMEOUT)
+
+        def send() -> dict[str, Any]:
+            with span("calendly_request", method="POST", endpoint=endpoint):
+                try:
+                    response = self.transport.post(url, headers=self._headers(), json=payload, timeout=timeout)
+                except requests.Timeout as e:
+                    if timeout < self.REQUEST_TIMEOUT:
+                        raise deadline.OutcomeUnknown(f"POST {url} outlasted the turn, it may have gone through") from e
+                    raise
+            REGISTRY.inc("calendly_requests_total", method="POST", endpoint=endpoint, status=response.status_code)
+            if not response.ok:
+                raise CalendlyAPIError(
+                    f"POST {url} failed: {response.status_code} {response.text}", response.status_code
+                )
+            return decode_response(response)
+
+        result = self._call(endpoint, send)
+        # The write went through, a failing listener must not make the tool report otherwise
+        for listener in self.write_listeners:
+            try:
+                listener(path, payload, result)
+            except Exception:
+                logging.exception(f"Write listener failed for POST {path}")
+        return result
 
     # Endpoints
 
@@ -77,6 +349,38 @@ class CalendlyClient:
         data = self._get("/scheduled_events", params=params)
         return data.get("collection", [])
 
+    def _pages(self, path: str, params: dict[str, Any]) -> Iterator[dict[str, Any]]:
+        """Every item of a paginated collection, fetched page by page and bypassing the cache"""
+        while True:
+            data = self._fetch(path, params)
+            yield from data.get("collection", [])
+            token = (data.get("pagination") or {}).get("next_page_token")
+            if not token:
+                return
+            params = {**params, "page_token": token}
+
+    def iter_scheduled_events(
+        self,
+        user: str | None = None,
+        organization: str | None = None,
+        status: str | None = None,
+        min_start_time: str | None = None,
+        page_size: int = 100,
+    ) -> Iterator[dict[str, Any]]:
+        params: dict[str, Any] = {"count": page_size, "sort": "start_time:asc"}
+        if user:
+            params["user"] = user
+        if organization:
+            params["organization"] = organization
+        if status:
+            params["status"] = status
+        if min_start_time:
+            params["min_start_time"] = min_start_time
+        return self._pages("/scheduled_events", params)
+
+    def iter_event_invitees(self, event_uri: str, page_size: int = 100) -> Iterator[dict[str, Any]]:
+        return self._pages(f"/scheduled_events/{event_uri.split('/')[-1]}/invitees", {"count": page_size})
+
     def list_event_invitees(self, event_uri: str) -> list[dict[str, Any]]:
         params = {"event": event_uri}
         data = self._get("/scheduled_events/{}/invitees".format(event_uri.split("/")[-1]), params=params)
@@ -110,9 +414,56 @@ class CalendlyClient:
 
         params.update(extra_params)
 
+        self.served.age = None
+        self._sync_shared()
+        if (
+            set(params) == {"event_type", "start_time", "end_time"}
+            and (slots := self._cached_availability(event_type_uri, start_time, end_time)) is not None
+        ):
+            return slots
+
         data = self._get("/event_type_available_times", params=params)
+        if set(params) == {"event_type", "start_time", "end_time"}:
+            self._remember_window(event_type_uri, start_time, end_time, params)
         return data.get("collection", [])
 
+    def _remember_window(self, event_type_uri: str, start_time: str, end_time: str, params: dict[str, Any]) -> None:
+        start, end = parse_time(start_time), parse_time(end_time)
+        if not self.cache_ttl or not start or not end:
+            return
+        key = json.dumps(["/event_type_available_times", params], sort_keys=True)
+        with self.cache_lock:
+            if key in self.cache:
+                self.windows.setdefault(event_type_uri, []).append((start, end, key))
+
+    def _cached_availability(self, event_type_uri: str, start_time: str, end_time: str) -> list[dict[str, Any]] | None:
+        """The slots of a cached wider window, when one covers the requested window"""
+        start, end = parse_time(start_time), parse_time(end_time)
+        if not self.cache_ttl or not start or not end:
+            return None
+        now = self.clock()
+        with self.cache_lock:
+            key, (expires, future, _) = next(
+                (
+                    (key, self.cache[key])
+                    for window_start, window_end, key in self.windows.get(event_type_uri, [])
+                    if window_start <= start and end <= window_end and self.cache.get(key, (0.0, None, 0.0))[2] > now
+                ),
+                (None, (0.0, None, 0.0)),
+            )
+        if future is None or (expires <= now and not future.done()):
+            return None
+        try:
+            collection = self._wait(future, "/event_type_available_times").get("collection", [])
+        except deadline.DeadlineExceeded:
+            raise
+        except Exception:
+            return None
+        if expires <= now:
+            self._serve_stale(key, expires, now)
+        REGISTRY.inc("calendly_cache_total", endpoint="/event_type_available_times", result="window_hit")
+        return [slot for slot in collection if start <= (parse_time(slot.get("start_time")) or start) <= end]
+
     def create_invitee(
         self,
         event_type: str,
@@ -125,6 +476,9 @@ class CalendlyClient:
         else:
             event_type_uri = event_type
 
+        # Availability served from the cache may be up to `cache_ttl` (plus `max_stale`) seconds old
+        if self.cache_ttl or self.max_stale:
+            self._check_slot(event_type_uri, start_time)
         payload = {
             "event_type": event_type_uri,
             "start_time": start_time,
@@ -133,6 +487,32 @@ class CalendlyClient:
         }
         return self._post("/invitees", payload)
 
+    def _check_slot(self, event_type_uri: str, start_time: str) -> None:
+        """Raises SlotUnavailableError unless a fresh, uncached request still lists the slot as available"""
+        start = parse_time(start_time)
+        if not start:
+            return
+        params = {
+            "event_type": event_type_uri,
+            "start_time": start_time,
+            "end_time": (start + timedelta(hours=1)).isoformat().replace("+00:00", "Z"),
+        }
+        slots = self._fetch("/event_type_available_times", params).get("collection", [])
+        if not any(
+            parse_time(slot.get("start_time")) == start and slot.get("status", "available") == "available"
+            for slot in slots
+        ):
+            self.clear_cache()
+            raise SlotUnavailableError(f"The slot at {start_time} is no longer available")
+
+    def create_webhook_subscription(
+        self, url: str, organization: str, events: list[str], signing_key: str | None = None
+    ) -> dict[str, Any]:
+        payload = {"url": url, "organization": organization, "scope": "organization", "events": events}
+        if signing_key:
+            payload["signing_key"] = signing_key
+        return self._post("/webhook_subscriptions", payload)
+
     def cancel_event(
         self,
         event_uuid: str,
@@ -141,3 +521,27 @@ class CalendlyClient:
             # TODO: "reason": reason,
         }
         return self._post(f"/scheduled_events/{event_uuid}/cancellation", payload)
+
+    # Records: the resources above decoded into typed records, for tool outputs and checkpoints
+
+    def current_user(self) -> User:
+        return User.from_api(self.get_current_user().get("resource", {}))
+
+    def event_types(self, organization: str | None = None, user: str | None = None) -> list[EventType]:
+        return [EventType.from_api(e) for e in self.list_event_types(organization=organization, user=user)]
+
+    def available_times(self, event_type: str, start_time: str, end_time: str, **params: Any) -> list[AvailableTime]:
+        slots = self.list_event_type_available_times(event_type, start_time, end_time, **params)
+        return [AvailableTime.from_api(slot) for slot in slots]
+
+    def scheduled_events(self, **params: Any) -> list[ScheduledEvent]:
+        return [ScheduledEvent.from_api(e) for e in self.list_scheduled_events(**params)]
+
+    def event_invitees(self, event_uri: str) -> list[Invitee]:
+        return [Invitee.from_api(i) for i in self.list_event_invitees(event_uri)]
+
+    def book_invitee(
+        self, event_type: str, start_time: str, invitee: dict[str, Any], location: dict[str, Any]
+    ) -> Invitee:
+        """Books the slot (see `create_invitee`) and returns the new invitee"""
+        return Invitee.from_api(self.create_invitee(event_type, start_time, invitee, location).get("resource", {}))
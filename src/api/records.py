@@ -0,0 +1,101 @@
+"""
+Typed Calendly records.
+
+Calendly resources carry dozens of fields the agent never reads (memberships, guests, notes, external calendar
+ids...). The records keep only the fields the tools, the slot calendar and the event mirror use, as frozen slotted
+dataclasses, and `to_dict` is their compact serialization for tool outputs and therefore checkpoints: fields
+without a value are left out.
+
+Responses are decoded with orjson, straight from their bytes.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Any, Self
+
+import orjson
+
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data)
+
+
+def decode_response(response: Any) -> Any:
+    """The decoded body of a `requests`-like response, parsed from its raw bytes when it has them"""
+    content = getattr(response, "content", None)
+    return loads(content) if isinstance(content, bytes | str) else response.json()
+
+
+class Record:
+    """Base of the records: compact serialization and decoding from the API's resources"""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, resource: dict[str, Any]) -> Self:
+        return cls(**{f.name: resource.get(f.name) for f in fields(cls)})
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Self:
+        """The inverse of `to_dict`"""
+        return cls(**data)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {f.name: value for f in fields(self) if (value := getattr(self, f.name)) is not None}
+
+
+@dataclass(frozen=True, slots=True)
+class User(Record):
+    uri: str
+    name: str | None = None
+    timezone: str | None = None
+    current_organization: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class EventType(Record):
+    uri: str
+    name: str | None = None
+    duration: int | None = None
+    active: bool | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class AvailableTime(Record):
+    start_time: str
+    status: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduledEvent(Record):
+    uri: str
+    name: str | None = None
+    status: str | None = None
+    start_time: str | None = None
+    end_time: str | None = None
+    event_type: str | None = None
+    location: str | None = None
+    updated_at: str | None = None
+
+    @classmethod
+    def from_api(cls, resource: dict[str, Any]) -> Self:
+        location = resource.get("location") or {}
+        return cls(
+            uri=resource["uri"],
+            name=resource.get("name"),
+            status=resource.get("status"),
+            start_time=resource.get("start_time"),
+            end_time=resource.get("end_time"),
+            event_type=resource.get("event_type"),
+            location=location.get("location") or location.get("join_url") or location.get("type"),
+            updated_at=resource.get("updated_at"),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Invitee(Record):
+    uri: str
+    event: str | None = None
+    name: str | None = None
+    email: str | None = None
+    status: str | None = None
+    timezone: str | None = None
@@ -0,0 +1,169 @@
+"""
+Circuit breaking and request hedging for external APIs.
+
+A `CircuitBreaker` opens after consecutive failed or slow calls and then fails fast, instead of letting every call
+wait out its timeout, until a single half-open probe succeeds. A `Hedger` sends a second, identical request once the
+first has been outstanding longer than the recent p95 latency of its endpoint, and returns whichever succeeds first.
+Hedge only idempotent requests.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
+
+from src.metrics import REGISTRY
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, counting calls slower than `slow_call_seconds` as failures.
+    After `reset_timeout` seconds open, one probe call is let through (half-open): it closes the breaker on success
+    and reopens it on failure.
+    """
+
+    def __init__(
+        self,
+        name: str = "calendly",
+        *,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 5.0,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        REGISTRY.set(f"{name}_breaker_state", BREAKER_STATES[self.state])
+
+    @classmethod
+    def from_env(cls, name: str = "calendly") -> "CircuitBreaker":
+        """ACME_BREAKER_FAILURES, ACME_BREAKER_SLOW_SECONDS and ACME_BREAKER_RESET_SECONDS override the defaults"""
+        return cls(
+            name,
+            failure_threshold=int(os.getenv("ACME_BREAKER_FAILURES", 5)),
+            slow_call_seconds=float(os.getenv("ACME_BREAKER_SLOW_SECONDS", 5)),
+            reset_timeout=float(os.getenv("ACME_BREAKER_RESET_SECONDS", 30)),
+        )
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logging.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+            self.state = state
+            REGISTRY.set(f"{self.name}_breaker_state", BREAKER_STATES[state])
+            REGISTRY.inc(f"{self.name}_breaker_transitions_total", state=state)
+
+    def before(self) -> None:
+        """Raises CircuitOpenError when the call must not be made"""
+        with self.lock:
+            if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+                self._transition("half_open")
+            if self.state == "open" or (self.state == "half_open" and self.probing):
+                REGISTRY.inc(f"{self.name}_breaker_rejected_total")
+                raise CircuitOpenError(f"{self.name} is unavailable, retry in a little while")
+            if self.state == "half_open":
+                self.probing = True
+
+    def release(self) -> None:
+        """Forgets a call let through by `before` whose outcome says nothing about the service"""
+        with self.lock:
+            self.probing = False
+
+    def record(self, ok: bool, elapsed: float = 0.0) -> None:
+        """Records the outcome of a call let through by `before`"""
+        ok = ok and elapsed <= self.slow_call_seconds
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.failures = 0
+                self._transition("closed")
+                return
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                self._transition("open")
+
+
+class Hedger:
+    """
+    Hedges calls per endpoint once `min_samples` latencies of its last `window` calls are known, after their
+    `quantile` latency (and at least `min_delay` seconds).
+    """
+
+    def __init__(
+        self,
+        name: str = "calendly",
+        *,
+        max_workers: int = 16,
+        quantile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 200,
+        min_delay: float = 0.05,
+    ):
+        self.name = name
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-hedge")
+        self.lock = threading.Lock()
+        self.latencies: dict[str, deque[float]] = {}
+
+    def delay(self, endpoint: str) -> float | None:
+        """How long to wait before hedging a call to `endpoint`, None until enough latencies are known"""
+        with self.lock:
+            samples = sorted(self.latencies.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return max(self.min_delay, samples[min(len(samples) - 1, int(self.quantile * len(samples)))])
+
+    def observe(self, endpoint: str, latency: float) -> None:
+        with self.lock:
+            self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(latency)
+
+    def _timed(self, endpoint: str, call: Callable[[], Any]) -> Any:
+        started = time.monotonic()
+        result = call()
+        self.observe(endpoint, time.monotonic() - started)
+        return result
+
+    def run(self, endpoint: str, call: Callable[[], Any]) -> Any:
+        delay = self.delay(endpoint)
+        if delay is None:
+            return self._timed(endpoint, call)
+
+        primary = self.executor.submit(self._timed, endpoint, call)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+        hedge = self.executor.submit(self._timed, endpoint, call)
+        REGISTRY.inc(f"{self.name}_hedges_total", endpoint=endpoint)
+        pending: set[Future] = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            # The first success wins, a failure only counts once both attempts failed
+            for future in sorted(done, key=lambda f: f is hedge):
+                if future.exception() is None or not pending:
+                    if future.exception() is None:
+                        winner = "hedge" if future is hedge else "primary"
+                        REGISTRY.inc(f"{self.name}_hedge_wins_total", endpoint=endpoint, winner=winner)
+                    return future.result()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
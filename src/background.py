@@ -0,0 +1,113 @@
+"""
+Background tool execution.
+
+Slow read-only tools (multi-week availability searches, listing a patient's events and their invitees) are started
+on a thread pool. If they do not finish within `wait` seconds, the tool node answers their calls with a pending
+result and the graph goes back to the patient with an interim message instead of blocking the turn. When the
+patient replies, the `background_results` node waits for whatever is still running and adds the results to the
+conversation as fresh tool calls, before the reply is classified and the intent's node continues.
+
+Only batches made entirely of BACKGROUND_TOOLS are deferred, so booking and cancelling always run in the foreground,
+and every deferred read is merged before the conversation can reach another tool call. Running tasks only live in
+this process: a conversation resumed elsewhere gets a failed result for them. A task still running `timeout` seconds
+after it started is dropped, while a finished result waits for the patient's reply for up to `retention` seconds.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_for
+from typing import Any
+
+from langchain_core.messages.tool import ToolCall
+
+from src.metrics import REGISTRY
+
+BACKGROUND_TOOLS = frozenset(
+    {
+        "list_calendly_event_type_available_times",
+        "list_calendly_scheduled_events",
+        "list_calendly_event_invitees",
+    }
+)
+
+PENDING_RESULT = "still running in the background, the result will be added to the conversation once it is ready"
+
+INTERIM_MESSAGE = (
+    "I'm still looking that up, it is taking a little longer than usual. "
+    "Reply whenever you are ready and I'll continue with what I found."
+)
+
+
+class BackgroundTools:
+    """
+    Runs deferrable tool calls on `max_workers` threads, for `wait` seconds in the foreground.
+    Results not ready within `timeout` seconds of the patient's reply count as failed. When tasks start, those still
+    running `timeout` seconds after their start and results nobody collected within `retention` seconds are swept.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        wait: float = 2.0,
+        timeout: float = 60.0,
+        retention: float = 60 * 60,
+        tools: frozenset[str] = BACKGROUND_TOOLS,
+    ):
+        self.wait = wait
+        self.timeout = timeout
+        self.retention = retention
+        self.tools = tools
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="background-tool")
+        self.lock = threading.Lock()
+        self.tasks: dict[str, tuple[float, Future]] = {}  # task id -> (started, future)
+
+    @classmethod
+    def from_env(cls) -> "BackgroundTools":
+        """ACME_BACKGROUND_WAIT, ACME_BACKGROUND_TIMEOUT and ACME_BACKGROUND_RETENTION override the defaults"""
+        return cls(
+            wait=float(os.getenv("ACME_BACKGROUND_WAIT", 2.0)),
+            timeout=float(os.getenv("ACME_BACKGROUND_TIMEOUT", 60.0)),
+            retention=float(os.getenv("ACME_BACKGROUND_RETENTION", 60 * 60)),
+        )
+
+    def defers(self, tool_calls: list[ToolCall]) -> bool:
+        return bool(tool_calls) and all(tool_call["name"] in self.tools for tool_call in tool_calls)
+
+    def start(self, tool_calls: list[ToolCall], run: Callable[[ToolCall], Any]) -> list[tuple[str, Future]]:
+        """Starts every call and waits up to `wait` seconds for all of them, returns the task ids and futures"""
+        tasks = [(uuid.uuid4().hex, self.executor.submit(run, tool_call)) for tool_call in tool_calls]
+        now = time.monotonic()
+        with self.lock:
+            self.sweep(now)
+            self.tasks.update((task_id, (now, future)) for task_id, future in tasks)
+        _, running = wait_for([future for _, future in tasks], timeout=self.wait)
+        if running:
+            REGISTRY.inc("background_tools_total", len(running), result="deferred")
+        return tasks
+
+    def sweep(self, now: float) -> None:
+        """Drops the hung tasks and the results of conversations the patient left. Needs the lock"""
+        expired = [
+            task_id
+            for task_id, (started, future) in self.tasks.items()
+            if now - started > (self.retention if future.done() else self.timeout)
+        ]
+        for task_id in expired:
+            self.tasks.pop(task_id)[1].cancel()
+        if expired:
+            REGISTRY.inc("background_tools_total", len(expired), result="abandoned")
+
+    def collect(self, task_id: str) -> Any:
+        """The result of a task, waiting for it if needed. Raises LookupError for unknown tasks, TimeoutError"""
+        with self.lock:
+            _, future = self.tasks.pop(task_id, (None, None))
+        if future is None:
+            raise LookupError(f"Unknown background task {task_id}")
+        return future.result(timeout=self.timeout)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,170 @@
+"""
+Checkpointer benchmark: memory per active session and checkpoint write latency per graph step,
+with tool results inline and stored by reference.
+
+    uv run python -m src.bench.checkpoint --sessions 200 --turns 10
+"""
+
+import argparse
+import gc
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from langchain.messages import AIMessage, HumanMessage
+from langchain.tools import BaseTool
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, StateGraph
+from langgraph.types import Command
+
+from src.agent import AssistantState, build_should_continue, build_tool_node, build_user_input_node
+from src.blobs import BlobStore
+from src.checkpoint import SQLiteSaver
+
+
+class ScheduledEventsPayloadTool(BaseTool):
+    """Returns a listing shaped like a 20 event /scheduled_events page"""
+
+    name: str = "list_calendly_scheduled_events"
+    description: str = "Benchmark payload"
+
+    def _run(self, input_str: str) -> list[dict[str, Any]]:
+        return [
+            {
+                "uri": f"https://api.calendly.com/scheduled_events/EVENT{i:04}",
+                "name": "Dental Check-up",
+                "status": "active",
+                "start_time": f"2030-01-{i % 28 + 1:02}T10:00:00.000000Z",
+                "end_time": f"2030-01-{i % 28 + 1:02}T10:30:00.000000Z",
+                "event_type": "https://api.calendly.com/event_types/CHECKUP",
+                "location": {"type": "physical", "location": "Acme Dental Lane"},
+                "invitees_counter": {"total": 1, "active": 1, "limit": 1},
+                "created_at": "2026-02-01T09:00:00.000000Z",
+                "updated_at": "2026-02-01T09:00:00.000000Z",
+            }
+            for i in range(20)
+        ]
+
+
+def scripted_assistant(state: AssistantState):
+    """Calls the listing tool once per user message, then answers"""
+    if isinstance(state["messages"][-1], HumanMessage):
+        call = {
+            "id": f"call_{len(state['messages'])}",
+            "name": "list_calendly_scheduled_events",
+            "args": {"input_str": "{}"},
+        }
+        return {"messages": [AIMessage(content="", tool_calls=[call])]}
+    return {"messages": [AIMessage(content="You have an appointment on January 1st at 10:00.")]}
+
+
+def build_graph(checkpointer: BaseCheckpointSaver, blob_store: BlobStore | None = None):
+    tool = ScheduledEventsPayloadTool()
+    builder = StateGraph(AssistantState)
+    builder.add_node("assistant", scripted_assistant)
+    builder.add_node("tools", build_tool_node({tool.name: tool}, blob_store))
+    builder.add_node("user_input", build_user_input_node())
+    builder.add_edge(START, "assistant")
+    builder.add_conditional_edges("assistant", build_should_continue("tools"), ["tools", "user_input"])
+    builder.add_edge("tools", "assistant")
+    builder.add_edge("user_input", "assistant")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def timed_puts(checkpointer: BaseCheckpointSaver, latencies: list[float]) -> None:
+    """Records the latency of every checkpoint write on the instance"""
+    put = checkpointer.put
+
+    def timed_put(*args: Any, **kwargs: Any):
+        start = time.perf_counter()
+        try:
+            return put(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    checkpointer.put = timed_put
+
+
+def run(
+    name: str,
+    factory: Callable[[], BaseCheckpointSaver],
+    sessions: int,
+    turns: int,
+    blob_store: BlobStore | None = None,
+) -> dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+
+    checkpointer = factory()
+    latencies: list[float] = []
+    timed_puts(checkpointer, latencies)
+    graph = build_graph(checkpointer, blob_store)
+
+    start = time.perf_counter()
+    for session in range(sessions):
+        config = {"configurable": {"thread_id": f"bench-{session}"}}
+        graph.invoke({"messages": [HumanMessage(content="What are my appointments?")]}, config=config)
+        for _ in range(turns - 1):
+            graph.invoke(Command(resume={"messages": [HumanMessage(content="And the next ones?")]}), config=config)
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "steps": len(latencies),
+        "put_p50_ms": statistics.median(latencies) * 1000,
+        "put_p99_ms": statistics.quantiles(latencies, n=100)[98] * 1000,
+        "heap_per_session_kb": (current - baseline) / sessions / 1024,
+        "wall_s": elapsed,
+    }
+    if isinstance(checkpointer, SQLiteSaver):
+        result["stored_per_session_kb"] = checkpointer.size_bytes() / sessions / 1024
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            run("memory", MemorySaver, args.sessions, args.turns),
+            run(
+                "sqlite",
+                lambda: SQLiteSaver(os.path.join(tmp, "bench.sqlite"), ttl_seconds=None, max_bytes=None),
+                args.sessions,
+                args.turns,
+            ),
+            run(
+                "sqlite+blobs",
+                lambda: SQLiteSaver(os.path.join(tmp, "bench-blobs.sqlite"), ttl_seconds=None, max_bytes=None),
+                args.sessions,
+                args.turns,
+                blob_store=BlobStore(os.path.join(tmp, "blobs.sqlite"), ttl_seconds=None),
+            ),
+        ]
+
+    print(f"{args.sessions} sessions x {args.turns} turns")
+    header = ["saver", "steps", "put p50 ms", "put p99 ms", "heap/session KB", "disk/session KB"]
+    print(f"{header[0]:<13} {header[1]:>6} {header[2]:>11} {header[3]:>11} {header[4]:>16} {header[5]:>16}")
+    for r in results:
+        stored = f"{r['stored_per_session_kb']:.1f}" if "stored_per_session_kb" in r else "-"
+        print(
+            f"{r['name']:<13} {r['steps']:>6} {r['put_p50_ms']:>11.3f} {r['put_p99_ms']:>11.3f} "
+            f"{r['heap_per_session_kb']:>16.1f} {stored:>16}"
+        )
+
+
+if __name__ == "__main__":
+    main()
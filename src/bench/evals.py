@@ -0,0 +1,196 @@
+"""
+Trajectory evaluation runner: runs the reference scenarios concurrently, each on its own thread id, scores them with
+the trajectory match evaluators and, with --judge, the LLM-as-judge, whose verdicts are cached by trajectory.
+
+    uv run python -m src.bench.evals --repeat 3 --concurrency 8 --judge
+    uv run python -m src.bench.evals --cassette .acme_dental/cassettes/evals.jsonl --record   # then replay it
+
+A verdict is reused whenever the same trajectory (ignoring generated ids) is judged against the same reference,
+so re-running an unchanged suite, e.g. replayed from a cassette, makes no judge calls.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from agentevals.trajectory.llm import TRAJECTORY_ACCURACY_PROMPT_WITH_REFERENCE, create_trajectory_llm_as_judge
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+
+from src.bench.routing import EVALUATORS, JUDGE_MODEL, build_eval_agent
+from src.bench.scenarios import SCENARIOS, Scenario
+from src.cassette import Cassette
+
+DEFAULT_VERDICT_CACHE = os.path.join(".acme_dental", "verdicts.sqlite")
+
+
+def trajectory_fingerprint(messages: list[AnyMessage]) -> list[Any]:
+    """The parts of a trajectory a judge looks at, without the ids generated on every run"""
+    return [
+        (
+            m.type,
+            m.content,
+            [(c["name"], c["args"]) for c in getattr(m, "tool_calls", None) or []],
+        )
+        for m in messages
+    ]
+
+
+class VerdictCache:
+    """Judge verdicts keyed by the SHA-256 of the judge, the trajectory and the reference"""
+
+    def __init__(self, path: str = DEFAULT_VERDICT_CACHE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, verdict TEXT NOT NULL)")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(judge_id: str, outputs: list[AnyMessage], reference_outputs: list[AnyMessage]) -> str:
+        parts = [judge_id, trajectory_fingerprint(outputs), trajectory_fingerprint(reference_outputs)]
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        with self.lock:
+            row = self.conn.execute("SELECT verdict FROM verdicts WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, verdict: dict[str, Any]) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO verdicts VALUES (?, ?)", (key, json.dumps(verdict, default=str)))
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def cached_judge(judge: Callable[..., dict[str, Any]], cache: VerdictCache, judge_id: str = JUDGE_MODEL):
+    """Wraps a trajectory judge so identical trajectories are only judged once"""
+
+    def judge_with_cache(*, outputs: list[AnyMessage], reference_outputs: list[AnyMessage], **kwargs: Any):
+        key = cache.key(judge_id, outputs, reference_outputs)
+        if (verdict := cache.get(key)) is not None:
+            cache.hits += 1
+            return verdict
+        cache.misses += 1
+        verdict = judge(outputs=outputs, reference_outputs=reference_outputs, **kwargs)
+        cache.put(key, verdict)
+        return verdict
+
+    return judge_with_cache
+
+
+def token_usage(messages: list[AnyMessage]) -> tuple[int, int]:
+    usages = [m.usage_metadata for m in messages if isinstance(m, AIMessage) and m.usage_metadata]
+    return sum(u["input_tokens"] for u in usages), sum(u["output_tokens"] for u in usages)
+
+
+async def run_scenario(agent, scenario: Scenario, judge, slots: asyncio.Semaphore) -> dict[str, Any]:
+    config = {"configurable": {"thread_id": f"eval-{scenario['name']}-{uuid.uuid4().hex}"}}
+    async with slots:
+        start = time.perf_counter()
+        try:
+            result = await agent.ainvoke({"messages": [HumanMessage(content=scenario["user_message"])]}, config=config)
+        except Exception as e:
+            return {"name": scenario["name"], "error": repr(e)}
+        latency = time.perf_counter() - start
+
+        outcome = {
+            "name": scenario["name"],
+            "latency": latency,
+            "intent_ok": (result.get("intent") or {}).get("intent") == scenario["intent"],
+            "trajectory_ok": bool(
+                EVALUATORS[scenario["match_mode"]](
+                    outputs=result["messages"], reference_outputs=scenario["reference_trajectory"]
+                )["score"]
+            ),
+            "tokens": token_usage(result["messages"]),
+        }
+        if judge:
+            verdict = await asyncio.to_thread(
+                judge, outputs=result["messages"], reference_outputs=scenario["reference_trajectory"]
+            )
+            outcome["judge_ok"] = bool(verdict["score"])
+        return outcome
+
+
+async def evaluate(agent, repeat: int, concurrency: int, judge=None) -> list[dict[str, Any]]:
+    # Sync graph nodes and judge calls run on the default thread pool
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(concurrency * 2))
+    slots = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(
+        *[run_scenario(agent, scenario, judge, slots) for _ in range(repeat) for scenario in SCENARIOS]
+    )
+
+
+def print_summary(outcomes: list[dict[str, Any]]) -> None:
+    header = ["scenario", "runs", "errors", "intent", "traj", "judge", "p50 s", "max s", "tokens in", "tokens out"]
+    print(
+        f"{header[0]:<22} {header[1]:>5} {header[2]:>7} {header[3]:>7} {header[4]:>6} {header[5]:>6} "
+        f"{header[6]:>7} {header[7]:>7} {header[8]:>10} {header[9]:>11}"
+    )
+    for name in [s["name"] for s in SCENARIOS] + ["all"]:
+        runs = [o for o in outcomes if name in ("all", o["name"])]
+        ok = [o for o in runs if "error" not in o]
+        if not ok:
+            print(f"{name:<22} {len(runs):>5} {len(runs):>7}")
+            continue
+        latencies = [o["latency"] for o in ok]
+        judged = [o["judge_ok"] for o in ok if "judge_ok" in o]
+        judge = f"{sum(judged) / len(judged):.2f}" if judged else "-"
+        print(
+            f"{name:<22} {len(runs):>5} {len(runs) - len(ok):>7} "
+            f"{sum(o['intent_ok'] for o in ok) / len(ok):>7.2f} {sum(o['trajectory_ok'] for o in ok) / len(ok):>6.2f} "
+            f"{judge:>6} {statistics.median(latencies):>7.2f} {max(latencies):>7.2f} "
+            f"{sum(o['tokens'][0] for o in ok):>10} {sum(o['tokens'][1] for o in ok):>11}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models-config", default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--judge", action="store_true", help="Also score trajectories with the LLM-as-judge")
+    parser.add_argument("--verdict-cache", default=DEFAULT_VERDICT_CACHE)
+    parser.add_argument("--cassette", default=None, help="Replay the model exchanges from this cassette")
+    parser.add_argument("--record", action="store_true", help="Record the cassette instead of replaying it")
+    args = parser.parse_args()
+    load_dotenv()
+
+    cassette = Cassette(args.cassette, mode="record" if args.record else "replay") if args.cassette else None
+    agent = build_eval_agent(args.models_config, cassette)
+    cache = VerdictCache(args.verdict_cache)
+    judge = None
+    if args.judge:
+        judge = cached_judge(
+            create_trajectory_llm_as_judge(prompt=TRAJECTORY_ACCURACY_PROMPT_WITH_REFERENCE, model=JUDGE_MODEL), cache
+        )
+
+    start = time.perf_counter()
+    outcomes = asyncio.run(evaluate(agent, args.repeat, args.concurrency, judge))
+    elapsed = time.perf_counter() - start
+
+    print_summary(outcomes)
+    print(f"\n{len(outcomes)} runs in {elapsed:.1f}s, judge calls: {cache.misses}, cached verdicts: {cache.hits}")
+    for outcome in outcomes:
+        if "error" in outcome:
+            print(f"{outcome['name']}: {outcome['error']}")
+    cache.close()
+    if cassette:
+        cassette.close()
+
+
+if __name__ == "__main__":
+    main()
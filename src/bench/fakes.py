@@ -0,0 +1,467 @@
+"""
+Offline stand-ins for the agent's external dependencies: a scripted chat model and an in-process Calendly backend.
+Together with `create_acme_dental_agent` they run the real graph, tools and Calendly client without network access.
+"""
+
+import ast
+import json
+import threading
+import time
+import uuid
+import zlib
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from urllib.parse import urlparse
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.config import get_config
+from langgraph.graph.state import CompiledStateGraph
+
+from src.agent import INTENT_TOOL, ROUTE_TOOL, create_acme_dental_agent
+from src.api.calendly import CalendlyClient
+from src.models import ModelRouter
+from src.prefetch import CalendlyPrefetcher
+
+BASE_URL = "https://api.calendly.com"
+USER_URI = f"{BASE_URL}/users/ACMEDENTALUSER01"
+ORGANIZATION_URI = f"{BASE_URL}/organizations/ACMEDENTALORG001"
+EVENT_TYPE_URI = f"{BASE_URL}/event_types/DENTALCHECKUP001"
+SLOT = timedelta(minutes=30)
+OPENING_HOURS = (9, 17)
+
+
+def isoformat(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000000Z")
+
+
+def parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class FakeResponse:
+    """The part of `requests.Response` the Calendly client relies on"""
+
+    def __init__(self, status_code: int, payload: dict[str, Any]):
+        self.status_code = status_code
+        self.payload = payload
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return str(self.payload)
+
+    def json(self) -> dict[str, Any]:
+        return self.payload
+
+
+class FakeCalendly:
+    """
+    In-process Calendly v2 backend for a single-dentist clinic, used as the CalendlyClient transport.
+
+    It is seeded with `seed_events` booked check-ups from `start` on, serves 30 minute slots within opening hours,
+    and sleeps `latency` seconds per request to stand in for the network round trip. Bookings and cancellations are
+    delivered as `invitee.created` and `invitee.canceled` webhook bodies to the callables in `webhooks`. Scripted
+    patients `claim` the slot they book, so concurrent conversations do not race for the same one.
+    """
+
+    def __init__(self, latency: float = 0.0, seed_events: int = 100, start: datetime | None = None):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.events: dict[str, dict[str, Any]] = {}
+        self.invitees: dict[str, list[dict[str, Any]]] = {}
+        self.requests: list[tuple[str, str, int]] = []
+        self.webhooks: list[Callable[[dict[str, Any]], None]] = []
+        self.outbox: list[dict[str, Any]] = []
+        self.claimed: set[str] = set()
+        self.start = start or datetime(2030, 1, 1, OPENING_HOURS[0], tzinfo=UTC)
+        moment = self.start
+        for i in range(seed_events):
+            self.book(moment, {"name": f"Patient {i}", "email": f"patient{i}@example.com"})
+            moment = self.next_slot(moment + SLOT)
+
+    @staticmethod
+    def next_slot(moment: datetime) -> datetime:
+        if moment.hour >= OPENING_HOURS[1]:
+            moment = (moment + timedelta(days=1)).replace(hour=OPENING_HOURS[0], minute=0)
+        return moment
+
+    def book(self, start_time: datetime, invitee: dict[str, Any]) -> dict[str, Any]:
+        event_uuid = uuid.uuid4().hex[:16].upper()
+        event_uri = f"{BASE_URL}/scheduled_events/{event_uuid}"
+        now = isoformat(datetime.now(UTC))
+        self.events[event_uuid] = {
+            "uri": event_uri,
+            "name": "Dental Check-up",
+            "status": "active",
+            "start_time": isoformat(start_time),
+            "end_time": isoformat(start_time + SLOT),
+            "event_type": EVENT_TYPE_URI,
+            "location": {"type": "physical", "location": "Acme Dental Lane"},
+            "invitees_counter": {"total": 1, "active": 1, "limit": 1},
+            "created_at": now,
+            "updated_at": now,
+        }
+        record = {
+            "uri": f"{event_uri}/invitees/{uuid.uuid4().hex[:16].upper()}",
+            "event": event_uri,
+            "status": "active",
+            "name": invitee.get("name"),
+            "email": invitee.get("email"),
+            "timezone": invitee.get("timezone", "UTC"),
+            "created_at": now,
+        }
+        self.invitees[event_uuid] = [record]
+        return record
+
+    def booked(self) -> set[str]:
+        return {e["start_time"] for e in self.events.values() if e["status"] == "active"}
+
+    def is_free(self, moment: datetime) -> bool:
+        on_grid = moment.minute in (0, 30) and not moment.second and not moment.microsecond
+        return on_grid and OPENING_HOURS[0] <= moment.hour < OPENING_HOURS[1] and isoformat(moment) not in self.booked()
+
+    def claim(self, offered: list[str]) -> str | None:
+        """The first of the offered slots that is still free and no other conversation claimed, now claimed"""
+        with self.lock:
+            for start_time in offered:
+                if start_time not in self.claimed and self.is_free(parse_time(start_time)):
+                    self.claimed.add(start_time)
+                    return start_time
+        return None
+
+    def available_times(self, start_time: str, end_time: str) -> list[dict[str, Any]]:
+        booked = self.booked()
+        start, end = parse_time(start_time), parse_time(end_time)
+        moment = start.replace(minute=0 if start.minute == 0 else 30, second=0, microsecond=0)
+        if moment < start:
+            moment += SLOT
+        slots = []
+        while moment + SLOT <= end:
+            if OPENING_HOURS[0] <= moment.hour < OPENING_HOURS[1] and isoformat(moment) not in booked:
+                slots.append({"status": "available", "start_time": isoformat(moment), "invitees_remaining": 1})
+            moment += SLOT
+        return slots
+
+    # requests-like transport
+
+    def get(self, url: str, params: dict[str, Any] | None = None, **kwargs: Any) -> FakeResponse:
+        return self.handle("GET", url, params or {})
+
+    def post(self, url: str, json: dict[str, Any] | None = None, **kwargs: Any) -> FakeResponse:
+        return self.handle("POST", url, json or {})
+
+    def handle(self, method: str, url: str, data: dict[str, Any]) -> FakeResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        parts = [part for part in urlparse(url).path.split("/") if part]
+        with self.lock:
+            response = self.route(method, parts, data)
+            self.requests.append((method, url, response.status_code))
+            outbox, self.outbox = self.outbox, []
+        for body in outbox:
+            for webhook in self.webhooks:
+                webhook(body)
+        return response
+
+    def notify(self, kind: str, event_uuid: str) -> None:
+        for invitee in self.invitees[event_uuid]:
+            payload = {**invitee, "scheduled_event": dict(self.events[event_uuid])}
+            self.outbox.append({"event": kind, "created_at": isoformat(datetime.now(UTC)), "payload": payload})
+
+    @staticmethod
+    def page(items: list[dict[str, Any]], data: dict[str, Any]) -> FakeResponse:
+        offset, count = int(data.get("page_token") or 0), int(data.get("count", 20))
+        token = str(offset + count) if offset + count < len(items) else None
+        pagination = {"count": len(items[offset : offset + count]), "next_page_token": token}
+        return FakeResponse(200, {"collection": items[offset : offset + count], "pagination": pagination})
+
+    def route(self, method: str, parts: list[str], data: dict[str, Any]) -> FakeResponse:
+        if method == "GET" and parts == ["users", "me"]:
+            user = {"uri": USER_URI, "name": "Acme Dental", "current_organization": ORGANIZATION_URI}
+            return FakeResponse(200, {"resource": user})
+        if method == "GET" and parts == ["event_types"]:
+            event_type = {"uri": EVENT_TYPE_URI, "name": "Dental Check-up", "duration": 30, "active": True}
+            return FakeResponse(200, {"collection": [event_type]})
+        if method == "GET" and parts == ["event_type_available_times"]:
+            return FakeResponse(200, {"collection": self.available_times(data["start_time"], data["end_time"])})
+        if method == "GET" and parts == ["scheduled_events"]:
+            status, min_start = data.get("status"), data.get("min_start_time")
+            events = [
+                e
+                for e in self.events.values()
+                if (not status or e["status"] == status)
+                and (not min_start or parse_time(e["start_time"]) >= parse_time(min_start))
+            ]
+            return self.page(events, data)
+        if method == "GET" and len(parts) == 3 and parts[0] == "scheduled_events" and parts[2] == "invitees":
+            if parts[1] not in self.invitees:
+                return FakeResponse(404, {"title": "Resource Not Found"})
+            return self.page(self.invitees[parts[1]], data)
+        if method == "POST" and parts == ["invitees"]:
+            if not self.is_free(parse_time(data["start_time"])):
+                return FakeResponse(400, {"title": "Invalid Argument", "message": "The slot is no longer available"})
+            invitee = self.book(parse_time(data["start_time"]), data["invitee"])
+            self.notify("invitee.created", invitee["event"].rsplit("/", 1)[-1])
+            return FakeResponse(201, {"resource": invitee})
+        if method == "POST" and len(parts) == 3 and parts[0] == "scheduled_events" and parts[2] == "cancellation":
+            event = self.events.get(parts[1])
+            if not event:
+                return FakeResponse(404, {"title": "Resource Not Found"})
+            if event["status"] != "active":
+                return FakeResponse(403, {"title": "Permission Denied", "message": "Event is already canceled"})
+            event["status"] = "canceled"
+            event["updated_at"] = isoformat(datetime.now(UTC))
+            for invitee in self.invitees[parts[1]]:
+                invitee["status"] = "canceled"
+            self.notify("invitee.canceled", parts[1])
+            return FakeResponse(201, {"resource": {"canceled_by": "Acme Dental", "reason": None}})
+        if method == "POST" and parts == ["invitee_no_shows"]:
+            return FakeResponse(201, {"resource": {"invitee": data.get("invitee")}})
+        return FakeResponse(404, {"title": "Resource Not Found"})
+
+
+# Scripted model
+
+# Tool name, and its arguments from the turn's messages and the Calendly backend the patients book with, if any
+Step = tuple[str, Callable[[list[AnyMessage], FakeCalendly | None], dict[str, Any]]]
+
+
+def background(message: BaseMessage) -> str | None:
+    """Whether the agent added the message for a tool left running in the background: pending, result or None"""
+    return message.response_metadata.get("background") if isinstance(message, AIMessage) else None
+
+
+def request_index(messages: list[BaseMessage]) -> int:
+    """
+    Where the patient's current request is: their last message, or the request a tool left running in the background
+    serves when the last one is only a vague reply to the interim message
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage) and not (
+            index
+            and background(messages[index - 1]) == "pending"
+            and classify(str(messages[index].content)) == "unclear"
+        ):
+            return index
+    return -1
+
+
+def turn_messages(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """The messages since the patient's current request"""
+    return messages[request_index(messages) + 1 :]
+
+
+# CPython 3.11's AST validation is not thread safe, concurrent literal_evals can fail with a SystemError
+LITERAL_EVAL_LOCK = threading.Lock()
+
+
+def tool_result(message: ToolMessage) -> Any:
+    """The result of a tool call, as the tool node wrapped it"""
+    try:
+        with LITERAL_EVAL_LOCK:
+            return ast.literal_eval(message.content)["result"]
+    except (ValueError, SyntaxError, KeyError, TypeError):
+        return None
+
+
+def last_result(messages: list[AnyMessage]) -> Any:
+    """The result of the most recent tool call"""
+    return tool_result(next(m for m in reversed(messages) if isinstance(m, ToolMessage)))
+
+
+def listed(result: Any) -> list[Any]:
+    """The items of a listing result, also when it was wrapped with its age"""
+    if isinstance(result, dict):
+        result = result.get("collection")
+    return result if isinstance(result, list) else []
+
+
+def pick(options: list[Any]) -> Any:
+    """Picks one of the options, always the same one within a conversation, so patients spread over the options"""
+    try:
+        thread_id = str(get_config()["configurable"].get("thread_id", ""))
+    except RuntimeError:
+        thread_id = ""
+    return options[zlib.crc32(thread_id.encode()) % len(options)]
+
+
+def patient_event(messages: list[AnyMessage]) -> str:
+    """The URI of the patient's event among the active events listed during the turn"""
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            events = [
+                item["uri"]
+                for item in listed(tool_result(message))
+                if isinstance(item, dict)
+                and item.get("status") == "active"
+                and "/scheduled_events/" in str(item.get("uri", ""))
+            ]
+            if events:
+                return pick(events)
+    return f"{BASE_URL}/scheduled_events/UNKNOWN"
+
+
+def patient_slot(messages: list[AnyMessage], calendly: FakeCalendly | None = None) -> str:
+    """One of the offered slots, with the backend one that is still free and no other conversation claimed"""
+    slots = listed(last_result(messages))
+    if not slots:
+        slots = [{"start_time": "2030-01-01T16:30:00.000000Z"}]
+    starts = [slot["start_time"] for slot in slots]
+    first = starts.index(pick(starts))
+    return (calendly and calendly.claim(starts[first:] + starts[:first])) or starts[first]
+
+
+def json_input(**payload: Any) -> dict[str, Any]:
+    return {"input_str": json.dumps(payload)}
+
+
+# The week after the seeded check-ups, with a free slot for each of the patients of a load run
+DAY = {"start_time": "2030-01-08T00:00:00Z", "end_time": "2030-01-14T23:59:59Z"}
+PATIENT = {"name": "Test Test", "email": "test@foo.com", "timezone": "UTC"}
+LOCATION = {"kind": "physical", "location": "Acme Dental Lane"}
+
+CURRENT_USER: Step = ("get_calendly_current_user", lambda m, _: {})
+EVENT_TYPES: Step = ("list_calendly_event_types", lambda m, _: json_input(user=USER_URI, organization=ORGANIZATION_URI))
+SCHEDULED: Step = (
+    "list_calendly_scheduled_events",
+    lambda m, _: json_input(user=USER_URI, organization=ORGANIZATION_URI),
+)
+INVITEES: Step = ("list_calendly_event_invitees", lambda m, _: {"event_uri": patient_event(m)})
+AVAILABLE: Step = (
+    "list_calendly_event_type_available_times",
+    lambda m, _: json_input(event_type=EVENT_TYPE_URI, **DAY),
+)
+BOOK: Step = (
+    "create_calendly_invitee",
+    lambda m, calendly: json_input(
+        event_type=EVENT_TYPE_URI, start_time=patient_slot(m, calendly), invitee=PATIENT, location=LOCATION
+    ),
+)
+CANCEL: Step = ("cancel_calendly_event", lambda m, _: json_input(event_uuid=patient_event(m).split("/")[-1]))
+
+PLANS: dict[str, list[Step]] = {
+    "schedule": [CURRENT_USER, EVENT_TYPES, AVAILABLE, BOOK],
+    "review": [CURRENT_USER, SCHEDULED, INVITEES],
+    "reschedule": [CURRENT_USER, SCHEDULED, INVITEES, EVENT_TYPES, AVAILABLE, BOOK, CANCEL],
+    "cancel": [CURRENT_USER, SCHEDULED, INVITEES, CANCEL],
+    "question": [
+        ("check_other_questions_we_can_answer", lambda m, _: {"input_str": ""}),
+        ("get_predefined_answer_to_other_questions", lambda m, _: json_input(question="Do you accept walk-ins?")),
+    ],
+}
+
+ANSWERS = {
+    "greet": "Hello! Welcome to Acme Dental. How can I help you today?",
+    "schedule": "You are booked in for a check-up.",
+    "review": "You have one check-up booked.",
+    "reschedule": "Your check-up has been moved.",
+    "cancel": "Your check-up has been cancelled.",
+    "question": "We do not accept walk-ins, all visits must be booked in advance.",
+    "unclear": "Sorry, could you tell me a bit more about what you need?",
+    "leave": "Thank you for contacting Acme Dental, goodbye!",
+}
+
+INTENT_KEYWORDS = [
+    ("reschedule", "reschedule"),
+    ("cancel", "cancel"),
+    ("appointments", "review"),
+    ("free appointment", "schedule"),
+    ("book", "schedule"),
+    ("bye", "leave"),
+    ("thank", "leave"),
+    ("?", "question"),
+]
+
+
+def classify(text: str) -> str:
+    text = text.lower()
+    return next((intent for keyword, intent in INTENT_KEYWORDS if keyword in text), "unclear")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model that plays the agent's part: it classifies the patient's message by keywords and
+    then works through a fixed tool plan per intent, one tool call per model call, before answering.
+    `latency` seconds are slept per call and token usage is estimated at four characters per token.
+    """
+
+    latency: float = 0.0
+    tool_names: tuple[str, ...] = ()
+    calendly: Any = None  # the FakeCalendly the patients book with
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        names = tuple(getattr(tool, "name", None) or getattr(tool, "__name__", None) or str(tool) for tool in tools)
+        return self.model_copy(update={"tool_names": names})
+
+    def _generate(
+        self, messages: list[BaseMessage], stop: list[str] | None = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        message = self.respond(messages)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        output_chars = len(str(message.content)) + len(str(message.tool_calls))
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": output_chars // 4,
+            "total_tokens": (prompt_chars + output_chars) // 4,
+        }
+        message.response_metadata = {"model_name": "scripted"}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def respond(self, messages: list[BaseMessage]) -> AIMessage:
+        if classifier := next((name for name in (INTENT_TOOL, ROUTE_TOOL) if name in self.tool_names), None):
+            human = messages[request_index(messages)]
+            intent = classify(str(human.content))
+            args = {"intent": intent, "topic": intent, "summary": str(human.content)[:80]}
+            return AIMessage(
+                content="", tool_calls=[{"id": f"call_{uuid.uuid4().hex}", "name": classifier, "args": args}]
+            )
+
+        node = get_config()["metadata"].get("langgraph_node", "unclear")
+        turn = turn_messages(messages)
+        # A merged background result answers a call the plan already made
+        done = sum(len(m.tool_calls) for m in turn if isinstance(m, AIMessage) and not background(m))
+        plan = PLANS.get(node, [])
+        if done < len(plan):
+            name, args = plan[done]
+            return AIMessage(
+                content="",
+                tool_calls=[{"id": f"call_{uuid.uuid4().hex}", "name": name, "args": args(turn, self.calendly)}],
+            )
+        return AIMessage(content=ANSWERS.get(node, ANSWERS["unclear"]))
+
+
+def build_offline_agent(
+    llm_latency: float = 0.0,
+    calendly_latency: float = 0.0,
+    prefetch: bool = False,
+    cache_ttl: float | None = None,
+    **kwargs: Any,
+) -> tuple[CompiledStateGraph, FakeCalendly]:
+    """
+    The production graph and tools, wired to the scripted model and an in-process Calendly.
+    With `prefetch`, the Calendly reads are prefetched for the week the scripted model asks about.
+    `cache_ttl` is the Calendly client's, ACME_CALENDLY_CACHE_TTL by default.
+    """
+    calendly = FakeCalendly(latency=calendly_latency)
+    model = ScriptedChatModel(latency=llm_latency, calendly=calendly)
+    client = CalendlyClient(api_token="offline", transport=calendly, cache_ttl=cache_ttl)
+    if prefetch:
+        kwargs["prefetcher"] = CalendlyPrefetcher(client, now=lambda: parse_time(DAY["start_time"]))
+    agent = create_acme_dental_agent(
+        calendly_client=client,
+        model_router=ModelRouter({"default": {"model": "scripted"}}, factory=lambda **spec: model),
+        **kwargs,
+    )
+    return agent, calendly
@@ -0,0 +1,156 @@
+"""
+Patient load generator: drives concurrent simulated conversations through the compiled agent graph
+(greeting, request, goodbye, resuming from the user_input interrupt in between), with the scripted model and the
+in-process Calendly backend standing in for the real services.
+
+    uv run python -m src.bench.load --patients 10 50 200 --llm-latency 0.5 --calendly-latency 0.1 --think-time 2
+
+Reports throughput, turn latency percentiles per intent, error rates and the Calendly request volume at each
+concurrency level. Sync graph nodes run on the event loop's default thread pool, sized with --workers.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.types import Command
+
+from src.bench.fakes import build_offline_agent
+from src.bench.offline import GOODBYE, GREETING, percentile
+from src.bench.scenarios import SCENARIOS, Scenario
+
+
+class LoadStats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.turns: dict[str, int] = defaultdict(int)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.tool_errors: dict[str, int] = defaultdict(int)
+
+    def record(self, intent: str, latency: float, result: dict[str, Any] | None, new_messages: int) -> None:
+        self.turns[intent] += 1
+        if result is None:
+            self.errors[intent] += 1
+            return
+        self.latencies[intent].append(latency)
+        added = result["messages"][-new_messages:] if new_messages else []
+        self.tool_errors[intent] += sum(isinstance(m, ToolMessage) and "tool failed" in str(m.content) for m in added)
+
+
+async def patient(
+    agent, session_id: str, scenario: Scenario, think_time: float, rng: random.Random, stats: LoadStats
+) -> None:
+    config = {"configurable": {"thread_id": session_id}}
+    turns = [
+        ("greet", {"messages": [HumanMessage(content=GREETING)]}),
+        (scenario["intent"], Command(resume={"messages": [HumanMessage(content=scenario["user_message"])]})),
+        ("leave", Command(resume={"messages": [HumanMessage(content=GOODBYE)]})),
+    ]
+    seen = 0
+    for index, (intent, turn) in enumerate(turns):
+        if index and think_time:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think_time)
+        start = time.perf_counter()
+        try:
+            result = await agent.ainvoke(turn, config=config)
+        except Exception:
+            stats.record(intent, time.perf_counter() - start, None, 0)
+            return
+        stats.record(intent, time.perf_counter() - start, result, len(result["messages"]) - seen)
+        seen = len(result["messages"])
+
+
+async def run(
+    patients: int,
+    llm_latency: float,
+    calendly_latency: float,
+    think_time: float,
+    seed: int,
+    cache_ttl: float | None = None,
+) -> dict:
+    agent, calendly = build_offline_agent(llm_latency, calendly_latency, cache_ttl=cache_ttl)
+    stats = LoadStats()
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            patient(agent, f"load-{i}", SCENARIOS[i % len(SCENARIOS)], think_time, random.Random(rng.random()), stats)
+            for i in range(patients)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+    calendly_errors = sum(status >= 400 for _, _, status in calendly.requests)
+    return {
+        "patients": patients,
+        "elapsed": elapsed,
+        "stats": stats,
+        "calendly_requests": len(calendly.requests),
+        "calendly_errors": calendly_errors,
+    }
+
+
+def report(result: dict) -> None:
+    stats: LoadStats = result["stats"]
+    turns = sum(stats.turns.values())
+    errors = sum(stats.errors.values())
+    print(
+        f"\n{result['patients']} patients: {turns / result['elapsed']:.1f} turns/s over {result['elapsed']:.1f}s, "
+        f"{errors / turns:.1%} failed turns, {result['calendly_requests']} Calendly requests "
+        f"({result['calendly_requests'] / result['elapsed']:.1f}/s, "
+        f"{result['calendly_requests'] / result['patients']:.1f}/patient, {result['calendly_errors']} errors)"
+    )
+    header = ["intent", "turns", "p50 ms", "p95 ms", "p99 ms", "errors", "tool errors"]
+    print(f"{header[0]:<12} {header[1]:>6} {header[2]:>9} {header[3]:>9} {header[4]:>9} {header[5]:>7} {header[6]:>12}")
+    for intent in sorted(stats.turns):
+        latencies = stats.latencies[intent] or [float("nan")]
+        print(
+            f"{intent:<12} {stats.turns[intent]:>6} {statistics.median(latencies) * 1000:>9.1f} "
+            f"{percentile(latencies, 95) * 1000:>9.1f} {percentile(latencies, 99) * 1000:>9.1f} "
+            f"{stats.errors[intent]:>7} {stats.tool_errors[intent]:>12}"
+        )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(args.workers or max(args.patients)))
+    print(
+        f"llm latency {args.llm_latency}s, calendly latency {args.calendly_latency}s, think time {args.think_time}s, "
+        f"{args.workers or max(args.patients)} workers"
+    )
+    results = []
+    for patients in args.patients:
+        results.append(await run(patients, args.llm_latency, args.calendly_latency, args.think_time, args.seed))
+        report(results[-1])
+
+    print(f"\n{'patients':>8} {'turns/s':>8} {'calendly/s':>11} {'calendly/patient':>17} {'calendly errors':>16}")
+    for r in results:
+        turns = sum(r["stats"].turns.values())
+        error_rate = r["calendly_errors"] / max(r["calendly_requests"], 1)
+        print(
+            f"{r['patients']:>8} {turns / r['elapsed']:>8.1f} {r['calendly_requests'] / r['elapsed']:>11.1f} "
+            f"{r['calendly_requests'] / r['patients']:>17.1f} {error_rate:>16.1%}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, nargs="+", default=[10, 50, 200], help="Concurrency levels")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per scripted model call")
+    parser.add_argument("--calendly-latency", type=float, default=0.1, help="Seconds per Calendly request")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds a patient takes to reply")
+    parser.add_argument("--workers", type=int, default=None, help="Threads for sync graph nodes, default: patients")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # Failed tool calls are expected under contention and counted, not logged
+    logging.basicConfig(level=logging.CRITICAL)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
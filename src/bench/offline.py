@@ -0,0 +1,159 @@
+"""
+Offline agent benchmark: runs the reference scenarios through the production graph, tools and Calendly client,
+with the scripted chat model and the in-process Calendly backend, and compares the results with a stored baseline.
+Each session is a greeting, the scenario request and a goodbye.
+
+    uv run python -m src.bench.offline --sessions 50
+    uv run python -m src.bench.offline --llm-latency 0.5 --calendly-latency 0.1 --no-baseline
+    uv run python -m src.bench.offline --llm-latency 0.5 --no-baseline --prefetch --calendly-cache-ttl 30
+    uv run python -m src.bench.offline --save-baseline
+
+Exits with status 1 when a gated metric regressed by more than the tolerance against the baseline. A change that
+moves a gated metric refreshes the baseline in the same commit, `src/test_offline.py` checks the host independent ones.
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from src.bench.fakes import build_offline_agent
+from src.bench.scenarios import SCENARIOS, Scenario
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "offline.json")
+GREETING = "hello, my timezone is UTC"
+GOODBYE = "Thanks, bye"
+
+# Gated metric -> whether higher is better. p99 over a few dozen turns swings too much between runs, it is only reported
+METRICS = {"turns_per_s": True, "p50_ms": False, "llm_calls_per_turn": False, "kb_per_session": False}
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+def converse(agent, session_id: str, scenario: Scenario, latencies: list[float], llm_calls: list[int]) -> None:
+    """Plays one session, recording the latency and model calls of each turn"""
+    config = {"configurable": {"thread_id": session_id}}
+    turns = [{"messages": [HumanMessage(content=GREETING)]}] + [
+        Command(resume={"messages": [HumanMessage(content=content)]}) for content in (scenario["user_message"], GOODBYE)
+    ]
+    calls = 0
+    for turn in turns:
+        start = time.perf_counter()
+        result = agent.invoke(turn, config=config)
+        latencies.append(time.perf_counter() - start)
+        llm_calls.append(result["llm_calls"] - calls)
+        calls = result["llm_calls"]
+
+
+def run(
+    scenario: Scenario,
+    sessions: int,
+    llm_latency: float,
+    calendly_latency: float,
+    prefetch: bool = False,
+    cache_ttl: float | None = None,
+) -> dict[str, float]:
+    agent, _ = build_offline_agent(llm_latency, calendly_latency, prefetch=prefetch, cache_ttl=cache_ttl)
+    latencies: list[float] = []
+    llm_calls: list[int] = []
+    start = time.perf_counter()
+    for session in range(sessions):
+        converse(agent, f"{scenario['name']}-{session}", scenario, latencies, llm_calls)
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured in a separate pass, tracing allocations would skew the latencies
+    agent, _ = build_offline_agent(prefetch=prefetch, cache_ttl=cache_ttl)
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for session in range(sessions):
+        converse(agent, f"{scenario['name']}-{session}", scenario, [], [])
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "turns_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "llm_calls_per_turn": sum(llm_calls) / len(llm_calls),
+        "kb_per_session": (current - baseline) / sessions / 1024,
+    }
+
+
+def regressions(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float):
+    for name, metrics in results.items():
+        for metric, higher_is_better in METRICS.items():
+            if metric not in baseline.get(name, {}):
+                continue
+            before, after = baseline[name][metric], metrics[metric]
+            change = (after - before) / before if before else 0.0
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                yield name, metric, before, after
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per scripted model call")
+    parser.add_argument("--calendly-latency", type=float, default=0.0, help="Seconds per Calendly request")
+    parser.add_argument("--prefetch", action="store_true", help="Prefetch the Calendly reads of scheduling intents")
+    parser.add_argument("--calendly-cache-ttl", type=float, default=None, help="Seconds Calendly reads are cached")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--no-baseline", action="store_true", help="Do not compare with the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression per metric")
+    args = parser.parse_args()
+
+    results = {
+        s["name"]: run(
+            s, args.sessions, args.llm_latency, args.calendly_latency, args.prefetch, args.calendly_cache_ttl
+        )
+        for s in SCENARIOS
+    }
+    baseline: dict[str, dict[str, float]] = {}
+    if not args.no_baseline and not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{args.sessions} sessions x 3 turns per scenario")
+    header = ["scenario", "turns/s", "p50 ms", "p99 ms", "llm/turn", "KB/session"]
+    print(f"{header[0]:<22} {header[1]:>9} {header[2]:>9} {header[3]:>9} {header[4]:>9} {header[5]:>11}")
+    for name, r in results.items():
+        print(
+            f"{name:<22} {r['turns_per_s']:>9.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['llm_calls_per_turn']:>9.2f} {r['kb_per_session']:>11.1f}"
+        )
+        if name in baseline:
+            b = baseline[name]
+            print(
+                f"{'  baseline':<22} {b['turns_per_s']:>9.1f} {b['p50_ms']:>9.2f} {b['p99_ms']:>9.2f} "
+                f"{b['llm_calls_per_turn']:>9.2f} {b['kb_per_session']:>11.1f}"
+            )
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    regressed = list(regressions(results, baseline, args.tolerance))
+    for name, metric, before, after in regressed:
+        print(f"REGRESSION {name} {metric}: {before:.2f} -> {after:.2f}")
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Records benchmark: decode time, memory and tool output size of Calendly listings as full dicts and as records.
+
+Pages are shaped like the API's, with the memberships, guests, calendar and tracking fields the agent never reads.
+Every listing is decoded with the standard library's json and with `loads` (orjson), then turned into records; the
+heap is what a decoded page keeps alive, and the tool output is the `str` of the tool message wrapper that ends up in
+the checkpoints.
+
+    uv run python -m src.bench.records --events 100 --repeat 200
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from src.api.records import Invitee, ScheduledEvent, loads
+
+BASE_URL = "https://api.calendly.com"
+
+
+def scheduled_event(i: int) -> dict[str, Any]:
+    return {
+        "uri": f"{BASE_URL}/scheduled_events/EVENT{i:04}",
+        "name": "Dental Check-up",
+        "meeting_notes_plain": "Bring your insurance card.",
+        "meeting_notes_html": "<p>Bring your insurance card.</p>",
+        "status": "active",
+        "start_time": f"2030-01-{i % 28 + 1:02}T10:00:00.000000Z",
+        "end_time": f"2030-01-{i % 28 + 1:02}T10:30:00.000000Z",
+        "event_type": f"{BASE_URL}/event_types/CHECKUP",
+        "location": {"type": "physical", "location": "Acme Dental Lane", "additional_info": "Second floor"},
+        "invitees_counter": {"total": 1, "active": 1, "limit": 1},
+        "created_at": "2026-02-01T09:00:00.000000Z",
+        "updated_at": "2026-02-01T09:00:00.000000Z",
+        "event_memberships": [
+            {
+                "user": f"{BASE_URL}/users/DENTIST",
+                "user_email": "dentist@acme-dental.example",
+                "user_name": "Dr. Acme",
+                "buffered_start_time": f"2030-01-{i % 28 + 1:02}T09:50:00.000000Z",
+                "buffered_end_time": f"2030-01-{i % 28 + 1:02}T10:40:00.000000Z",
+            }
+        ],
+        "event_guests": [
+            {"email": f"guest{i}@example.com", "created_at": "2026-02-01T09:00:00.000000Z", "updated_at": None}
+        ],
+        "calendar_event": {"kind": "google", "external_id": f"{i:032x}"},
+    }
+
+
+def invitee(i: int) -> dict[str, Any]:
+    event = f"{BASE_URL}/scheduled_events/EVENT{i:04}"
+    return {
+        "uri": f"{event}/invitees/INVITEE{i:04}",
+        "event": event,
+        "name": f"Patient {i}",
+        "first_name": "Patient",
+        "last_name": str(i),
+        "email": f"patient{i}@example.com",
+        "status": "active",
+        "timezone": "Europe/Dublin",
+        "text_reminder_number": None,
+        "rescheduled": False,
+        "old_invitee": None,
+        "new_invitee": None,
+        "cancel_url": f"https://calendly.com/cancellations/INVITEE{i:04}",
+        "reschedule_url": f"https://calendly.com/reschedulings/INVITEE{i:04}",
+        "questions_and_answers": [{"question": "Reason for the visit?", "answer": "Check-up", "position": 0}],
+        "tracking": {"utm_campaign": None, "utm_source": None, "utm_medium": None, "utm_content": None},
+        "no_show": None,
+        "payment": None,
+        "reconfirmation": None,
+        "scheduling_method": None,
+        "invitee_scheduled_by": None,
+        "routing_form_submission": None,
+        "created_at": "2026-02-01T09:00:00.000000Z",
+        "updated_at": "2026-02-01T09:00:00.000000Z",
+    }
+
+
+def page(items: list[dict[str, Any]]) -> bytes:
+    body = {"collection": items, "pagination": {"count": len(items), "next_page": None, "next_page_token": None}}
+    return json.dumps(body).encode()
+
+
+def per_call_us(call: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def retained_kb(build: Callable[[], Any]) -> float:
+    """Heap kept alive by the result of `build`"""
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size / 1024
+
+
+def run(name: str, body: bytes, record: type, repeat: int) -> dict[str, Any]:
+    def records() -> list:
+        return [record.from_api(item) for item in loads(body)["collection"]]
+
+    raw = json.loads(body)["collection"]
+    compact = [r.to_dict() for r in records()]
+    return {
+        "name": name,
+        "json_us": per_call_us(lambda: json.loads(body), repeat),
+        "loads_us": per_call_us(lambda: loads(body), repeat),
+        "records_us": per_call_us(records, repeat),
+        "dicts_kb": retained_kb(lambda: json.loads(body)["collection"]),
+        "records_kb": retained_kb(records),
+        "raw_output_kb": len(str({"result": raw, "type": "json"})) / 1024,
+        "compact_output_kb": len(str({"result": compact, "type": "json"})) / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100, help="Items per page")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    results = [
+        run("scheduled_events", page([scheduled_event(i) for i in range(args.events)]), ScheduledEvent, args.repeat),
+        run("invitees", page([invitee(i) for i in range(args.events)]), Invitee, args.repeat),
+    ]
+
+    print(f"{args.events} items per page")
+    print(
+        f"{'page':<17} {'json us':>8} {'loads us':>9} {'+records us':>12} "
+        f"{'dicts KB':>9} {'records KB':>11} {'output KB':>10} {'compact KB':>11}"
+    )
+    for r in results:
+        print(
+            f"{r['name']:<17} {r['json_us']:>8.0f} {r['loads_us']:>9.0f} {r['records_us']:>12.0f} "
+            f"{r['dicts_kb']:>9.1f} {r['records_kb']:>11.1f} "
+            f"{r['raw_output_kb']:>10.1f} {r['compact_output_kb']:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Replays the conversations recorded in a cassette through the current graph, with the model and Calendly exchanges
+served from the cassette, and compares each turn's latency with the recording.
+
+    uv run python -m src.main --record .acme_dental/cassettes/visit.jsonl   # record a real conversation
+    uv run python -m src.bench.replay .acme_dental/cassettes/visit.jsonl --latency recorded
+
+With `--latency zero` the numbers are the agent's own overhead. With `--latency recorded` they show what a change
+(e.g. caching Calendly calls) would have saved on the recorded conversation. Recorded turn times span the first
+to the last external call of the turn.
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+from typing import Any
+
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from src.agent import create_acme_dental_agent
+from src.cassette import Cassette
+
+
+def recorded_turns(cassette: Cassette) -> dict[str, list[dict[str, Any]]]:
+    """The user turns of every recorded thread, in order, with the time the turn took in the recording"""
+    turns: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for entry in cassette.entries:
+        thread = turns[entry["thread_id"]]
+        if entry["kind"] == "model" and (not thread or thread[-1]["content"] != entry["turn"]):
+            thread.append({"content": entry["turn"], "start": entry["offset_s"], "end": entry["offset_s"]})
+        if thread:
+            thread[-1]["end"] = max(thread[-1]["end"], entry["offset_s"] + entry["duration_s"])
+    return {thread_id: thread for thread_id, thread in turns.items() if thread}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cassette")
+    parser.add_argument("--latency", choices=["zero", "recorded"], default="zero")
+    parser.add_argument("--models-config", default=None, help="Models configuration to replay with")
+    parser.add_argument("--single-call-routing", action="store_true")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette, latency=args.latency)
+    agent = create_acme_dental_agent(
+        model_router=cassette.model_router(args.models_config),
+        calendly_client=cassette.calendly_client(),
+        single_call_routing=args.single_call_routing,
+    )
+
+    print(f"{'thread':<10} {'turn':<40} {'recorded ms':>12} {'replay ms':>10}")
+    recorded, replayed = [], []
+    for thread_id, turns in recorded_turns(cassette).items():
+        config = {"configurable": {"thread_id": thread_id}}
+        for turn in turns:
+            message = {"messages": [HumanMessage(role="user", content=turn["content"])]}
+            start = time.perf_counter()
+            if agent.get_state(config).interrupts:
+                agent.invoke(Command(resume=message), config=config)
+            else:
+                agent.invoke(message, config=config)
+            replayed.append((time.perf_counter() - start) * 1000)
+            recorded.append((turn["end"] - turn["start"]) * 1000)
+            print(f"{thread_id[:10]:<10} {turn['content'][:40]:<40} {recorded[-1]:>12.1f} {replayed[-1]:>10.1f}")
+
+    print(
+        f"\n{len(replayed)} turns, median {statistics.median(recorded):.1f} ms recorded vs "
+        f"{statistics.median(replayed):.1f} ms replayed, {cassette.played} exchanges replayed, "
+        f"{cassette.misses} without an exact match, "
+        f"{sum(not e['played'] for e in cassette.entries)} recorded exchanges never requested"
+    )
+
+
+if __name__ == "__main__":
+    main()
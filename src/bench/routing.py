@@ -0,0 +1,148 @@
+"""
+Model routing evaluation: compares turn latency and trajectory accuracy of a candidate node -> model configuration
+against a baseline (all-Sonnet by default) on the reference scenarios, using the mock Calendly tools.
+
+Needs ANTHROPIC_API_KEY (and OPENAI_API_KEY with --judge), unless the model exchanges are replayed from a cassette.
+
+    uv run python -m src.bench.routing --candidate src/config/models.routing.toml --repeat 3
+    uv run python -m src.bench.routing --candidate src/config/models.routing.toml --cassette routing.jsonl --record
+"""
+
+import argparse
+import logging
+import statistics
+import time
+import uuid
+from typing import Any
+
+from agentevals.trajectory.llm import TRAJECTORY_ACCURACY_PROMPT_WITH_REFERENCE, create_trajectory_llm_as_judge
+from agentevals.trajectory.match import create_trajectory_match_evaluator
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage
+
+from src.agent import create_acme_dental_agent
+from src.api.calendly import CalendlyClient
+from src.bench.scenarios import SCENARIOS, Scenario
+from src.cassette import Cassette
+from src.models import DEFAULT_MODELS_CONFIG, ModelRouter
+from src.tools import (
+    build_cancelling_tools_for_tests,
+    build_questions_tools_for_tests,
+    build_rescheduling_tools_for_tests,
+    build_reviewing_tools_for_tests,
+    build_scheduling_tools_for_tests,
+)
+
+JUDGE_MODEL = "openai:o3-mini"
+
+EVALUATORS = {
+    mode: create_trajectory_match_evaluator(trajectory_match_mode=mode, tool_args_match_mode="ignore")
+    for mode in ["strict", "superset"]
+}
+
+
+def build_eval_agent(models_config: str | None, cassette: Cassette | None = None):
+    calendly_client = CalendlyClient(api_token="mock")
+    intent_tool_sets = {
+        "question": build_questions_tools_for_tests(),
+        "schedule": build_scheduling_tools_for_tests(calendly_client),
+        "review": build_reviewing_tools_for_tests(calendly_client),
+        "reschedule": build_rescheduling_tools_for_tests(calendly_client),
+        "cancel": build_cancelling_tools_for_tests(calendly_client),
+        "leave": {},
+    }
+    return create_acme_dental_agent(
+        intent_tool_sets=intent_tool_sets,
+        greet=False,
+        model_router=cassette.model_router(models_config) if cassette else ModelRouter.from_config(models_config),
+        calendly_api_token="mock",
+    )
+
+
+def run_scenario(agent, scenario: Scenario, judge=None) -> dict[str, Any]:
+    config = {"configurable": {"thread_id": f"eval-{uuid.uuid4().hex}"}}
+    start = time.perf_counter()
+    result = agent.invoke({"messages": [HumanMessage(content=scenario["user_message"])]}, config=config)
+    latency = time.perf_counter() - start
+
+    evaluator = EVALUATORS[scenario["match_mode"]]
+    outcome = {
+        "latency": latency,
+        "intent_ok": (result.get("intent") or {}).get("intent") == scenario["intent"],
+        "trajectory_ok": bool(
+            evaluator(outputs=result["messages"], reference_outputs=scenario["reference_trajectory"])["score"]
+        ),
+    }
+    if judge:
+        verdict = judge(outputs=result["messages"], reference_outputs=scenario["reference_trajectory"])
+        outcome["judge_ok"] = bool(verdict["score"])
+    return outcome
+
+
+def evaluate(
+    models_config: str, repeat: int, judge=None, cassette: Cassette | None = None
+) -> dict[str, list[dict[str, Any]]]:
+    agent = build_eval_agent(models_config, cassette)
+    results: dict[str, list[dict[str, Any]]] = {scenario["name"]: [] for scenario in SCENARIOS}
+    for _ in range(repeat):
+        for scenario in SCENARIOS:
+            try:
+                results[scenario["name"]].append(run_scenario(agent, scenario, judge))
+            except Exception as e:
+                logging.error(f"{scenario['name']}: {e}")
+                results[scenario["name"]].append({"latency": float("nan"), "intent_ok": False, "trajectory_ok": False})
+    return results
+
+
+def summarize(runs: list[dict[str, Any]]) -> dict[str, float]:
+    latencies = [r["latency"] for r in runs if r["latency"] == r["latency"]]
+    summary = {
+        "p50_s": statistics.median(latencies) if latencies else float("nan"),
+        "intent": sum(r["intent_ok"] for r in runs) / len(runs),
+        "trajectory": sum(r["trajectory_ok"] for r in runs) / len(runs),
+    }
+    if any("judge_ok" in r for r in runs):
+        summary["judge"] = sum(r.get("judge_ok", False) for r in runs) / len(runs)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--baseline", default=DEFAULT_MODELS_CONFIG)
+    parser.add_argument("--candidate", required=True)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--judge", action="store_true", help="Also score trajectories with the LLM-as-judge")
+    parser.add_argument("--cassette", default=None, help="Replay the model exchanges of both setups from this cassette")
+    parser.add_argument("--record", action="store_true", help="Record the cassette instead of replaying it")
+    args = parser.parse_args()
+    load_dotenv()
+
+    cassette = Cassette(args.cassette, mode="record" if args.record else "replay") if args.cassette else None
+    judge = (
+        create_trajectory_llm_as_judge(prompt=TRAJECTORY_ACCURACY_PROMPT_WITH_REFERENCE, model=JUDGE_MODEL)
+        if args.judge
+        else None
+    )
+    results = {
+        "baseline": evaluate(args.baseline, args.repeat, judge, cassette),
+        "candidate": evaluate(args.candidate, args.repeat, judge, cassette),
+    }
+    if cassette:
+        cassette.close()
+
+    print(f"{'scenario':<22} {'setup':<10} {'p50 s':>7} {'intent':>7} {'traj':>6} {'judge':>6}")
+    for scenario in SCENARIOS:
+        for setup, by_scenario in results.items():
+            s = summarize(by_scenario[scenario["name"]])
+            judged = f"{s['judge']:.2f}" if "judge" in s else "-"
+            print(
+                f"{scenario['name']:<22} {setup:<10} {s['p50_s']:>7.2f} {s['intent']:>7.2f} "
+                f"{s['trajectory']:>6.2f} {judged:>6}"
+            )
+    for setup, by_scenario in results.items():
+        s = summarize([run for runs in by_scenario.values() for run in runs])
+        print(f"{'all':<22} {setup:<10} {s['p50_s']:>7.2f} {s['intent']:>7.2f} {s['trajectory']:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
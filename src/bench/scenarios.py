@@ -0,0 +1,117 @@
+"""Reference conversations shared by the benchmarks and evaluation harnesses"""
+
+from typing import Literal
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+from typing_extensions import TypedDict
+
+
+class Scenario(TypedDict):
+    name: str
+    intent: str
+    user_message: str
+    reference_trajectory: list[AnyMessage]
+    match_mode: Literal["strict", "superset"]
+
+
+def tool_call(call_id: str, name: str, args: dict) -> list[AnyMessage]:
+    return [
+        AIMessage(content="", tool_calls=[{"id": call_id, "name": name, "args": args}]),
+        ToolMessage(content="", tool_call_id=call_id),
+    ]
+
+
+REVIEW_MESSAGE = "What are my appointments?"
+SCHEDULE_MESSAGE = "Do you have a free appointment slot on January 1st 2030 for a Dental checkup"
+RESCHEDULE_MESSAGE = (
+    "I'd like to reschedule my January 1st 10:30 appointment to 11am on the same day. My email is 'test@foo.com'"
+)
+CANCEL_MESSAGE = (
+    "I'd like to cancel my appointment on January 1st, 2030. My name is 'Test Test' and my email is 'test@foo.com'"
+)
+QUESTION_MESSAGE = "Can I just come in to the clinic without an appointment?"
+
+SCENARIOS: list[Scenario] = [
+    {
+        "name": "review_without_email",
+        "intent": "review",
+        "user_message": REVIEW_MESSAGE,
+        "reference_trajectory": [HumanMessage(content=REVIEW_MESSAGE), AIMessage(content="", tool_calls=[])],
+        "match_mode": "strict",
+    },
+    {
+        "name": "schedule",
+        "intent": "schedule",
+        "user_message": SCHEDULE_MESSAGE,
+        "reference_trajectory": [
+            HumanMessage(content=SCHEDULE_MESSAGE),
+            *tool_call("call_1", "get_calendly_current_user", {}),
+            *tool_call("call_2", "list_calendly_event_types", {"input_str": '{"user": "xyz", "organization": "xyz"}'}),
+            *tool_call(
+                "call_3",
+                "list_calendly_event_type_available_times",
+                {
+                    "input_str": (
+                        '{"event_type": "1", "start_time": "2030-01-01T00:00:00Z", "end_time": "2030-01-01T23:59:59Z"}'
+                    )
+                },
+            ),
+            AIMessage(content="", tool_calls=[]),
+        ],
+        "match_mode": "superset",
+    },
+    {
+        "name": "reschedule",
+        "intent": "reschedule",
+        "user_message": RESCHEDULE_MESSAGE,
+        "reference_trajectory": [
+            HumanMessage(content=RESCHEDULE_MESSAGE),
+            *tool_call("call_1", "get_calendly_current_user", {}),
+            *tool_call(
+                "call_2", "list_calendly_scheduled_events", {"input_str": '{"user": "xyz", "organization": "xyz"}'}
+            ),
+            *tool_call(
+                "call_3",
+                "list_calendly_event_invitees",
+                {"event_uri": "https://api.calendly.com/scheduled_events/ABC123"},
+            ),
+            *tool_call("call_4", "list_calendly_event_type_available_times", {"input_str": '{"event_uuid": "ABC123"}'}),
+            *tool_call("call_5", "create_calendly_invitee", {"input_str": '{"event_uuid": "ABC123"}'}),
+            *tool_call("call_6", "cancel_calendly_event", {"input_str": '{"event_uuid": "ABC123"}'}),
+            AIMessage(content="", tool_calls=[]),
+        ],
+        "match_mode": "superset",
+    },
+    {
+        "name": "cancel",
+        "intent": "cancel",
+        "user_message": CANCEL_MESSAGE,
+        "reference_trajectory": [
+            HumanMessage(content=CANCEL_MESSAGE),
+            *tool_call("call_1", "get_calendly_current_user", {}),
+            *tool_call(
+                "call_2", "list_calendly_scheduled_events", {"input_str": '{"user": "xyz", "organization": "xyz"}'}
+            ),
+            *tool_call(
+                "call_3",
+                "list_calendly_event_invitees",
+                {"event_uri": "https://api.calendly.com/scheduled_events/ABC123"},
+            ),
+            *tool_call("call_4", "cancel_calendly_event", {"input_str": '{"event_uuid": "ABC123"}'}),
+            AIMessage(content="", tool_calls=[]),
+        ],
+        "match_mode": "superset",
+    },
+    {
+        "name": "question",
+        "intent": "question",
+        "user_message": QUESTION_MESSAGE,
+        "reference_trajectory": [
+            HumanMessage(content=QUESTION_MESSAGE),
+            *tool_call("call_1", "check_other_questions_we_can_answer", {}),
+            *tool_call("call_2", "get_predefined_answer_to_other_questions", {"question": "Do you accept walk-ins?"}),
+            AIMessage(content="", tool_calls=[]),
+        ],
+        "match_mode": "superset",
+    },
+]
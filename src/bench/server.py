@@ -0,0 +1,114 @@
+"""
+Chat server load test: how many concurrent sessions one process sustains.
+
+Drives the HTTP server in-process with a scripted graph (no model or Calendly calls), so the numbers only
+reflect the server, the graph runtime and the checkpointer.
+
+    uv run python -m src.bench.server --sessions 10 50 100 200 --turns 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any
+
+from src.bench.checkpoint import build_graph
+from src.blobs import BlobStore
+from src.checkpoint import SQLiteSaver
+from src.server import ChatServer
+
+
+async def request(
+    port: int,
+    method: str,
+    path: str,
+    body: dict[str, Any] | bytes | None = None,
+    host: str = "127.0.0.1",
+    headers: dict[str, str] | None = None,
+) -> tuple[int, dict[str, Any]]:
+    """Minimal HTTP/1.1 client for the chat server, returns the status and decoded JSON body"""
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+    extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n{extra}"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode()
+        + payload
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, raw = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(raw) if raw else {}
+
+
+async def patient(port: int, turns: int, think_time: float, latencies: list[float], errors: list[int]) -> None:
+    start = time.perf_counter()
+    status, body = await request(port, "POST", "/sessions", {"timezone": "Europe/Dublin"})
+    latencies.append(time.perf_counter() - start)
+    if status != 200:
+        errors.append(status)
+        return
+    for _ in range(turns):
+        await asyncio.sleep(think_time)
+        start = time.perf_counter()
+        status, _ = await request(
+            port, "POST", f"/sessions/{body['session_id']}/messages", {"content": "What are my appointments?"}
+        )
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors.append(status)
+
+
+async def run(sessions: int, turns: int, think_time: float, max_concurrent_turns: int, workdir: str) -> dict:
+    checkpointer = SQLiteSaver(os.path.join(workdir, f"load-{sessions}.sqlite"), ttl_seconds=None, max_bytes=None)
+    blob_store = BlobStore(os.path.join(workdir, f"blobs-{sessions}.sqlite"), ttl_seconds=None)
+    server = ChatServer(build_graph(checkpointer, blob_store), max_concurrent_turns=max_concurrent_turns)
+    port = (await server.start("127.0.0.1", 0)).sockets[0].getsockname()[1]
+
+    latencies: list[float] = []
+    errors: list[int] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(patient(port, turns, think_time, latencies, errors) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    await server.shutdown()
+    checkpointer.close()
+
+    return {
+        "sessions": sessions,
+        "turns_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else latencies[0] * 1000,
+        "errors": len(errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=0.5, help="Seconds a patient waits between messages")
+    parser.add_argument("--max-concurrent-turns", type=int, default=32)
+    parser.add_argument("--p99-target-ms", type=float, default=1000, help="Latency a sustained level must meet")
+    args = parser.parse_args()
+
+    print(f"{'sessions':>8} {'turns/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    sustained = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for sessions in args.sessions:
+            r = asyncio.run(run(sessions, args.turns, args.think_time, args.max_concurrent_turns, tmp))
+            print(
+                f"{r['sessions']:>8} {r['turns_per_s']:>8.1f} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7}"
+            )
+            if not r["errors"] and r["p99_ms"] <= args.p99_target_ms:
+                sustained = sessions
+    print(f"Sustained {sustained} concurrent sessions with p99 <= {args.p99_target_ms:.0f} ms and no errors")
+
+
+if __name__ == "__main__":
+    main()
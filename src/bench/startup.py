@@ -0,0 +1,192 @@
+"""
+Startup benchmark: how long a fresh process takes to import the CLI, build the agent and greet the patient, and
+where the import time goes, compared with a stored baseline. Each run is a new interpreter, as a cold worker is.
+The greeting is templated (config/responses.toml), so no network access or API keys are needed.
+
+    uv run python -m src.bench.startup --runs 5
+    uv run python -m src.bench.startup --save-baseline
+
+Timings depend on the host, so each run also times a reference process importing only the libraries the agent
+cannot start without (REFERENCE), and the baseline is scaled by how much slower or faster that reference is here than
+where the baseline was saved. Exits with status 1 when a timing regressed by more than the tolerance against the
+scaled baseline, or when a model provider SDK, a tool module or the module of an optional feature was imported before
+the first greeting.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "startup.json")
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROVIDER_SDKS = ("anthropic", "openai", "langchain_anthropic", "langchain_openai")
+# Loaded on first use or when their feature is enabled, never for a plain greeting
+DEFERRED_MODULES = (
+    "src.tools",
+    "src.cassette",
+    "src.shared_cache",
+    "src.workers",
+    "src.slot_calendar",
+    "src.event_mirror",
+    "src.prefetch",
+)
+
+# All lower is better
+METRICS = ("import_ms", "build_ms", "greeting_ms", "process_ms")
+
+# The dependencies the graph needs before it can greet anyone, this repo's own import time is what the agent adds
+REFERENCE = "import langchain_core.messages, langgraph.graph, langgraph.types"
+
+
+def first_greeting() -> None:
+    """Runs in the child process: times the startup up to the first greeting and prints it as JSON"""
+    start = time.perf_counter()
+    # The CLI, and what its main() imports before it builds the agent
+    from langchain_core.messages import HumanMessage
+
+    import src.main  # noqa: F401
+    from src.agent import create_acme_dental_agent
+    from src.api.calendly import CalendlyClient
+    from src.responses import Responder
+
+    imported = time.perf_counter()
+    agent = create_acme_dental_agent(
+        calendly_client=CalendlyClient(api_token="startup-bench"), responder=Responder.from_config()
+    )
+    built = time.perf_counter()
+    result = agent.invoke(
+        {"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config={"configurable": {"thread_id": "1"}}
+    )
+    greeted = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - start) * 1000,
+                "build_ms": (built - imported) * 1000,
+                "greeting_ms": (greeted - built) * 1000,
+                "greeted": bool(result["messages"][-1].content),
+                "provider_sdks": sorted({m.split(".")[0] for m in sys.modules if m.startswith(PROVIDER_SDKS)}),
+                "deferred_modules": sorted(m for m in DEFERRED_MODULES if m in sys.modules),
+            }
+        )
+    )
+
+
+def run_once() -> dict:
+    start = time.perf_counter()
+    child = subprocess.run(
+        [sys.executable, "-c", "from src.bench.startup import first_greeting; first_greeting()"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {**json.loads(child.stdout.splitlines()[-1]), "process_ms": (time.perf_counter() - start) * 1000}
+
+
+def reference_once() -> float:
+    """Milliseconds a fresh process takes to import REFERENCE and exit"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", REFERENCE], cwd=ROOT, capture_output=True, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def import_breakdown(module: str = "src.main, src.agent") -> dict[str, float]:
+    """Self import time in ms per top-level package (per module for this repo's own), from -X importtime"""
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, capture_output=True, text=True
+    )
+    packages: dict[str, float] = {}
+    for line in child.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        name = name.strip()
+        package = ".".join(name.split(".")[:2]) if name.startswith("src.") else name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def scaled(baseline: dict[str, float], reference_ms: float) -> dict[str, float]:
+    """The baseline timings as expected on this host, going by its reference process against the baseline's"""
+    scale = reference_ms / baseline["reference_ms"] if baseline.get("reference_ms") else 1.0
+    return {metric: value * scale for metric, value in baseline.items()}
+
+
+def regressions(results: dict[str, float], baseline: dict[str, float], tolerance: float):
+    for metric in METRICS:
+        if metric not in baseline:
+            continue
+        before, after = baseline[metric], results[metric]
+        if before and (after - before) / before > tolerance:
+            yield metric, before, after
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to time, the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list in the import breakdown")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--no-baseline", action="store_true", help="Do not compare with the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression per timing")
+    args = parser.parse_args()
+
+    runs, references = [], []
+    for _ in range(args.runs):
+        # Interleaved, so that a host slowing down mid-run slows both alike
+        references.append(reference_once())
+        runs.append(run_once())
+    results = {metric: statistics.median(r[metric] for r in runs) for metric in METRICS}
+    results["reference_ms"] = statistics.median(references)
+    provider_sdks = sorted({sdk for r in runs for sdk in r["provider_sdks"]})
+    deferred_modules = sorted({module for r in runs for module in r["deferred_modules"]})
+    breakdown = import_breakdown()
+
+    print(f"Import time of src.main and src.agent by package (self ms, {sum(breakdown.values()):.0f} ms in total)")
+    for package, ms in list(breakdown.items())[: args.top]:
+        print(f"  {package:<40} {ms:>8.1f}")
+
+    baseline: dict[str, float] = {}
+    if not args.no_baseline and not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = scaled(json.load(f), results["reference_ms"])
+    print(f"\nMedian of {args.runs} fresh processes, the baseline scaled to this host")
+    print(f"{'':<22} {'import ms':>10} {'build ms':>10} {'greet ms':>10} {'process ms':>11} {'reference ms':>13}")
+    for name, r in [("first greeting", results)] + ([("  baseline", baseline)] if baseline else []):
+        print(
+            f"{name:<22} {r['import_ms']:>10.1f} {r['build_ms']:>10.1f} {r['greeting_ms']:>10.1f} "
+            f"{r['process_ms']:>11.1f} {r['reference_ms']:>13.1f}"
+        )
+
+    failed = False
+    if provider_sdks:
+        print(f"REGRESSION provider SDKs imported before the first greeting: {', '.join(provider_sdks)}")
+        failed = True
+    if deferred_modules:
+        print(f"REGRESSION modules imported before the first greeting: {', '.join(deferred_modules)}")
+        failed = True
+    if not all(r["greeted"] for r in runs):
+        print("REGRESSION the agent did not greet the patient")
+        failed = True
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+    else:
+        for metric, before, after in regressions(results, baseline, args.tolerance):
+            print(f"REGRESSION {metric}: {before:.1f} -> {after:.1f}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Debug tracing benchmark: per-node overhead of the debug logging along a 50 turn conversation,
+comparing the former eager `logging.debug(f"{pformat(state)}")` with the lazy tracer, with and without a trace file.
+Logging is at ERROR level, as in production.
+
+    uv run python -m src.bench.tracing --turns 50
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from pprint import pformat
+from typing import Any
+
+from langchain.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+
+from src.bench.checkpoint import ScheduledEventsPayloadTool
+from src.tracing import Tracer
+
+
+def conversation(turns: int) -> list[AnyMessage]:
+    """A conversation where every turn lists the scheduled events, then answers"""
+    payload = {"result": ScheduledEventsPayloadTool().invoke({"input_str": "{}"}), "type": "json"}
+    messages: list[AnyMessage] = []
+    for turn in range(turns):
+        call = {"id": f"call_{turn}", "name": "list_calendly_scheduled_events", "args": {"input_str": "{}"}}
+        messages += [
+            HumanMessage(content=f"What are my appointments? ({turn})"),
+            AIMessage(content="", tool_calls=[call]),
+            ToolMessage(content=str(payload), tool_call_id=call["id"]),
+            AIMessage(content="You have an appointment on January 1st at 10:00."),
+        ]
+    return messages
+
+
+def eager(state: dict[str, Any], output: dict[str, Any]) -> None:
+    logging.debug(f"{pformat(state)}")
+
+
+def traced(tracer: Tracer) -> Callable[[dict[str, Any], dict[str, Any]], None]:
+    def trace(state: dict[str, Any], output: dict[str, Any]) -> None:
+        tracer.node_start("assistant", state)
+        tracer.node_end("assistant", output, 0.0)
+
+    return trace
+
+
+def per_node_us(hook: Callable[[dict[str, Any], dict[str, Any]], None], state: dict[str, Any], repeat: int) -> float:
+    output = {"messages": state["messages"][-1:]}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        hook(state, output)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    messages = conversation(args.turns)
+    with tempfile.TemporaryDirectory() as directory:
+        file_tracer = Tracer(os.path.join(directory, "trace.jsonl"), max_chars=500)
+        hooks = {"eager pformat": eager, "lazy": traced(Tracer()), "lazy+jsonl": traced(file_tracer)}
+        checkpoints = sorted({1, args.turns // 2, args.turns})
+        print(f"{'hook':<14} " + " ".join(f"{f'turn {t} us':>12}" for t in checkpoints) + f" {'mean us':>10}")
+        for name, hook in hooks.items():
+            by_turn = {
+                turn: per_node_us(hook, {"messages": messages[: turn * 4]}, args.repeat)
+                for turn in range(1, args.turns + 1)
+            }
+            row = " ".join(f"{by_turn[t]:>12.1f}" for t in checkpoints)
+            print(f"{name:<14} {row} {statistics.mean(by_turn.values()):>10.1f}")
+        file_tracer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Worker pool benchmark: chat server throughput as the number of worker processes grows.
+
+Drives a `WorkerPool` over HTTP with the scripted graph of the checkpoint benchmark (no model or Calendly calls),
+so every turn is spent on the graph runtime, state serialization and the shared SQLite checkpoints, the work one
+process cannot spread over more cores.
+
+    uv run python -m src.bench.workers --workers 1 2 4 --sessions 64 --turns 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+
+from src.bench.checkpoint import build_graph
+from src.bench.server import patient
+from src.blobs import BlobStore
+from src.checkpoint import SQLiteSaver
+from src.server import ChatServer
+from src.shared_cache import SharedCache
+from src.workers import WorkerPool
+
+
+def build_bench_worker(workdir: str, max_concurrent_turns: int) -> tuple[ChatServer, Callable]:
+    """A worker serving the scripted graph from the checkpoints, blobs and leases every worker shares"""
+    checkpointer = SQLiteSaver(os.path.join(workdir, "checkpoints.sqlite"), ttl_seconds=None, max_bytes=None)
+    blob_store = BlobStore(os.path.join(workdir, "blobs.sqlite"), ttl_seconds=None)
+    leases = SharedCache(os.path.join(workdir, "shared.sqlite"))
+    server = ChatServer(build_graph(checkpointer, blob_store), max_concurrent_turns=max_concurrent_turns, leases=leases)
+
+    def close() -> None:
+        checkpointer.close()
+        leases.close()
+
+    return server, close
+
+
+async def run(workers: int, sessions: int, turns: int, think_time: float, max_concurrent_turns: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        pool = WorkerPool("src.bench.workers:build_bench_worker", (workdir, max_concurrent_turns), workers)
+        port = (await pool.start("127.0.0.1", 0)).sockets[0].getsockname()[1]
+
+        latencies: list[float] = []
+        errors: list[int] = []
+        start = time.perf_counter()
+        await asyncio.gather(*(patient(port, turns, think_time, latencies, errors) for _ in range(sessions)))
+        elapsed = time.perf_counter() - start
+        await pool.shutdown()
+
+    return {
+        "workers": workers,
+        "turns_per_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": statistics.quantiles(latencies, n=100)[98] * 1000 if len(latencies) > 1 else latencies[0] * 1000,
+        "errors": len(errors),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds a patient waits between messages")
+    parser.add_argument("--max-concurrent-turns", type=int, default=32, help="Per worker")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'workers':>7} {'turns/s':>8} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    single = None
+    for workers in args.workers:
+        r = asyncio.run(run(workers, args.sessions, args.turns, args.think_time, args.max_concurrent_turns))
+        single = single or r["turns_per_s"]
+        print(
+            f"{r['workers']:>7} {r['turns_per_s']:>8.1f} {r['turns_per_s'] / single:>7.2f}x "
+            f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
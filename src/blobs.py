@@ -0,0 +1,166 @@
+"""Content-addressed storage for large tool results"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from langchain.messages import AnyMessage, ToolMessage
+
+DEFAULT_BLOB_PATH = os.path.join(".acme_dental", "blobs.sqlite")
+
+BLOB_REF_KEY = "blob_ref"
+
+EXPIRED_CONTENT = "This tool result has expired, call the tool again if it is still needed."
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+"""
+
+
+class BlobStore:
+    """
+    Stores large tool results once, keyed by the SHA-256 of their content, so messages and checkpoints only
+    need to carry a short reference. Identical results (e.g. the same event listing fetched twice) share a blob.
+
+    Recently used blobs are kept decoded in a bounded in-process LRU, the rest are zlib compressed in SQLite.
+    Blobs unused for longer than `ttl_seconds` are dropped by sweeps that run opportunistically on writes,
+    at most once every `sweep_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_BLOB_PATH,
+        *,
+        min_bytes: int = 1024,
+        ttl_seconds: float | None = 24 * 60 * 60,
+        cache_entries: int = 256,
+        sweep_interval: float = 60,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.min_bytes = min_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_entries = cache_entries
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.cache: OrderedDict[str, str] = OrderedDict()
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.RLock()
+        # Worker processes share the file, a write waits for another process's to finish
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._next_sweep = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "BlobStore":
+        """Build a store using the ACME_BLOB_* environment variables, falling back to the defaults"""
+        env = {
+            "path": os.getenv("ACME_BLOB_PATH"),
+            "min_bytes": os.getenv("ACME_BLOB_MIN_BYTES"),
+            "ttl_seconds": os.getenv("ACME_BLOB_TTL_SECONDS"),
+        }
+        casts = {"path": str, "min_bytes": int, "ttl_seconds": float}
+        for key, value in env.items():
+            if value and key not in kwargs:
+                kwargs[key] = casts[key](value)
+        return cls(**kwargs)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    def put(self, content: str) -> str:
+        """Stores the content (if not already stored) and returns its key"""
+        key = "sha256:" + hashlib.sha256(content.encode("utf-8")).hexdigest()
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO blobs VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET last_used = excluded.last_used",
+                (key, zlib.compress(content.encode("utf-8")), len(content), self.clock()),
+            )
+            self._remember(key, content)
+        self._maybe_sweep()
+        return key
+
+    def get(self, key: str) -> str | None:
+        """Returns the stored content, or None if it was never stored or has been swept"""
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            row = self.conn.execute("SELECT data FROM blobs WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE blobs SET last_used = ? WHERE key = ?", (self.clock(), key))
+            content = zlib.decompress(row[0]).decode("utf-8")
+            self._remember(key, content)
+            return content
+
+    def _remember(self, key: str, content: str) -> None:
+        self.cache[key] = content
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_entries:
+            self.cache.popitem(last=False)
+
+    def _maybe_sweep(self) -> None:
+        now = self.clock()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        self.sweep()
+
+    def sweep(self) -> int:
+        """Drops blobs unused for longer than the TTL and returns how many were dropped"""
+        if self.ttl_seconds is None:
+            return 0
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM blobs WHERE last_used < ? RETURNING key", (self.clock() - self.ttl_seconds,)
+            )
+            expired = [key for (key,) in cursor.fetchall()]
+            for key in expired:
+                self.cache.pop(key, None)
+        if expired:
+            logging.info(f"Swept {len(expired)} tool result blobs")
+        return len(expired)
+
+    # Messages
+
+    def tool_message(self, content: str, tool_call_id: str) -> ToolMessage:
+        """Builds a ToolMessage that carries a reference instead of the content when the content is large"""
+        if len(content) < self.min_bytes:
+            return ToolMessage(content=content, tool_call_id=tool_call_id)
+        key = self.put(content)
+        return ToolMessage(
+            content=f"[tool result {key} ({len(content)} bytes)]",
+            tool_call_id=tool_call_id,
+            additional_kwargs={BLOB_REF_KEY: key},
+        )
+
+    def resolve(self, messages: Sequence[AnyMessage]) -> list[AnyMessage]:
+        """Returns the messages with referenced tool results restored, leaving the originals untouched"""
+        resolved = []
+        for message in messages:
+            key = message.additional_kwargs.get(BLOB_REF_KEY) if isinstance(message, ToolMessage) else None
+            if key:
+                content = self.get(key)
+                message = message.model_copy(update={"content": EXPIRED_CONTENT if content is None else content})
+            resolved.append(message)
+        return resolved
@@ -0,0 +1,278 @@
+"""
+Record/replay cassettes for the agent's external calls.
+
+In record mode every chat model request and response, and every Calendly HTTP exchange, is appended to a JSON lines
+cassette together with its timing. In replay mode the cassette serves them back without network access or API keys,
+either instantly or with the recorded latency, so a real conversation can be profiled offline and deterministically.
+
+Exchanges are matched by a hash of the request. A request that was not recorded (e.g. after a prompt change) gets
+the next unplayed exchange recorded for the same graph node or Calendly endpoint, or fails with CassetteMiss.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from typing import Any, Literal
+from urllib.parse import urlparse
+
+import requests
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langgraph.config import get_config
+from pydantic import ConfigDict
+
+from src.api.calendly import CalendlyClient
+from src.metrics import endpoint_label
+from src.models import ModelRouter
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+def request_key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+
+def graph_context() -> tuple[str, str]:
+    """The graph node and thread the current call is made from, if any"""
+    try:
+        config = get_config()
+    except RuntimeError:
+        return "", ""
+    return config["metadata"].get("langgraph_node", ""), str(config["configurable"].get("thread_id", ""))
+
+
+class Cassette:
+    """
+    A cassette file, opened for recording (appending) or replaying.
+    `latency` is "zero" to replay instantly or "recorded" to sleep for the recorded duration of each exchange.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: Literal["record", "replay"] = "replay",
+        latency: Literal["zero", "recorded"] = "zero",
+    ):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.entries: list[dict[str, Any]] = []
+        self.by_key: dict[tuple[str, str], deque[dict[str, Any]]] = defaultdict(deque)
+        self.by_target: dict[tuple[str, str], deque[dict[str, Any]]] = defaultdict(deque)
+        self.played = 0
+        self.misses = 0
+
+        if mode == "record":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.file = open(path, "a", encoding="utf-8")
+            self.file.write(json.dumps({"cassette": CASSETTE_VERSION, "recorded_at": self.started}) + "\n")
+            self.file.flush()
+        else:
+            self.file = None
+            self.load()
+
+    @classmethod
+    def from_env(cls) -> "Cassette | None":
+        """ACME_CASSETTE names the file, ACME_CASSETTE_MODE and ACME_CASSETTE_LATENCY override the defaults"""
+        path = os.getenv("ACME_CASSETTE")
+        if not path:
+            return None
+        return cls(
+            path,
+            mode=os.getenv("ACME_CASSETTE_MODE", "replay"),
+            latency=os.getenv("ACME_CASSETTE_LATENCY", "zero"),
+        )
+
+    def load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "kind" not in entry:
+                    continue
+                entry["played"] = False
+                self.entries.append(entry)
+                self.by_key[(entry["kind"], entry["key"])].append(entry)
+                self.by_target[(entry["kind"], entry["target"])].append(entry)
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def record(self, kind: str, key: str, target: str, start: float, duration: float, **fields: Any) -> None:
+        node, thread_id = graph_context()
+        entry = {
+            "kind": kind,
+            "key": key,
+            "target": target,
+            "node": node,
+            "thread_id": thread_id,
+            "offset_s": start - self.started,
+            "duration_s": duration,
+            **fields,
+        }
+        with self.lock:
+            self.file.write(json.dumps(entry, default=str) + "\n")
+            self.file.flush()
+
+    def play(self, kind: str, key: str, target: str) -> dict[str, Any]:
+        with self.lock:
+            entry = self.take(self.by_key[(kind, key)])
+            if entry is None:
+                entry = self.take(self.by_target[(kind, target)])
+                if entry is None:
+                    raise CassetteMiss(f"No recorded {kind} exchange left for {target}")
+                self.misses += 1
+                logging.warning(f"Cassette has no exact match for a {kind} request to {target}, replaying the next one")
+            entry["played"] = True
+            self.played += 1
+        if self.latency == "recorded":
+            time.sleep(entry["duration_s"])
+        return entry
+
+    @staticmethod
+    def take(queue: deque[dict[str, Any]]) -> dict[str, Any] | None:
+        while queue:
+            entry = queue.popleft()
+            if not entry["played"]:
+                return entry
+        return None
+
+    # Wiring
+
+    def model_factory(self, factory: Callable[..., BaseChatModel] = init_chat_model) -> Callable[..., BaseChatModel]:
+        """A ModelRouter factory whose models go through the cassette"""
+
+        def build(**spec: Any) -> BaseChatModel:
+            model = factory(**spec) if self.mode == "record" else None
+            return CassetteChatModel(cassette=self, model=model, spec=spec)
+
+        return build
+
+    def model_router(self, path: str | None = None) -> ModelRouter:
+        return ModelRouter.from_config(path, factory=self.model_factory())
+
+    def calendly_client(self, api_token: str | None = None, **kwargs: Any) -> CalendlyClient:
+        # Replays need no credentials
+        api_token = api_token or (None if self.mode == "record" else "replay")
+        return CalendlyClient(api_token=api_token, transport=CassetteTransport(self), **kwargs)
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model that records the wrapped model's exchanges, or replays them without a model"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cassette: Cassette
+    model: BaseChatModel | None = None
+    spec: dict[str, Any] = {}
+    tools: list[Any] = []
+    tool_kwargs: dict[str, Any] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "CassetteChatModel":
+        return self.model_copy(update={"tools": list(tools), "tool_kwargs": kwargs})
+
+    def key(self, messages: list[BaseMessage]) -> str:
+        tool_names = sorted(convert_to_openai_tool(tool)["function"]["name"] for tool in self.tools)
+        conversation = [
+            (m.type, m.content, getattr(m, "tool_calls", None), getattr(m, "tool_call_id", None)) for m in messages
+        ]
+        return request_key(self.spec, tool_names, self.tool_kwargs.get("tool_choice"), conversation)
+
+    def _generate(
+        self, messages: list[BaseMessage], stop: list[str] | None = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        key = self.key(messages)
+        node, _ = graph_context()
+        if self.cassette.mode == "replay":
+            entry = self.cassette.play("model", key, node)
+            return ChatResult(generations=[ChatGeneration(message=messages_from_dict([entry["response"]])[0])])
+
+        model = self.model.bind_tools(self.tools, **self.tool_kwargs) if self.tools else self.model
+        start, began = time.time(), time.perf_counter()
+        response = model.invoke(messages, stop=stop, **kwargs)
+        turn = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+        self.cassette.record(
+            "model",
+            key,
+            node,
+            start,
+            time.perf_counter() - began,
+            turn=turn,
+            request=[message_to_dict(m) for m in messages],
+            response=message_to_dict(response),
+        )
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+
+class StoredResponse:
+    """The part of `requests.Response` the Calendly client relies on"""
+
+    def __init__(self, status_code: int, payload: Any, text: str):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = text
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self) -> Any:
+        return self.payload
+
+
+class CassetteTransport:
+    """CalendlyClient transport that records the HTTP exchanges of the wrapped transport, or replays them"""
+
+    def __init__(self, cassette: Cassette, transport: Any = requests):
+        self.cassette = cassette
+        self.transport = transport
+
+    def get(self, url: str, params: dict[str, Any] | None = None, **kwargs: Any) -> Any:
+        return self.exchange("GET", url, params, lambda: self.transport.get(url, params=params, **kwargs))
+
+    def post(self, url: str, json: dict[str, Any] | None = None, **kwargs: Any) -> Any:
+        return self.exchange("POST", url, json, lambda: self.transport.post(url, json=json, **kwargs))
+
+    def exchange(self, method: str, url: str, body: dict[str, Any] | None, send: Callable[[], Any]) -> Any:
+        key = request_key(method, url, body)
+        target = f"{method} {endpoint_label(urlparse(url).path)}"
+        if self.cassette.mode == "replay":
+            response = self.cassette.play("calendly", key, target)["response"]
+            return StoredResponse(response["status"], response["json"], response["text"])
+
+        start, began = time.time(), time.perf_counter()
+        response = send()
+        duration = time.perf_counter() - began
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        self.cassette.record(
+            "calendly",
+            key,
+            target,
+            start,
+            duration,
+            request={"method": method, "url": url, "body": body},
+            response={"status": response.status_code, "json": payload, "text": response.text},
+        )
+        return response
@@ -0,0 +1,437 @@
+"""Durable, bounded checkpoint storage for the agent graph"""
+
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(".acme_dental", "checkpoints.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_active REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    size INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    size INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS threads_last_active ON threads (last_active);
+"""
+
+
+class SQLiteSaver(BaseCheckpointSaver[str]):
+    """
+    A SQLite backed checkpointer that survives restarts and keeps its footprint bounded:
+
+    - only the newest `keep_checkpoints` checkpoints of every thread are retained (compaction),
+    - threads idle for longer than `ttl_seconds` are evicted,
+    - when the stored bytes exceed `max_bytes`, the least recently active threads are evicted.
+
+    Eviction sweeps run opportunistically on writes, at most once every `sweep_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CHECKPOINT_PATH,
+        *,
+        ttl_seconds: float | None = 24 * 60 * 60,
+        keep_checkpoints: int = 2,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        sweep_interval: float = 60,
+        serde: SerializerProtocol | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__(serde=serde)
+        if keep_checkpoints < 1:
+            raise ValueError("keep_checkpoints must be at least 1")
+
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.keep_checkpoints = keep_checkpoints
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.lock = threading.RLock()
+        # Worker processes share the file, a write waits for another process's to finish
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._next_sweep = 0.0
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "SQLiteSaver":
+        """Build a saver using the ACME_CHECKPOINT_* environment variables, falling back to the defaults"""
+        env = {
+            "path": os.getenv("ACME_CHECKPOINT_PATH"),
+            "ttl_seconds": os.getenv("ACME_CHECKPOINT_TTL_SECONDS"),
+            "max_bytes": os.getenv("ACME_CHECKPOINT_MAX_BYTES"),
+            "keep_checkpoints": os.getenv("ACME_CHECKPOINT_KEEP"),
+        }
+        casts = {"path": str, "ttl_seconds": float, "max_bytes": int, "keep_checkpoints": int}
+        for key, value in env.items():
+            if value and key not in kwargs:
+                kwargs[key] = casts[key](value)
+        return cls(**kwargs)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    # Reads
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id: str = config["configurable"]["thread_id"]
+        checkpoint_ns: str = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        params: tuple[Any, ...] = (thread_id, checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+
+        with self.lock:
+            row = self.conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+            "metadata_type, metadata FROM checkpoints"
+        )
+        clauses: list[str] = []
+        params: list[Any] = []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                checkpoint_tuple = self._to_tuple(thread_id, checkpoint_ns, tuple(row))
+                if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                tuples.append(checkpoint_tuple)
+        yield from tuples
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple[Any, ...]) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((value_type, value)))
+                for task_id, channel, value_type, value in writes
+            ],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+        )
+
+    # Writes
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, serialized = self.serde.dumps_typed(checkpoint)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    serialized,
+                    metadata_type,
+                    serialized_metadata,
+                    len(serialized) + len(serialized_metadata),
+                ),
+            )
+            self._touch(thread_id)
+            self._compact(thread_id, checkpoint_ns)
+        self._maybe_sweep(keep=thread_id)
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special writes (errors, interrupts, resumes) have fixed indices and are written once
+        verb = "INSERT OR REPLACE" if all(c in WRITES_IDX_MAP for c, _ in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, serialized = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    serialized,
+                    task_path,
+                    len(serialized),
+                )
+            )
+
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._touch(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN")
+            self._delete_threads([thread_id])
+
+    # Bounding
+
+    def _touch(self, thread_id: str) -> None:
+        self.conn.execute(
+            "INSERT INTO threads VALUES (?, ?) ON CONFLICT(thread_id) DO UPDATE SET last_active = excluded.last_active",
+            (thread_id, self.clock()),
+        )
+
+    def _compact(self, thread_id: str, checkpoint_ns: str) -> None:
+        """Drop every checkpoint of the thread that is superseded by the newest `keep_checkpoints` ones"""
+        stale = self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_checkpoints),
+        ).fetchall()
+        if not stale:
+            return
+        keys = [(thread_id, checkpoint_ns, checkpoint_id) for (checkpoint_id,) in stale]
+        self.conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", keys
+        )
+        self.conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", keys
+        )
+
+    def _delete_threads(self, thread_ids: Sequence[str]) -> None:
+        keys = [(thread_id,) for thread_id in thread_ids]
+        self.conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", keys)
+        self.conn.executemany("DELETE FROM writes WHERE thread_id = ?", keys)
+        self.conn.executemany("DELETE FROM threads WHERE thread_id = ?", keys)
+
+    def _maybe_sweep(self, keep: str | None = None) -> None:
+        now = self.clock()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval
+        self.sweep(keep=keep)
+
+    def size_bytes(self) -> int:
+        """Returns the payload bytes currently held by the store"""
+        with self.lock:
+            (checkpoints,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM checkpoints").fetchone()
+            (writes,) = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM writes").fetchone()
+            return checkpoints + writes
+
+    def sweep(self, keep: str | None = None) -> Sequence[str]:
+        """
+        Evict idle threads and, if still above the size cap, the least recently active ones.
+        The `keep` thread (usually the one being written) is never evicted.
+        Returns the evicted thread ids.
+        """
+        evicted: list[str] = []
+        with self.lock, self.conn:
+            # Reads before it writes, a deferred transaction could not upgrade after another process's write
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.ttl_seconds is not None:
+                rows = self.conn.execute(
+                    "SELECT thread_id FROM threads WHERE last_active < ? AND thread_id IS NOT ?",
+                    (self.clock() - self.ttl_seconds, keep),
+                ).fetchall()
+                evicted.extend(thread_id for (thread_id,) in rows)
+                self._delete_threads(evicted)
+
+            if self.max_bytes is not None:
+                total = self.size_bytes()
+                if total > self.max_bytes:
+                    rows = self.conn.execute(
+                        "SELECT t.thread_id, "
+                        "(SELECT COALESCE(SUM(size), 0) FROM checkpoints c WHERE c.thread_id = t.thread_id) + "
+                        "(SELECT COALESCE(SUM(size), 0) FROM writes w WHERE w.thread_id = t.thread_id) "
+                        "FROM threads t WHERE t.thread_id IS NOT ? ORDER BY t.last_active",
+                        (keep,),
+                    ).fetchall()
+                    over_cap: list[str] = []
+                    for thread_id, thread_bytes in rows:
+                        if total <= self.max_bytes:
+                            break
+                        over_cap.append(thread_id)
+                        total -= thread_bytes
+                    self._delete_threads(over_cap)
+                    evicted.extend(over_cap)
+
+        if evicted:
+            logging.info(f"Evicted {len(evicted)} checkpoint threads")
+            with self.lock:
+                self.conn.execute("PRAGMA incremental_vacuum")
+        return evicted
+
+    # Async variants, SQLite calls are short and local so we run them inline like InMemorySaver does
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
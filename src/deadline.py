@@ -0,0 +1,115 @@
+"""
+Per-turn latency budget.
+
+The caller sets a turn's deadline when it invokes the graph (`with_deadline`), as the `deadline` of the config's
+`configurable`. Every node makes it current for its own execution (`deadline_scope`), so the model calls, tool calls
+and Calendly requests below it take the remaining budget as their timeout, and a node that finds the budget spent
+ends the turn with DEADLINE_MESSAGE instead of starting more work.
+"""
+
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, TypeVar
+
+from langgraph.config import get_config
+
+from src.metrics import REGISTRY
+
+DEADLINE_MESSAGE = (
+    "I'm sorry, this is taking longer than it should and I could not finish looking into it. "
+    "Could you ask me again in a moment?"
+)
+
+DEADLINE: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class OutcomeUnknown(DeadlineExceeded):
+    """A write cut short by the deadline, which may still have gone through"""
+
+
+def turn_budget() -> float:
+    """ACME_TURN_BUDGET, the seconds a turn may take, 0 for no limit"""
+    return float(os.getenv("ACME_TURN_BUDGET", 60))
+
+
+def with_deadline(config: dict[str, Any], budget: float | None) -> dict[str, Any]:
+    """A copy of the graph config whose turn must end within `budget` seconds from now"""
+    if not budget:
+        return config
+    return {**config, "configurable": {**config.get("configurable", {}), "deadline": time.monotonic() + budget}}
+
+
+def config_deadline() -> float | None:
+    """The deadline of the running graph's config, None outside a graph or without one"""
+    try:
+        return (get_config().get("configurable") or {}).get("deadline")
+    except RuntimeError:
+        return None
+
+
+@contextmanager
+def deadline_scope(deadline: float | None) -> Iterator[None]:
+    token = DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        DEADLINE.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left in the current turn, None without a deadline"""
+    deadline = DEADLINE.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def expired() -> bool:
+    return remaining() == 0.0
+
+
+def timeout(default: float) -> float:
+    """The timeout for a call that would otherwise wait `default` seconds, raises DeadlineExceeded once spent"""
+    left = remaining()
+    if left is None:
+        return default
+    if not left:
+        REGISTRY.inc("deadline_exceeded_total")
+        raise DeadlineExceeded("The turn ran out of time")
+    return min(default, left)
+
+
+def call_within(function: Callable[[], T]) -> T:
+    """
+    Runs `function` within the remaining budget, raising DeadlineExceeded when it runs out.
+    The call is left to finish on its own thread, for calls like model invocations that take no timeout.
+    """
+    if remaining() is None:
+        return function()
+    left = timeout(float("inf"))
+    result: dict[str, Any] = {}
+    context = copy_context()
+
+    def run() -> None:
+        try:
+            result["value"] = context.run(function)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, name="deadline-call", daemon=True)
+    thread.start()
+    thread.join(left)
+    if thread.is_alive():
+        REGISTRY.inc("deadline_exceeded_total")
+        raise DeadlineExceeded("The turn ran out of time")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
@@ -0,0 +1,271 @@
+"""
+Local mirror of the clinic's upcoming scheduled events and their invitees.
+
+The mirror is filled by a paginated bulk sync and indexed by invitee email and start time, so a patient's
+appointments are a dictionary lookup instead of a scan of every event and its invitees. It is kept current by
+Calendly's `invitee.created` and `invitee.canceled` webhooks, by the bookings and cancellations made through the
+client, and by a periodic delta reconciliation that only refetches the invitees of events that changed.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+from src.api.calendly import CalendlyClient, parse_time
+from src.api.records import Invitee, ScheduledEvent
+from src.metrics import REGISTRY, span
+
+WEBHOOK_EVENTS = ["invitee.created", "invitee.canceled"]
+
+
+def start_key(value: str) -> str:
+    """The start time index key, the same for every ISO 8601 spelling of a moment"""
+    moment = parse_time(value)
+    return moment.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ") if moment else value
+
+
+def sign_webhook(body: bytes, signing_key: str, timestamp: int | None = None) -> str:
+    """The Calendly-Webhook-Signature header value for a webhook body"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(signing_key.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify_webhook(body: bytes, header: str, signing_key: str, tolerance: float = 180.0) -> bool:
+    """Checks a Calendly-Webhook-Signature header, rejecting signatures older than `tolerance` seconds"""
+    fields = dict(part.split("=", 1) for part in header.split(",") if "=" in part)
+    try:
+        timestamp = int(fields.get("t", ""))
+    except ValueError:
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    expected = sign_webhook(body, signing_key, timestamp).split("v1=", 1)[1]
+    return hmac.compare_digest(expected, fields.get("v1", ""))
+
+
+class EventMirror:
+    """
+    Upcoming active events (from `now()` on) with their invitees, synced on first use and reconciled in the
+    background every `reconcile_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        client: CalendlyClient,
+        *,
+        reconcile_interval: float = 300.0,
+        page_size: int = 100,
+        now: Callable[[], datetime] = lambda: datetime.now(UTC),
+    ):
+        self.client = client
+        self.reconcile_interval = reconcile_interval
+        self.page_size = page_size
+        self.now = now
+        self.lock = threading.Lock()
+        self.events: dict[str, dict[str, Any]] = {}  # event URI -> scheduled event
+        self.invitees: dict[str, dict[str, dict[str, Any]]] = {}  # event URI -> invitee URI -> invitee
+        self.by_email: dict[str, set[str]] = {}  # lowercase email -> event URIs
+        self.by_start: dict[str, set[str]] = {}  # start_key -> event URIs
+        self.canceled: set[str] = set()  # invitee URIs, so a late invitee.created cannot bring them back
+        self.synced_at: float | None = None
+        self.reconciling = False
+        # Updates applied while a sync is fetching, replayed onto its result
+        self.journal: list[Callable[[], None]] | None = None
+        client.write_listeners.append(self.on_write)
+
+    @classmethod
+    def from_env(cls, client: CalendlyClient) -> "EventMirror":
+        """ACME_MIRROR_RECONCILE_SECONDS overrides the default"""
+        return cls(client, reconcile_interval=float(os.getenv("ACME_MIRROR_RECONCILE_SECONDS", 300)))
+
+    # Index maintenance, with the lock held
+
+    def _put_event(self, event: dict[str, Any]) -> None:
+        # Only the fields the appointments read are kept, the mirror holds every upcoming event
+        event = ScheduledEvent.from_api(event).to_dict()
+        uri = event["uri"]
+        if (previous := self.events.get(uri)) and previous.get("start_time") != event.get("start_time"):
+            self.by_start.get(start_key(previous["start_time"]), set()).discard(uri)
+        self.events[uri] = event
+        self.invitees.setdefault(uri, {})
+        self.by_start.setdefault(start_key(event["start_time"]), set()).add(uri)
+
+    def _put_invitee(self, event_uri: str, invitee: dict[str, Any]) -> None:
+        invitee = Invitee.from_api(invitee).to_dict()
+        email = (invitee.get("email") or "").lower()
+        if invitee.get("status", "active") != "active" or invitee.get("uri") in self.canceled:
+            self.canceled.add(invitee.get("uri"))
+            self.invitees.get(event_uri, {}).pop(invitee.get("uri"), None)
+            if not any((i.get("email") or "").lower() == email for i in self.invitees.get(event_uri, {}).values()):
+                self.by_email.get(email, set()).discard(event_uri)
+            return
+        self.invitees.setdefault(event_uri, {})[invitee["uri"]] = invitee
+        self.by_email.setdefault(email, set()).add(event_uri)
+
+    def _drop_event(self, uri: str) -> None:
+        event = self.events.pop(uri, None)
+        for invitee in self.invitees.pop(uri, {}).values():
+            self.by_email.get((invitee.get("email") or "").lower(), set()).discard(uri)
+        if event:
+            self.by_start.get(start_key(event["start_time"]), set()).discard(uri)
+
+    # Sync
+
+    def fetch(self, known: dict[str, dict[str, Any]]) -> tuple[dict, dict, int]:
+        """The upcoming active events and their invitees, reusing the invitees of events unchanged since `known`"""
+        user = self.client.get_current_user().get("resource", {})
+        events, invitees, fetched = {}, {}, 0
+        for event in self.client.iter_scheduled_events(
+            user=user.get("uri"),
+            organization=user.get("current_organization"),
+            status="active",
+            min_start_time=self.now().strftime("%Y-%m-%dT%H:%M:%SZ"),
+            page_size=self.page_size,
+        ):
+            uri = event["uri"]
+            events[uri] = event
+            previous = known.get(uri)
+            if previous and previous["event"].get("updated_at") == event.get("updated_at"):
+                invitees[uri] = previous["invitees"]
+            else:
+                invitees[uri] = list(self.client.iter_event_invitees(uri, page_size=self.page_size))
+                fetched += 1
+        return events, invitees, fetched
+
+    def sync(self, delta: bool = False) -> None:
+        """Rebuilds the mirror from Calendly, with `delta` only refetching invitees of new or updated events"""
+        with self.lock:
+            self.journal = []
+            known = (
+                {
+                    uri: {"event": e, "invitees": list(self.invitees.get(uri, {}).values())}
+                    for uri, e in self.events.items()
+                }
+                if delta
+                else {}
+            )
+        try:
+            with span("mirror_sync", delta=delta):
+                events, invitees, fetched = self.fetch(known)
+        except Exception:
+            with self.lock:
+                self.journal = None
+            raise
+        REGISTRY.inc("mirror_invitee_fetches_total", fetched, delta=delta)
+
+        with self.lock:
+            self.events, self.invitees, self.by_email, self.by_start = {}, {}, {}, {}
+            for uri, event in events.items():
+                self._put_event(event)
+                for invitee in invitees[uri]:
+                    self._put_invitee(uri, invitee)
+            for update in self.journal:
+                update()
+            self.journal = None
+            self.synced_at = time.monotonic()
+
+    def reconcile(self) -> None:
+        try:
+            self.sync(delta=True)
+        except Exception:
+            logging.exception("Event mirror reconciliation failed")
+        finally:
+            self.reconciling = False
+
+    def ensure_synced(self) -> None:
+        """Syncs on first use, later reconciles in the background once the mirror is older than the interval"""
+        if self.synced_at is None:
+            self.sync()
+            return
+        with self.lock:
+            if self.reconciling or time.monotonic() - self.synced_at < self.reconcile_interval:
+                return
+            self.reconciling = True
+        threading.Thread(target=self.reconcile, name="event-mirror-reconcile", daemon=True).start()
+
+    # Updates
+
+    def apply_webhook(self, body: dict[str, Any]) -> bool:
+        """Applies an invitee.created or invitee.canceled webhook body, returns whether it was one of them"""
+        kind, payload = body.get("event"), body.get("payload") or {}
+        event = payload.get("scheduled_event") or {}
+        if kind not in WEBHOOK_EVENTS or not event.get("uri") or not payload.get("uri"):
+            return False
+        invitee = {key: value for key, value in payload.items() if key != "scheduled_event"}
+        if kind == "invitee.canceled":
+            invitee["status"] = "canceled"
+        REGISTRY.inc("mirror_webhooks_total", event=kind)
+
+        def update() -> None:
+            if event.get("status", "active") != "active":
+                self.canceled.add(invitee["uri"])
+                self._drop_event(event["uri"])
+                return
+            self._put_event(event)
+            self._put_invitee(event["uri"], invitee)
+            if not self.invitees.get(event["uri"]):
+                self._drop_event(event["uri"])
+
+        self._apply(update)
+        return True
+
+    def _apply(self, update: Callable[[], None]) -> None:
+        with self.lock:
+            update()
+            if self.journal is not None:
+                self.journal.append(update)
+
+    def on_write(self, path: str, payload: dict[str, Any], response: dict[str, Any]) -> None:
+        """Applies a successful booking or cancellation made through the client, ahead of its webhook"""
+        if path == "/invitees" and (invitee := response.get("resource", {})).get("event"):
+            invitee = {"email": payload.get("invitee", {}).get("email"), **invitee}
+            event = {
+                "uri": invitee["event"],
+                "status": "active",
+                "start_time": payload["start_time"],
+                "event_type": payload.get("event_type"),
+            }
+
+            def update() -> None:
+                if event["uri"] not in self.events:
+                    self._put_event(event)
+                self._put_invitee(event["uri"], invitee)
+
+        elif path.endswith("/cancellation"):
+            event_uuid = path.split("/")[2]
+
+            def update() -> None:
+                self._drop_event(next((uri for uri in self.events if uri.rsplit("/", 1)[-1] == event_uuid), ""))
+
+        else:
+            return
+        self._apply(update)
+
+    # Queries
+
+    def appointments(self, email: str) -> list[dict[str, Any]]:
+        """The patient's upcoming appointments, each with the patient's invitee records, by start time"""
+        self.ensure_synced()
+        email = email.strip().lower()
+        with self.lock:
+            found = [
+                {
+                    **self.events[uri],
+                    "invitees": [i for i in self.invitees[uri].values() if (i.get("email") or "").lower() == email],
+                }
+                for uri in self.by_email.get(email, ())
+            ]
+        return sorted(found, key=lambda event: start_key(event["start_time"]))
+
+    def at(self, start_time: str) -> list[dict[str, Any]]:
+        """The events starting at a moment"""
+        self.ensure_synced()
+        with self.lock:
+            return [self.events[uri] for uri in self.by_start.get(start_key(start_time), ())]
@@ -0,0 +1,135 @@
+"""
+Per-turn and per-conversation usage accounting and limits.
+
+The graph state counts the conversation's `llm_calls`, `tool_calls` and `tokens`, and the current turn's in
+`turn_usage`, which also counts how often each distinct tool call ran in the turn, keyed by a short digest of its name
+and arguments so the checkpoints do not carry the arguments again. UsageLimits
+short-circuits a repeated identical tool call and tool calls past the turn's cap with a result telling the model why,
+and replaces model calls past the turn's or the conversation's cap with a fixed answer, so a looping or runaway
+conversation cannot take capacity from the other patients.
+"""
+
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+from typing import Any
+
+from langchain.messages import AIMessage
+from langchain_core.messages.tool import ToolCall
+
+from src.metrics import REGISTRY
+
+TURN_LIMIT_MESSAGE = (
+    "I'm sorry, I got stuck working on that. Could you tell me again what you need, perhaps in other words?"
+)
+CONVERSATION_LIMIT_MESSAGE = (
+    "I'm sorry, this conversation has become too long for me to continue. "
+    "Please start a new conversation or call the clinic."
+)
+REPEATED_CALL_RESULT = "not run, this exact call was already made in this turn, use its earlier result"
+TOOL_LIMIT_RESULT = "not run, too many tool calls in this turn, answer with what you have"
+
+
+def tool_call_signature(tool_call: ToolCall) -> str:
+    call = json.dumps([tool_call["name"], tool_call["args"]], sort_keys=True, default=str)
+    return hashlib.blake2b(call.encode(), digest_size=8).hexdigest()
+
+
+def message_tokens(message: Any) -> int:
+    return (getattr(message, "usage_metadata", None) or {}).get("total_tokens", 0)
+
+
+def usage_update(
+    state: dict[str, Any], *, llm_calls: int = 0, tokens: int = 0, tool_calls: Iterable[ToolCall] = ()
+) -> dict[str, Any]:
+    """The state update adding model calls, their tokens and the tool calls run to the conversation and turn usage"""
+    turn = state.get("turn_usage") or {}
+    calls = dict(turn.get("calls", {}))
+    ran = 0
+    for tool_call in tool_calls:
+        signature = tool_call_signature(tool_call)
+        calls[signature] = calls.get(signature, 0) + 1
+        ran += 1
+    return {
+        "llm_calls": state.get("llm_calls", 0) + llm_calls,
+        "tool_calls": state.get("tool_calls", 0) + ran,
+        "tokens": state.get("tokens", 0) + tokens,
+        "turn_usage": {
+            "llm_calls": turn.get("llm_calls", 0) + llm_calls,
+            "tool_calls": turn.get("tool_calls", 0) + ran,
+            "tokens": turn.get("tokens", 0) + tokens,
+            "calls": calls,
+        },
+    }
+
+
+class UsageLimits:
+    """Limits on a turn's and a conversation's usage, 0 disables a limit"""
+
+    def __init__(
+        self,
+        *,
+        turn_llm_calls: int = 15,
+        turn_tool_calls: int = 30,
+        repeated_tool_calls: int = 2,
+        conversation_llm_calls: int = 300,
+        conversation_tokens: int = 2_000_000,
+    ):
+        self.turn_llm_calls = turn_llm_calls
+        self.turn_tool_calls = turn_tool_calls
+        self.repeated_tool_calls = repeated_tool_calls
+        self.conversation_llm_calls = conversation_llm_calls
+        self.conversation_tokens = conversation_tokens
+
+    @classmethod
+    def from_env(cls) -> "UsageLimits":
+        """
+        ACME_LIMIT_TURN_LLM_CALLS, ACME_LIMIT_TURN_TOOL_CALLS, ACME_LIMIT_REPEATED_TOOL_CALLS,
+        ACME_LIMIT_CONVERSATION_LLM_CALLS and ACME_LIMIT_CONVERSATION_TOKENS override the defaults
+        """
+        return cls(
+            turn_llm_calls=int(os.getenv("ACME_LIMIT_TURN_LLM_CALLS", 15)),
+            turn_tool_calls=int(os.getenv("ACME_LIMIT_TURN_TOOL_CALLS", 30)),
+            repeated_tool_calls=int(os.getenv("ACME_LIMIT_REPEATED_TOOL_CALLS", 2)),
+            conversation_llm_calls=int(os.getenv("ACME_LIMIT_CONVERSATION_LLM_CALLS", 300)),
+            conversation_tokens=int(os.getenv("ACME_LIMIT_CONVERSATION_TOKENS", 2_000_000)),
+        )
+
+    def exceeded(self, state: dict[str, Any]) -> str | None:
+        """The limit that forbids another model call, if any"""
+        turn = state.get("turn_usage") or {}
+        if self.conversation_llm_calls and state.get("llm_calls", 0) >= self.conversation_llm_calls:
+            limit = "conversation_llm_calls"
+        elif self.conversation_tokens and state.get("tokens", 0) >= self.conversation_tokens:
+            limit = "conversation_tokens"
+        elif self.turn_llm_calls and turn.get("llm_calls", 0) >= self.turn_llm_calls:
+            limit = "turn_llm_calls"
+        else:
+            return None
+        REGISTRY.inc("usage_limit_total", limit=limit)
+        return limit
+
+    def refused(self, state: dict[str, Any], tool_calls: list[ToolCall]) -> dict[str, str]:
+        """The results of the tool calls that must not run, by tool call id"""
+        turn = state.get("turn_usage") or {}
+        calls, ran = dict(turn.get("calls", {})), turn.get("tool_calls", 0)
+        refused = {}
+        for tool_call in tool_calls:
+            signature = tool_call_signature(tool_call)
+            if self.repeated_tool_calls and calls.get(signature, 0) >= self.repeated_tool_calls:
+                refused[tool_call["id"]] = REPEATED_CALL_RESULT
+                REGISTRY.inc("usage_limit_total", limit="repeated_tool_calls")
+            elif self.turn_tool_calls and ran >= self.turn_tool_calls:
+                refused[tool_call["id"]] = TOOL_LIMIT_RESULT
+                REGISTRY.inc("usage_limit_total", limit="turn_tool_calls")
+            else:
+                calls[signature] = calls.get(signature, 0) + 1
+                ran += 1
+        return refused
+
+
+def limit_reply(limit: str) -> AIMessage:
+    """The answer given instead of a model call past `limit`"""
+    content = CONVERSATION_LIMIT_MESSAGE if limit.startswith("conversation") else TURN_LIMIT_MESSAGE
+    return AIMessage(content=content, response_metadata={"limit": limit})
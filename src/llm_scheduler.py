@@ -0,0 +1,187 @@
+"""
+Priority scheduling of model calls.
+
+All nodes of an agent share one `LLMScheduler`, which admits at most `max_concurrency` model calls at a time and,
+with a `tokens_per_minute` budget, no more tokens than the provider's rate limit refills. Waiting calls are admitted
+by priority, so the completions of a booking, rescheduling or cancellation go ahead of questions, greetings and
+unclear messages, and a rate limited (429) or overloaded call is retried after a jittered exponential backoff.
+A call waits at most for the rest of the turn's budget.
+"""
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from langchain_core.messages import AnyMessage
+
+from src import deadline
+from src.limits import message_tokens
+from src.metrics import REGISTRY
+
+# Lower goes first, nodes not listed are chat
+PRIORITIES = {"booking": 0, "routing": 1, "chat": 2}
+NODE_PRIORITIES = {
+    "schedule": "booking",
+    "reschedule": "booking",
+    "cancel": "booking",
+    "detect_intent": "routing",
+    "route": "routing",
+    "review": "routing",
+}
+
+RETRYABLE_STATUS = {429, 503, 529}
+
+T = TypeVar("T")
+
+
+def estimate_tokens(messages: list[AnyMessage]) -> int:
+    """A rough count of the input tokens of a call, about 4 characters per token"""
+    return sum(len(str(m.content)) for m in messages) // 4 + 1
+
+
+def used_tokens(result: Any) -> int:
+    """The tokens a model call used, for plain and structured (include_raw) outputs"""
+    return message_tokens(result["raw"] if isinstance(result, dict) else result)
+
+
+def retry_status(error: Exception) -> int | None:
+    """The status of an error worth retrying (rate limited or overloaded), None for others"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status if status in RETRYABLE_STATUS else None
+
+
+def retry_after(error: Exception) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LLMScheduler:
+    """
+    Admits model calls by priority, then in arrival order, within `max_concurrency` concurrent calls and a
+    `tokens_per_minute` budget (0 disables either). A call is charged its estimated input tokens when admitted and
+    corrected to the tokens it used once it returns.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 16,
+        tokens_per_minute: int = 0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.condition = threading.Condition()
+        self.waiting: list[tuple[int, int]] = []
+        self.tickets = itertools.count()
+        self.running = 0
+        self.tokens = float(tokens_per_minute)
+        self.refilled = clock()
+
+    @classmethod
+    def from_env(cls, **overrides: Any) -> "LLMScheduler":
+        """
+        ACME_LLM_CONCURRENCY, ACME_LLM_TOKENS_PER_MINUTE and ACME_LLM_MAX_RETRIES override the defaults, and the
+        keyword arguments (e.g. a tenant's budget) override those
+        """
+        settings = {
+            "max_concurrency": int(os.getenv("ACME_LLM_CONCURRENCY", 16)),
+            "tokens_per_minute": int(os.getenv("ACME_LLM_TOKENS_PER_MINUTE", 0)),
+            "max_retries": int(os.getenv("ACME_LLM_MAX_RETRIES", 3)),
+        }
+        return cls(**{**settings, **overrides})
+
+    @staticmethod
+    def priority(node: str) -> str:
+        return NODE_PRIORITIES.get(node, "chat")
+
+    def _refill(self) -> None:
+        now = self.clock()
+        if self.tokens_per_minute:
+            self.tokens = min(self.tokens_per_minute, self.tokens + (now - self.refilled) * self.tokens_per_minute / 60)
+        self.refilled = now
+
+    def _admission_wait(self, ticket: tuple[int, int], tokens: int) -> float | None:
+        """0 when the call can be admitted now, otherwise how long to wait at most before checking again"""
+        if self.waiting[0] != ticket or (self.max_concurrency and self.running >= self.max_concurrency):
+            return None
+        if not self.tokens_per_minute:
+            return 0.0
+        missing = min(tokens, self.tokens_per_minute) - self.tokens
+        return 0.0 if missing <= 0 else missing * 60 / self.tokens_per_minute
+
+    def acquire(self, node: str, tokens: int) -> None:
+        """Waits for the call's turn, raises DeadlineExceeded when the turn's budget runs out first"""
+        priority = self.priority(node)
+        ticket = (PRIORITIES[priority], next(self.tickets))
+        started = self.clock()
+        with self.condition:
+            heapq.heappush(self.waiting, ticket)
+            REGISTRY.set("llm_queue_depth", len(self.waiting))
+            try:
+                while True:
+                    self._refill()
+                    wait = self._admission_wait(ticket, tokens)
+                    if wait == 0.0:
+                        break
+                    left = deadline.remaining()
+                    if left == 0.0:
+                        REGISTRY.inc("deadline_exceeded_total")
+                        raise deadline.DeadlineExceeded("The turn ran out of time waiting for the model")
+                    if left is not None:
+                        wait = left if wait is None else min(wait, left)
+                    self.condition.wait(wait)
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                REGISTRY.set("llm_queue_depth", len(self.waiting))
+                # The next call in line may be admitted, or move to the head of the queue
+                self.condition.notify_all()
+            self.running += 1
+            self.tokens -= tokens
+        REGISTRY.observe("llm_queue_wait_seconds", self.clock() - started, priority=priority)
+
+    def release(self, estimated: int, used: int) -> None:
+        with self.condition:
+            self.running -= 1
+            self.tokens -= used - estimated
+            self.condition.notify_all()
+
+    def run(self, node: str, messages: list[AnyMessage], call: Callable[[], T]) -> T:
+        """Makes the model call for `node` on `messages` when admitted, retrying rate limited and overloaded calls"""
+        estimated = estimate_tokens(messages)
+        for attempt in itertools.count():
+            self.acquire(node, estimated)
+            try:
+                result = call()
+            except Exception as e:
+                self.release(estimated, estimated)
+                status = retry_status(e)
+                if status is None or attempt >= self.max_retries:
+                    raise
+                delay = max(retry_after(e), random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt)))
+                left = deadline.remaining()
+                if left is not None and left <= delay:
+                    raise
+                REGISTRY.inc("llm_retries_total", node=node, status=status)
+                self.sleep(delay)
+                continue
+            self.release(estimated, used_tokens(result) or estimated)
+            return result
@@ -2,24 +2,144 @@
 
 import argparse
 import logging
+import uuid
 from datetime import datetime
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import pytz
 from dotenv import load_dotenv
 from langchain.messages import HumanMessage
-from langchain_core.language_models import BaseChatModel
 from langgraph.types import Command
 
-from src.agent import create_acme_dental_agent
+from src.api.calendly import CalendlyClient
+from src.api.resilience import CircuitBreaker, Hedger
+from src.deadline import turn_budget, with_deadline
+from src.metrics import REGISTRY
+
+# The optional features' modules are imported when enabled, which keeps them out of a plain start
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+    from src.cassette import Cassette
+    from src.shared_cache import SharedCache
+    from src.tenants import TenantRegistry
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
     parser.add_argument("--debug", action="store_true", help="Enable DEBUG logging level")
+    parser.add_argument("--thread-id", default=None, help="Resume a previous conversation by its thread id")
+    parser.add_argument(
+        "--single-call-routing", action="store_true", help="Detect the intent and start acting on it in one LLM call"
+    )
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        metavar="PATH",
+        help="Collect metrics and spans, and write them as JSON lines on exit",
+    )
+    parser.add_argument(
+        "--record", default=None, metavar="PATH", help="Record the model and Calendly exchanges to a cassette"
+    )
+    parser.add_argument(
+        "--prefetch", action="store_true", help="Start the Calendly reads of scheduling intents as soon as detected"
+    )
+    parser.add_argument(
+        "--background-tools",
+        action="store_true",
+        help="Answer the patient while slow lookups continue in the background",
+    )
+    parser.add_argument(
+        "--slot-calendar", action="store_true", help="Search free slots in a local copy of the Calendly calendar"
+    )
+    parser.add_argument(
+        "--event-mirror", action="store_true", help="Look up patients' appointments in a local copy of the events"
+    )
+    parser.add_argument(
+        "--circuit-breaker", action="store_true", help="Fail Calendly calls fast while Calendly is failing or slow"
+    )
+    parser.add_argument("--hedge", action="store_true", help="Send slow Calendly reads a second time, first one wins")
+    parser.add_argument(
+        "--calendly-cache-ttl",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Cache Calendly reads for this many seconds (ACME_CALENDLY_CACHE_TTL, off by default)",
+    )
+    parser.add_argument(
+        "--tenant",
+        default=None,
+        metavar="ID",
+        help="Talk to a clinic of the tenant registry (ACME_TENANTS_CONFIG, config/tenants.toml by default)",
+    )
+    parser.add_argument(
+        "--turn-budget",
+        type=float,
+        default=turn_budget(),
+        metavar="SECONDS",
+        help="Answer within this many seconds per turn, 0 for no limit (ACME_TURN_BUDGET, 60 by default)",
+    )
     return parser.parse_args()
 
 
+def calendly_options(
+    args: argparse.Namespace, recording: bool = False, shared_cache: "SharedCache | None" = None
+) -> dict[str, Any]:
+    """
+    CalendlyClient keyword arguments for the --circuit-breaker, --hedge and --calendly-cache-ttl flags, and a worker's
+    shared cache
+    """
+    return {
+        "cache_ttl": args.calendly_cache_ttl,
+        "breaker": CircuitBreaker.from_env() if args.circuit_breaker else None,
+        # A cassette would record both requests of a hedge
+        "hedger": Hedger() if args.hedge and not recording else None,
+        "shared_cache": shared_cache,
+    }
+
+
+def tenant_registry(
+    args: argparse.Namespace, cassette: "Cassette | None" = None, shared_cache: "SharedCache | None" = None
+) -> "TenantRegistry":
+    """The configured clinics, whose Calendly clients share a connection pool and hedger but have their own breaker"""
+    from src.cassette import CassetteTransport
+    from src.tenants import TenantRegistry, shared_session
+
+    hedger = calendly_options(args, recording=cassette is not None)["hedger"]
+
+    def client_factory(**kwargs: Any) -> CalendlyClient:
+        # A fresh breaker, so a clinic whose token keeps failing does not fail the others
+        return CalendlyClient(**{**calendly_options(args, shared_cache=shared_cache), "hedger": hedger}, **kwargs)
+
+    transport = CassetteTransport(cassette, shared_session()) if cassette else None
+    return TenantRegistry.from_config(client_factory=client_factory, transport=transport)
+
+
+def optional_features(args: argparse.Namespace, calendly_client: CalendlyClient) -> dict[str, Any]:
+    """
+    create_acme_dental_agent keyword arguments for the --prefetch, --background-tools, --slot-calendar and
+    --event-mirror flags, importing only the modules of the enabled features
+    """
+    features: dict[str, Any] = {"prefetcher": None, "background": None, "slot_calendar": None, "event_mirror": None}
+    if args.prefetch:
+        from src.prefetch import CalendlyPrefetcher
+
+        features["prefetcher"] = CalendlyPrefetcher(calendly_client)
+    if args.background_tools:
+        from src.background import BackgroundTools
+
+        features["background"] = BackgroundTools.from_env()
+    if args.slot_calendar:
+        from src.slot_calendar import SlotCalendar
+
+        features["slot_calendar"] = SlotCalendar.from_env(calendly_client)
+    if args.event_mirror:
+        from src.event_mirror import EventMirror
+
+        features["event_mirror"] = EventMirror.from_env(calendly_client)
+    return features
+
+
 def configure_logging(debug: bool) -> None:
     logging.basicConfig(
         level=logging.DEBUG if debug else logging.ERROR, format="%(asctime)s [%(levelname)s] %(message)s"
@@ -32,7 +152,7 @@ def get_current_timezone_string():
     return str(timezone) if timezone else "UTC"
 
 
-def invoke_and_print(agent: BaseChatModel, input_data: dict[str, Any], config: dict):
+def invoke_and_print(agent: "CompiledStateGraph", input_data: dict[str, Any], config: dict):
     result = agent.invoke(input_data, config=config)
     new_messages = result.get("messages", [])
     if not new_messages:
@@ -44,17 +164,55 @@ def invoke_and_print(agent: BaseChatModel, input_data: dict[str, Any], config: d
 
 
 def main():
-    config = {"configurable": {"thread_id": "approval-123"}}
+    from src.agent import create_acme_dental_agent
+    from src.blobs import BlobStore
+    from src.checkpoint import SQLiteSaver
+    from src.responses import Responder
+
     args = parse_args()
     configure_logging(args.debug)
     logging.debug("Debug logging is enabled.")
     logging.info("Application started.")
+    if args.metrics:
+        REGISTRY.enable()
     load_dotenv()
-    agent = create_acme_dental_agent()
-    waiting_for_user_input = False
-    timezone = get_current_timezone_string()
-    input_data = {"messages": [HumanMessage(role="user", content=f"hello, my timezone is {timezone}")]}
-    result = invoke_and_print(agent, input_data, config)
+    config = {"configurable": {"thread_id": args.thread_id or str(uuid.uuid4())}}
+    cassette = None
+    if args.record:
+        from src.cassette import Cassette
+
+        cassette = Cassette(args.record, mode="record")
+    tenants = tenant_registry(args, cassette) if args.tenant else None
+    if tenants:
+        from src.tenants import thread_id
+
+        config["configurable"]["thread_id"] = thread_id(args.tenant, config["configurable"]["thread_id"])
+        calendly_client = tenants.get(args.tenant).calendly_client
+    else:
+        options = calendly_options(args, recording=cassette is not None)
+        calendly_client = cassette.calendly_client(**options) if cassette else CalendlyClient(**options)
+    features = optional_features(args, calendly_client)
+    agent = create_acme_dental_agent(
+        checkpointer=SQLiteSaver.from_env(),
+        blob_store=BlobStore.from_env(),
+        single_call_routing=args.single_call_routing,
+        model_router=cassette.model_router() if cassette else None,
+        calendly_client=calendly_client,
+        responder=Responder.from_config(),
+        tenants=tenants,
+        **features,
+    )
+    prefetcher, background = features["prefetcher"], features["background"]
+    # A resumed conversation is parked on the user_input interrupt, so skip the greeting
+    waiting_for_user_input = bool(agent.get_state(config).interrupts)
+    if waiting_for_user_input:
+        print(f"Resuming conversation {config['configurable']['thread_id']}\n")
+    else:
+        logging.info(f"Starting conversation {config['configurable']['thread_id']}")
+        timezone = get_current_timezone_string()
+        input_data = {"messages": [HumanMessage(role="user", content=f"hello, my timezone is {timezone}")]}
+        result = invoke_and_print(agent, input_data, with_deadline(config, args.turn_budget))
+        waiting_for_user_input = "__interrupt__" in result if result else False
     while True:
         user_input = input("You: ")
         if user_input.lower() in ["exit", "quit", "q"]:
@@ -64,10 +222,21 @@ def main():
             invoke_input = (
                 Command(resume={"messages": user_message}) if waiting_for_user_input else {"messages": user_message}
             )
-            result = invoke_and_print(agent, invoke_input, config)
+            result = invoke_and_print(agent, invoke_input, with_deadline(config, args.turn_budget))
             waiting_for_user_input = "__interrupt__" in result if result else False
         except Exception as e:
             print(f"Error: {e}\n")
+    if prefetcher:
+        prefetcher.close()
+    if background:
+        background.close()
+    if calendly_client.hedger:
+        calendly_client.hedger.close()
+    if cassette:
+        cassette.close()
+    if args.metrics:
+        with open(args.metrics, "w") as f:
+            f.writelines(f"{line}\n" for line in REGISTRY.jsonl(spans=True))
 
 
 if __name__ == "__main__":
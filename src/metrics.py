@@ -0,0 +1,215 @@
+"""
+In-process metrics and tracing spans.
+
+Everything is a no-op until enabled (ACME_METRICS=1 or `REGISTRY.enable()`), so instrumented hot paths only pay
+for a flag check. When enabled, spans feed latency histograms and are kept in a bounded buffer, and the registry
+can be exported as Prometheus text or JSON lines.
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 60.0)
+
+INF_LABEL = 'le="+Inf"'
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[int]:
+        total, cumulative = 0, []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False, max_spans: int = 10_000):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.gauges: dict[str, dict[Labels, float]] = {}
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.spans: deque[dict[str, Any]] = deque(maxlen=max_spans)
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.spans.clear()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self.lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] = LATENCY_BUCKETS, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def record_span(self, name: str, start: float, duration: float, error: str | None, labels: dict[str, Any]) -> None:
+        self.observe(f"{name}_seconds", duration, **labels)
+        if error:
+            self.inc(f"{name}_errors_total", error=error, **labels)
+        with self.lock:
+            self.spans.append({"span": name, "start": start, "duration_s": duration, "error": error, **labels})
+
+    # Export
+
+    @staticmethod
+    def _labels(key: Labels, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in key] + ([extra] if extra else [])
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE acme_{name} counter")
+                lines += [f"acme_{name}{self._labels(key)} {value:g}" for key, value in series.items()]
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE acme_{name} gauge")
+                lines += [f"acme_{name}{self._labels(key)} {value:g}" for key, value in series.items()]
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE acme_{name} histogram")
+                for key, histogram in series.items():
+                    for bound, count in zip(histogram.buckets, histogram.cumulative(), strict=True):
+                        le = f'le="{bound:g}"'
+                        lines.append(f"acme_{name}_bucket{self._labels(key, le)} {count}")
+                    lines.append(f"acme_{name}_bucket{self._labels(key, INF_LABEL)} {histogram.count}")
+                    lines.append(f"acme_{name}_sum{self._labels(key)} {histogram.sum:g}")
+                    lines.append(f"acme_{name}_count{self._labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def jsonl(self, spans: bool = False) -> Iterator[str]:
+        """Yields one JSON document per series, followed by the buffered spans if requested"""
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                for key, value in series.items():
+                    yield json.dumps({"metric": name, "type": "counter", "labels": dict(key), "value": value})
+            for name, series in sorted(self.gauges.items()):
+                for key, value in series.items():
+                    yield json.dumps({"metric": name, "type": "gauge", "labels": dict(key), "value": value})
+            for name, series in sorted(self.histograms.items()):
+                for key, histogram in series.items():
+                    yield json.dumps(
+                        {
+                            "metric": name,
+                            "type": "histogram",
+                            "labels": dict(key),
+                            "count": histogram.count,
+                            "sum": histogram.sum,
+                            "buckets": dict(zip(map(str, histogram.buckets), histogram.cumulative(), strict=True)),
+                        }
+                    )
+            buffered = list(self.spans) if spans else []
+        for span_record in buffered:
+            yield json.dumps(span_record)
+
+
+REGISTRY = MetricsRegistry(enabled=os.getenv("ACME_METRICS", "") not in ("", "0"))
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def _span(name: str, labels: dict[str, Any]) -> Iterator[None]:
+    start = time.time()
+    began = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        REGISTRY.record_span(name, start, time.perf_counter() - began, error, labels)
+
+
+def span(name: str, **labels: Any):
+    """Times the enclosed block as a `<name>_seconds` histogram and counts failures, when metrics are enabled"""
+    if not REGISTRY.enabled:
+        return _NOOP_SPAN
+    return _span(name, labels)
+
+
+def record_llm_usage(node: str, message: Any) -> None:
+    """Counts the calls and tokens reported by a model response"""
+    if not REGISTRY.enabled:
+        return
+    model = (getattr(message, "response_metadata", None) or {}).get("model_name", "unknown")
+    REGISTRY.inc("llm_calls_total", node=node, model=model)
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return
+    cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+    REGISTRY.inc("llm_tokens_total", usage.get("input_tokens", 0), node=node, model=model, kind="input")
+    REGISTRY.inc("llm_tokens_total", usage.get("output_tokens", 0), node=node, model=model, kind="output")
+    REGISTRY.inc("llm_tokens_total", cached, node=node, model=model, kind="cached")
+
+
+_ID_SEGMENT = re.compile(r"/[0-9A-Za-z-]{16,}(?=/|$)")
+
+
+def endpoint_label(path: str) -> str:
+    """Collapses resource ids in an API path so every endpoint maps to a single label value"""
+    return _ID_SEGMENT.sub("/{id}", path)
@@ -0,0 +1,74 @@
+"""Per-node chat model selection"""
+
+import functools
+import json
+import os
+import tomllib
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from langchain.chat_models import init_chat_model
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+
+DEFAULT_MODELS_CONFIG = os.path.join(os.path.dirname(__file__), "config", "models.toml")
+
+
+def load_models_config(path: str | None = None) -> dict[str, Any]:
+    """
+    Load the node -> model mapping from a TOML file (ACME_MODELS_CONFIG, or config/models.toml by default).
+    The file has a [default] table and optional [nodes.<node>] tables that override it.
+    """
+    path = path or os.getenv("ACME_MODELS_CONFIG") or DEFAULT_MODELS_CONFIG
+    with open(path, "rb") as f:
+        config = tomllib.load(f)
+
+    if "model" not in config.get("default", {}):
+        raise ValueError(f"{path}: [default] must set a model")
+    return config
+
+
+class ModelRouter:
+    """
+    Resolves the chat model to use for each graph node.
+    Nodes configured with identical settings share a single model instance.
+    """
+
+    def __init__(self, config: dict[str, Any], factory: Callable[..., BaseChatModel] = init_chat_model):
+        self.default: dict[str, Any] = config["default"]
+        self.nodes: dict[str, dict[str, Any]] = config.get("nodes", {})
+        self.factory = factory
+        self.models: dict[str, BaseChatModel] = {}
+
+    @classmethod
+    def from_config(cls, path: str | None = None, **kwargs: Any) -> "ModelRouter":
+        return cls(load_models_config(path), **kwargs)
+
+    def spec(self, node: str) -> dict[str, Any]:
+        """Returns the init_chat_model arguments for the node"""
+        return {**self.default, **self.nodes.get(node, {})}
+
+    def for_node(self, node: str) -> BaseChatModel:
+        spec = self.spec(node)
+        key = json.dumps(spec, sort_keys=True)
+        if key not in self.models:
+            self.models[key] = self.factory(**spec)
+        return self.models[key]
+
+    def lazy(self, node: str, bind: Callable[[BaseChatModel], Runnable] | None = None) -> Callable[[], Runnable]:
+        """
+        Returns the node's model, set up by `bind` (e.g. binding its tools), created on first use.
+        Creating a model imports and configures its provider SDK, which this keeps out of startup.
+        """
+
+        @functools.cache
+        def model() -> Runnable:
+            return bind(self.for_node(node)) if bind else self.for_node(node)
+
+        return model
+
+    def validate(self, node_names: Iterable[str]) -> None:
+        """Fails fast on configuration for nodes the graph does not have, which is most likely a typo"""
+        unknown = set(self.nodes) - set(node_names)
+        if unknown:
+            raise ValueError(f"Models configured for unknown nodes: {', '.join(sorted(unknown))}")
@@ -0,0 +1,123 @@
+"""
+Speculative Calendly prefetch.
+
+Once an intent is detected, the Calendly reads its tools are about to make are predictable: scheduling starts from
+the current user, the event types and their availability, rescheduling also lists the booked events. The prefetcher
+starts those reads on a small thread pool while the intent's model call is still running, so they land in the
+CalendlyClient cache and the tool calls that follow are served from it.
+
+A prediction that turns out wrong costs at most the request in flight: the chain is cancelled between requests when
+the same conversation moves to another intent, and gives up after `deadline` seconds.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from langgraph.config import get_config
+
+from src.api.calendly import CalendlyClient
+from src.metrics import REGISTRY
+
+PREFETCH_INTENTS = ("schedule", "reschedule")
+
+
+class PrefetchCancelled(Exception):
+    pass
+
+
+class CalendlyPrefetcher:
+    """
+    Warms the CalendlyClient cache for the intents in PREFETCH_INTENTS, at most one chain per conversation and
+    `max_workers` chains at a time. Availability is fetched for `window_days` days from `now()`.
+    """
+
+    def __init__(
+        self,
+        client: CalendlyClient,
+        *,
+        max_workers: int = 4,
+        deadline: float = 10.0,
+        window_days: int = 7,
+        now: Callable[[], datetime] = lambda: datetime.now(UTC),
+    ):
+        if not client.cache_ttl:
+            logging.warning("Prefetching has no effect while the Calendly cache is off, see ACME_CALENDLY_CACHE_TTL")
+        self.client = client
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.window_days = window_days
+        self.now = now
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="calendly-prefetch")
+        self.lock = threading.Lock()
+        # thread id -> cancellation flag of the conversation's running chain
+        self.running: dict[str, threading.Event] = {}
+
+    def on_intent(self, intent: str) -> None:
+        """Called by the graph with every detected intent, starts or cancels the conversation's prefetch"""
+        try:
+            thread_id = str(get_config()["configurable"].get("thread_id", ""))
+        except RuntimeError:
+            thread_id = ""
+
+        with self.lock:
+            if previous := self.running.pop(thread_id, None):
+                previous.set()
+                REGISTRY.inc("calendly_prefetch_total", result="cancelled")
+            if intent not in PREFETCH_INTENTS:
+                return
+            if len(self.running) >= self.max_workers:
+                REGISTRY.inc("calendly_prefetch_total", result="skipped")
+                return
+            cancelled = threading.Event()
+            self.running[thread_id] = cancelled
+        self.executor.submit(self.prefetch, thread_id, intent, cancelled)
+
+    def prefetch(self, thread_id: str, intent: str, cancelled: threading.Event) -> None:
+        started = time.monotonic()
+
+        def step(read: Callable[[], Any]) -> Any:
+            if cancelled.is_set() or time.monotonic() - started > self.deadline:
+                raise PrefetchCancelled()
+            return read()
+
+        try:
+            user = step(self.client.get_current_user).get("resource", {})
+            user_uri, organization = user.get("uri"), user.get("current_organization")
+            if intent == "reschedule":
+                step(
+                    lambda: self.client.list_scheduled_events(
+                        user=user_uri, organization=organization, count=20, status="active"
+                    )
+                )
+            event_types = step(lambda: self.client.list_event_types(organization=organization, user=user_uri))
+            start = self.now()
+            end = start + timedelta(days=self.window_days)
+            for event_type in event_types:
+                if event_type.get("active", True) and event_type.get("uri"):
+                    step(
+                        lambda uri=event_type["uri"]: self.client.list_event_type_available_times(
+                            uri, start.strftime("%Y-%m-%dT%H:%M:%SZ"), end.strftime("%Y-%m-%dT%H:%M:%SZ")
+                        )
+                    )
+            REGISTRY.inc("calendly_prefetch_total", result="done")
+        except PrefetchCancelled:
+            pass
+        except Exception:
+            # The tool calls will make the same requests and report the failure
+            logging.debug("Calendly prefetch failed", exc_info=True)
+            REGISTRY.inc("calendly_prefetch_total", result="failed")
+        finally:
+            with self.lock:
+                if self.running.get(thread_id) is cancelled:
+                    del self.running[thread_id]
+
+    def close(self) -> None:
+        with self.lock:
+            for cancelled in self.running.values():
+                cancelled.set()
+        self.executor.shutdown(wait=True)
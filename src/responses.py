@@ -0,0 +1,119 @@
+"""
+Templated replies for deterministic nodes and terminal tool results.
+
+Greetings, farewells and the confirmation of a booking or cancellation say the same thing every time, so they are
+rendered from prompts/responses/<template>.txt instead of spending a model call on them. Which nodes and tools are
+templated is configured in config/responses.toml; anything a template cannot fill is left to the model. A tenant's
+own responses/<template>.txt replaces the built-in template for its conversations.
+"""
+
+import json
+import os
+import tomllib
+from collections.abc import Iterable
+from string import Template
+from typing import Any
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from langchain.messages import AIMessage
+from langchain_core.messages.tool import ToolCall
+
+from src.api.calendly import parse_time
+from src.metrics import REGISTRY
+from src.tenants import tenant_file
+
+DEFAULT_RESPONSES_CONFIG = os.path.join(os.path.dirname(__file__), "config", "responses.toml")
+RESPONSES_DIR = os.path.join(os.path.dirname(__file__), "prompts", "responses")
+
+
+def flatten(value: dict[str, Any], prefix: str = "") -> dict[str, str]:
+    """Nested keys joined by "_", e.g. {"invitee": {"name": ..}} -> {"invitee_name": ..}"""
+    flat: dict[str, str] = {}
+    for key, item in value.items():
+        if isinstance(item, dict):
+            flat.update(flatten(item, f"{prefix}{key}_"))
+        elif item is not None:
+            flat[f"{prefix}{key}"] = str(item)
+    return flat
+
+
+def local_time(value: str, timezone: str) -> str | None:
+    moment = parse_time(value)
+    if not moment:
+        return None
+    try:
+        moment = moment.astimezone(ZoneInfo(timezone))
+    except (ZoneInfoNotFoundError, ValueError):
+        timezone = "UTC"
+        moment = moment.astimezone(ZoneInfo(timezone))
+    return f"{moment:%A} {moment.day} {moment:%B %Y at %H:%M} ({timezone})"
+
+
+def tool_context(tool_call: ToolCall, observation: Any) -> dict[str, str]:
+    """The placeholders of a tool call's input and the resource it returned"""
+    args = tool_call["args"]
+    try:
+        payload = json.loads(args["input_str"]) if "input_str" in args else args
+    except (TypeError, json.JSONDecodeError):
+        payload = {}
+    resource = observation.get("resource", observation)
+    context = flatten({**(payload if isinstance(payload, dict) else {}), **resource})
+    if start_time := context.get("start_time"):
+        timezone = context.get("invitee_timezone") or context.get("timezone") or "UTC"
+        if when := local_time(start_time, timezone):
+            context["when"] = when
+    return context
+
+
+class Responder:
+    """Renders the templated replies configured for the graph's nodes"""
+
+    def __init__(self, config: dict[str, Any], templates_dir: str = RESPONSES_DIR):
+        self.nodes: dict[str, dict[str, Any]] = config.get("nodes", {})
+        self.templates_dir = templates_dir
+        self.templates: dict[str, Template] = {}  # by path
+
+    @classmethod
+    def from_config(cls, path: str | None = None) -> "Responder":
+        """Loads config/responses.toml, or the file ACME_RESPONSES_CONFIG points at"""
+        path = path or os.getenv("ACME_RESPONSES_CONFIG") or DEFAULT_RESPONSES_CONFIG
+        with open(path, "rb") as f:
+            return cls(tomllib.load(f))
+
+    def template(self, name: str) -> Template:
+        path = tenant_file(f"responses/{name}.txt") or os.path.join(self.templates_dir, f"{name}.txt")
+        if path not in self.templates:
+            with open(path, encoding="utf-8") as f:
+                self.templates[path] = Template(f.read().strip())
+        return self.templates[path]
+
+    def validate(self, node_names: Iterable[str]) -> None:
+        """Fails fast on unknown nodes and missing templates"""
+        unknown = set(self.nodes) - set(node_names)
+        if unknown:
+            raise ValueError(f"Responses configured for unknown nodes: {', '.join(sorted(unknown))}")
+        for node in self.nodes.values():
+            for name in [node.get("template"), *node.get("after_tools", {}).values()]:
+                if name:
+                    self.template(name)
+
+    def render(self, node: str, name: str, context: dict[str, str]) -> AIMessage | None:
+        """The reply from template `name`, None when the context does not fill all of its placeholders"""
+        try:
+            content = self.template(name).substitute(context)
+        except (KeyError, ValueError):
+            return None
+        REGISTRY.inc("templated_responses_total", node=node, template=name)
+        return AIMessage(content=content, response_metadata={"template": name})
+
+    def for_node(self, node: str) -> AIMessage | None:
+        """The node's templated reply, if it has one"""
+        name = self.nodes.get(node, {}).get("template")
+        return self.render(node, name, {}) if name else None
+
+    def after_tools(self, node: str, tool_calls: list[ToolCall], observations: list[Any]) -> AIMessage | None:
+        """The reply to a single successful tool call whose tool has a template for `node`, if any"""
+        templates = self.nodes.get(node, {}).get("after_tools", {})
+        if len(tool_calls) != 1 or tool_calls[0]["name"] not in templates or not isinstance(observations[0], dict):
+            return None
+        return self.render(node, templates[tool_calls[0]["name"]], tool_context(tool_calls[0], observations[0]))
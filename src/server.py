@@ -0,0 +1,548 @@
+"""
+HTTP chat server for the Acme Dental AI Agent, serving many patients from one process.
+
+    POST   /sessions                {"timezone": "Europe/Dublin"}  -> {"session_id", "messages", "waiting"}
+                                    (and "tenant": "<id>" with --tenants)
+    POST   /sessions/<id>/messages  {"content": "..."}             -> {"messages", "waiting"}
+    DELETE /sessions/<id>                                          -> {"deleted": true}
+    GET    /healthz                                                -> {"sessions", "running", "pending"}
+    GET    /metrics[?format=jsonl]                                 -> Prometheus text (or JSON lines)
+    POST   /webhooks/calendly       Calendly webhook body          -> {"applied": bool}, with an event mirror
+
+Every session is its own graph thread. A turn either starts the graph or, when the graph is parked on the
+`user_input` interrupt, resumes it with the patient's message. Requests sent with `Accept: text/event-stream`
+get each agent message as a server-sent event as soon as its node finishes, followed by a `done` event.
+With --tenants, one server and graph serve every clinic of the tenant registry, and a session belongs to the clinic
+it was created for (its id is "<tenant>:<conversation>").
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from dotenv import load_dotenv
+from langchain.messages import AIMessage, HumanMessage
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.types import Command
+
+from src.agent import create_acme_dental_agent, message_text
+from src.api.calendly import CalendlyClient
+from src.blobs import BlobStore
+from src.checkpoint import SQLiteSaver
+from src.deadline import turn_budget, with_deadline
+from src.main import calendly_options, configure_logging, optional_features, tenant_registry
+from src.metrics import REGISTRY, span
+from src.responses import Responder
+
+# The optional features' modules are imported when enabled, which keeps them out of a plain start
+if TYPE_CHECKING:
+    from src.event_mirror import EventMirror
+    from src.shared_cache import SharedCache
+    from src.tenants import TenantRegistry
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, headers: dict[str, str] | None = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ChatServer:
+    """
+    Serves the compiled agent graph over HTTP.
+
+    - at most `max_concurrent_turns` turns run at once, further turns wait for a slot,
+    - once `max_pending_turns` turns are running or waiting, new turns are rejected with 503 and `Retry-After`,
+    - a session runs one turn at a time, a second concurrent turn is rejected with 409,
+    - on shutdown the server stops accepting connections and waits up to `drain_timeout` for running turns.
+
+    Sessions idle for longer than `session_ttl` are forgotten by the server, their state stays in the checkpointer.
+    With an `event_mirror`, Calendly webhooks are applied to it once checked against `webhook_signing_key`. Without a
+    key they are rejected with 401, unless `insecure_webhooks` accepts them unsigned (for development).
+    Each turn must end within `turn_budget` seconds, after which the agent answers with what it has.
+    With `tenants`, sessions are created for the requested tenant, or the registry's default.
+    With `leases`, shared by the worker processes of a pool, a session's turn runs on one worker at a time.
+    """
+
+    def __init__(
+        self,
+        agent: CompiledStateGraph,
+        *,
+        greet: bool = True,
+        max_concurrent_turns: int = 32,
+        max_pending_turns: int = 256,
+        drain_timeout: float = 30.0,
+        session_ttl: float = 60 * 60,
+        event_mirror: "EventMirror | None" = None,
+        webhook_signing_key: str | None = None,
+        insecure_webhooks: bool = False,
+        turn_budget: float | None = None,
+        tenants: "TenantRegistry | None" = None,
+        leases: "SharedCache | None" = None,
+        lease_ttl: float = 10 * 60,
+    ):
+        self.agent = agent
+        self.leases = leases
+        self.lease_ttl = lease_ttl
+        self.tenants = tenants
+        self.turn_budget = turn_budget
+        self.event_mirror = event_mirror
+        self.webhook_signing_key = webhook_signing_key
+        self.insecure_webhooks = insecure_webhooks
+        self.greet = greet
+        self.max_pending_turns = max_pending_turns
+        self.drain_timeout = drain_timeout
+        self.session_ttl = session_ttl
+        self.slots = asyncio.Semaphore(max_concurrent_turns)
+        self.pending = 0
+        self.running = 0
+        self.busy: set[str] = set()
+        self.sessions: OrderedDict[str, float] = OrderedDict()
+        self.connections: set[asyncio.Task] = set()
+        self.accepting = True
+        self.server: asyncio.Server | None = None
+
+    # Conversation protocol
+
+    @staticmethod
+    def config(session_id: str) -> dict[str, Any]:
+        return {"configurable": {"thread_id": session_id}}
+
+    def touch(self, session_id: str) -> None:
+        """Marks the session as active and forgets the ones idle for longer than the TTL"""
+        now = time.monotonic()
+        self.sessions[session_id] = now
+        self.sessions.move_to_end(session_id)
+        while self.sessions and next(iter(self.sessions.values())) < now - self.session_ttl:
+            self.sessions.popitem(last=False)
+
+    async def session_exists(self, session_id: str) -> bool:
+        if session_id in self.sessions:
+            return True
+        # Sessions outlive the process when the checkpointer is durable
+        state = await self.agent.aget_state(self.config(session_id))
+        return bool(state.values)
+
+    async def turn(self, session_id: str, content: str) -> AsyncIterator[dict[str, Any]]:
+        """Runs one conversation turn and yields the agent messages, then a `done` event"""
+        if not self.accepting:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "server is shutting down")
+        if self.pending >= self.max_pending_turns:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "server is busy", {"Retry-After": "1"})
+        if session_id in self.busy:
+            raise HTTPError(HTTPStatus.CONFLICT, "a turn is already running for this session")
+        if self.leases and not self.leases.lease(f"session:{session_id}", self.lease_ttl):
+            raise HTTPError(HTTPStatus.CONFLICT, "a turn is already running for this session on another worker")
+
+        self.busy.add(session_id)
+        self.pending += 1
+        try:
+            async with self.slots:
+                self.running += 1
+                try:
+                    with span("turn"):
+                        async for event in self._run_turn(session_id, content):
+                            yield event
+                finally:
+                    self.running -= 1
+        finally:
+            self.pending -= 1
+            self.busy.discard(session_id)
+            if self.leases:
+                self.leases.release(f"session:{session_id}")
+            self.touch(session_id)
+
+    async def _run_turn(self, session_id: str, content: str) -> AsyncIterator[dict[str, Any]]:
+        config = with_deadline(self.config(session_id), self.turn_budget)
+        user_message = [HumanMessage(role="user", content=content)]
+        state = await self.agent.aget_state(config)
+        invoke_input = Command(resume={"messages": user_message}) if state.interrupts else {"messages": user_message}
+
+        waiting = False
+        async for update in self.agent.astream(invoke_input, config=config, stream_mode="updates"):
+            for node, values in update.items():
+                if node == "__interrupt__":
+                    waiting = True
+                    continue
+                for message in (values or {}).get("messages", []) if isinstance(values, dict) else []:
+                    if isinstance(message, AIMessage) and (text := message_text(message)):
+                        yield {"type": "message", "node": node, "content": text}
+        yield {"type": "done", "waiting": waiting}
+
+    async def create_session(self, timezone: str, tenant: str | None = None) -> tuple[str, str]:
+        session_id = uuid.uuid4().hex
+        if self.tenants:
+            tenant = tenant or self.tenants.default
+            if tenant not in self.tenants.tenants:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "unknown tenant")
+            from src.tenants import thread_id
+
+            session_id = thread_id(tenant, session_id)
+        self.touch(session_id)
+        return session_id, f"hello, my timezone is {timezone}"
+
+    async def delete_session(self, session_id: str) -> None:
+        self.sessions.pop(session_id, None)
+        if self.agent.checkpointer:
+            await self.agent.checkpointer.adelete_thread(session_id)
+
+    # HTTP
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            method, path, headers, body, raw = await self.read_request(reader)
+            await self.route(method, path, headers, body, writer, raw)
+        except HTTPError as e:
+            await self.write_json(writer, e.status, {"error": str(e)}, e.headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.exception(e)
+            await self.write_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"})
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    @staticmethod
+    async def read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], dict[str, Any], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        try:
+            method, path, _ = request_line.split(" ", 2)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed request line") from e
+
+        headers: dict[str, str] = {}
+        while line := (await reader.readline()).decode("latin-1").strip():
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed Content-Length") from e
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+        raw = await reader.readexactly(length) if length else b""
+        try:
+            body = json.loads(raw) if raw else {}
+        except json.JSONDecodeError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be JSON") from e
+        return method, path, headers, body, raw
+
+    async def route(
+        self,
+        method: str,
+        path: str,
+        headers: dict[str, str],
+        body: dict[str, Any],
+        writer: asyncio.StreamWriter,
+        raw: bytes = b"",
+    ) -> None:
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        stream = "text/event-stream" in headers.get("accept", "")
+
+        if method == "GET" and parts == ["healthz"]:
+            health = {"sessions": len(self.sessions), "running": self.running, "pending": self.pending}
+            await self.write_json(writer, HTTPStatus.OK, health)
+        elif method == "GET" and parts == ["metrics"]:
+            if "format=jsonl" in path:
+                await self.write_text(writer, HTTPStatus.OK, "".join(f"{line}\n" for line in REGISTRY.jsonl()))
+            else:
+                await self.write_text(writer, HTTPStatus.OK, REGISTRY.prometheus(), "text/plain; version=0.0.4")
+        elif method == "POST" and parts == ["sessions"]:
+            session_id, greeting = await self.create_session(body.get("timezone", "UTC"), body.get("tenant"))
+            if self.greet:
+                await self.respond_turn(writer, session_id, greeting, stream)
+            else:
+                await self.write_json(writer, HTTPStatus.CREATED, {"session_id": session_id, "messages": []})
+        elif method == "POST" and len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages":
+            if not isinstance(body.get("content"), str) or not body["content"].strip():
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "'content' is required")
+            if not await self.session_exists(parts[1]):
+                raise HTTPError(HTTPStatus.NOT_FOUND, "unknown session")
+            await self.respond_turn(writer, parts[1], body["content"], stream)
+        elif method == "POST" and parts == ["webhooks", "calendly"] and self.event_mirror:
+            from src.event_mirror import verify_webhook
+
+            if not self.webhook_signing_key:
+                if not self.insecure_webhooks:
+                    raise HTTPError(HTTPStatus.UNAUTHORIZED, "webhooks are rejected without a signing key")
+            elif not verify_webhook(raw, headers.get("calendly-webhook-signature", ""), self.webhook_signing_key):
+                raise HTTPError(HTTPStatus.UNAUTHORIZED, "invalid webhook signature")
+            await self.write_json(writer, HTTPStatus.OK, {"applied": self.event_mirror.apply_webhook(body)})
+        elif method == "DELETE" and len(parts) == 2 and parts[0] == "sessions":
+            await self.delete_session(parts[1])
+            await self.write_json(writer, HTTPStatus.OK, {"deleted": True})
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "not found")
+
+    async def respond_turn(self, writer: asyncio.StreamWriter, session_id: str, content: str, stream: bool) -> None:
+        events = self.turn(session_id, content)
+        try:
+            if stream:
+                await self.stream_events(writer, session_id, events)
+                return
+            messages, waiting = [], False
+            async for event in events:
+                if event["type"] == "message":
+                    messages.append(event["content"])
+                else:
+                    waiting = event["waiting"]
+            await self.write_json(
+                writer, HTTPStatus.OK, {"session_id": session_id, "messages": messages, "waiting": waiting}
+            )
+        finally:
+            await events.aclose()
+
+    async def stream_events(
+        self, writer: asyncio.StreamWriter, session_id: str, events: AsyncIterator[dict[str, Any]]
+    ) -> None:
+        # Admission errors surface before the stream starts so they can still be sent as HTTP errors
+        first = await anext(events)
+        writer.write(self.head(HTTPStatus.OK, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}))
+        writer.write(self.sse({"type": "session", "session_id": session_id}))
+        writer.write(self.sse(first))
+        await writer.drain()
+        try:
+            async for event in events:
+                writer.write(self.sse(event))
+                await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            logging.exception(e)
+            writer.write(self.sse({"type": "error", "message": "turn failed"}))
+            await writer.drain()
+
+    @staticmethod
+    def sse(event: dict[str, Any]) -> bytes:
+        return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+    @staticmethod
+    def head(status: HTTPStatus, headers: dict[str, str]) -> bytes:
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def write_json(
+        self, writer: asyncio.StreamWriter, status: HTTPStatus, payload: Any, headers: dict[str, str] | None = None
+    ) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(
+            self.head(status, {"Content-Type": "application/json", "Content-Length": str(len(body)), **(headers or {})})
+        )
+        writer.write(body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def write_text(
+        self, writer: asyncio.StreamWriter, status: HTTPStatus, text: str, content_type: str = "application/jsonl"
+    ) -> None:
+        body = text.encode()
+        writer.write(self.head(status, {"Content-Type": content_type, "Content-Length": str(len(body))}))
+        writer.write(body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    # Lifecycle
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.Server:
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def shutdown(self) -> None:
+        """Stops accepting new connections and turns, then waits for the running ones to finish"""
+        self.accepting = False
+        if self.server:
+            self.server.close()
+        if self.connections:
+            logging.info(f"Draining {len(self.connections)} connections")
+            _, unfinished = await asyncio.wait(self.connections, timeout=self.drain_timeout)
+            for task in unfinished:
+                task.cancel()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max-concurrent-turns", type=int, default=32)
+    parser.add_argument("--max-pending-turns", type=int, default=256)
+    parser.add_argument(
+        "--single-call-routing", action="store_true", help="Detect the intent and start acting on it in one LLM call"
+    )
+    parser.add_argument("--metrics", action="store_true", help="Collect metrics and serve them on /metrics")
+    parser.add_argument(
+        "--record", default=None, metavar="PATH", help="Record the model and Calendly exchanges to a cassette"
+    )
+    parser.add_argument(
+        "--prefetch", action="store_true", help="Start the Calendly reads of scheduling intents as soon as detected"
+    )
+    parser.add_argument(
+        "--background-tools",
+        action="store_true",
+        help="Answer the patient while slow lookups continue in the background",
+    )
+    parser.add_argument(
+        "--slot-calendar", action="store_true", help="Search free slots in a local copy of the Calendly calendar"
+    )
+    parser.add_argument(
+        "--event-mirror", action="store_true", help="Look up patients' appointments in a local copy of the events"
+    )
+    parser.add_argument(
+        "--insecure-webhooks",
+        action="store_true",
+        help="Accept unsigned Calendly webhooks when CALENDLY_WEBHOOK_SIGNING_KEY is unset, for development only",
+    )
+    parser.add_argument(
+        "--circuit-breaker", action="store_true", help="Fail Calendly calls fast while Calendly is failing or slow"
+    )
+    parser.add_argument("--hedge", action="store_true", help="Send slow Calendly reads a second time, first one wins")
+    parser.add_argument(
+        "--calendly-cache-ttl",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Cache Calendly reads for this many seconds (ACME_CALENDLY_CACHE_TTL, off by default)",
+    )
+    parser.add_argument(
+        "--turn-budget",
+        type=float,
+        default=turn_budget(),
+        metavar="SECONDS",
+        help="Answer within this many seconds per turn, 0 for no limit (ACME_TURN_BUDGET, 60 by default)",
+    )
+    parser.add_argument(
+        "--tenants",
+        action="store_true",
+        help="Serve every clinic of the tenant registry (ACME_TENANTS_CONFIG, config/tenants.toml by default)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Serve from this many worker processes sharing the checkpoints and the Calendly cache",
+    )
+    parser.add_argument("--debug", action="store_true", help="Enable DEBUG logging level")
+    args = parser.parse_args()
+    if args.workers > 1 and args.record:
+        parser.error("--record cannot be combined with --workers, the workers would write the same cassette")
+    return args
+
+
+async def serve(server: ChatServer, host: str, port: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await server.start(host, port)
+    logging.info(f"Serving on http://{host}:{port}")
+    await stop.wait()
+    await server.shutdown()
+
+
+def build_server(args: argparse.Namespace, shared_cache: "SharedCache | None" = None) -> tuple[ChatServer, Callable]:
+    """
+    The chat server for the parsed arguments, and the function closing what it opened once it is shut down.
+    A worker process passes the `shared_cache` it shares with the other workers.
+    """
+    checkpointer = SQLiteSaver.from_env()
+    cassette = None
+    if args.record:
+        from src.cassette import Cassette
+
+        cassette = Cassette(args.record, mode="record")
+    tenants = tenant_registry(args, cassette, shared_cache) if args.tenants else None
+    if tenants:
+        calendly_client = tenants.default_tenant().calendly_client
+    else:
+        options = calendly_options(args, recording=cassette is not None, shared_cache=shared_cache)
+        calendly_client = cassette.calendly_client(**options) if cassette else CalendlyClient(**options)
+    features = optional_features(args, calendly_client)
+    agent = create_acme_dental_agent(
+        checkpointer=checkpointer,
+        blob_store=BlobStore.from_env(),
+        single_call_routing=args.single_call_routing,
+        model_router=cassette.model_router() if cassette else None,
+        calendly_client=calendly_client,
+        responder=Responder.from_config(),
+        tenants=tenants,
+        **features,
+    )
+    prefetcher, background = features["prefetcher"], features["background"]
+    server = ChatServer(
+        agent,
+        max_concurrent_turns=args.max_concurrent_turns,
+        max_pending_turns=args.max_pending_turns,
+        event_mirror=features["event_mirror"],
+        webhook_signing_key=os.getenv("CALENDLY_WEBHOOK_SIGNING_KEY"),
+        insecure_webhooks=args.insecure_webhooks,
+        turn_budget=args.turn_budget,
+        tenants=tenants,
+        leases=shared_cache,
+    )
+
+    def close() -> None:
+        checkpointer.close()
+        if prefetcher:
+            prefetcher.close()
+        if background:
+            background.close()
+        if calendly_client.hedger:
+            calendly_client.hedger.close()
+        if cassette:
+            cassette.close()
+        if shared_cache:
+            shared_cache.close()
+
+    return server, close
+
+
+def main():
+    args = parse_args()
+    configure_logging(args.debug)
+    if args.metrics:
+        REGISTRY.enable()
+    load_dotenv()
+    if args.workers > 1:
+        from src.workers import WorkerPool
+
+        WorkerPool("src.server:build_worker", (args,), args.workers).run(args.host, args.port)
+        return
+    server, close = build_server(args)
+    asyncio.run(serve(server, args.host, args.port))
+    close()
+
+
+def build_worker(args: argparse.Namespace) -> tuple[ChatServer, Callable]:
+    """The chat server of a worker process, see src/workers.py"""
+    configure_logging(args.debug)
+    if args.metrics:
+        REGISTRY.enable()
+    load_dotenv()
+    from src.shared_cache import SharedCache
+
+    return build_server(args, SharedCache.from_env())
+
+
+if __name__ == "__main__":
+    main()
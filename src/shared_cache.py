@@ -0,0 +1,150 @@
+"""Cache and session leases shared by the worker processes of one host"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+DEFAULT_SHARED_CACHE_PATH = os.path.join(".acme_dental", "shared.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS generations (
+    namespace TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires);
+"""
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedCache:
+    """
+    JSON values with a TTL in a SQLite file every worker process opens, in namespaces that are cleared as a whole.
+    Clearing a namespace bumps its generation, so a process can tell its own copies of the values are outdated, and
+    a value fetched before the clear is not stored after it.
+
+    Leases make sure one process at a time works on something, e.g. a conversation's turn. A lease is held until it
+    is released, it expires, or its owner process exits, so the work can be taken over as soon as a worker dies.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SHARED_CACHE_PATH,
+        *,
+        max_entries: int = 16384,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.clock = clock
+        self.owner = os.getpid()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "SharedCache":
+        """Opens ACME_SHARED_CACHE_PATH, .acme_dental/shared.sqlite by default"""
+        return cls(os.getenv("ACME_SHARED_CACHE_PATH") or DEFAULT_SHARED_CACHE_PATH, **kwargs)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    # Cache
+
+    def generation(self, namespace: str) -> int:
+        with self.lock:
+            row = self.conn.execute("SELECT generation FROM generations WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def get(self, namespace: str, key: str) -> Any | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires > ?",
+                (namespace, key, self.clock()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, namespace: str, key: str, value: Any, ttl: float, generation: int) -> bool:
+        """Stores the value unless the namespace was cleared since `generation`, returns whether it did"""
+        now = self.clock()
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT generation FROM generations WHERE namespace = ?", (namespace,)).fetchone()
+            if (row[0] if row else 0) != generation:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl),
+            )
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                self.conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+                self.conn.execute(
+                    "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY expires LIMIT ?)",
+                    (max(0, count - self.max_entries),),
+                )
+        return True
+
+    def clear(self, namespace: str) -> int:
+        """Drops the namespace's values, returns its new generation"""
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+            self.conn.execute(
+                "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+                "ON CONFLICT (namespace) DO UPDATE SET generation = generation + 1",
+                (namespace,),
+            )
+            (generation,) = self.conn.execute(
+                "SELECT generation FROM generations WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        return generation
+
+    # Leases
+
+    def lease(self, name: str, ttl: float) -> bool:
+        """Takes the lease for this process, False while another live process holds it"""
+        now = self.clock()
+        with self.lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT owner, expires FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != self.owner and row[1] > now and process_alive(row[0]):
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO leases (name, owner, expires) VALUES (?, ?, ?)", (name, self.owner, now + ttl)
+            )
+        return True
+
+    def release(self, name: str) -> None:
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
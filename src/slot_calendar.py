@@ -0,0 +1,251 @@
+"""
+Local slot calendar.
+
+The clinic has one dentist and fixed slots, so a day of availability fits in one 64-bit word: bit i is set when the
+i-th slot of the UTC day is free and the top bit marks the day as synced. The words live in an array indexed by day.
+
+The calendar is synced from Calendly's available times and scheduled events, follows the client's successful
+bookings and cancellations, and is reconciled with Calendly in the background every `reconcile_interval` seconds.
+Queries (weekdays and a time of day window in the patient's timezone, the earliest N slots) only AND each day's
+word with a mask, cached per UTC offset and weekday.
+"""
+
+import logging
+import os
+import threading
+import time
+from array import array
+from collections.abc import Callable, Iterable
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from src.api.calendly import CalendlyClient, parse_time
+from src.metrics import span
+
+SYNCED = 1 << 63
+MINUTES_PER_DAY = 24 * 60
+
+
+def isoformat(moment: datetime) -> str:
+    return moment.astimezone(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SlotCalendar:
+    """
+    Availability of one event type for `horizon_days` days from today, in `slot_minutes` slots.
+    Without an `event_type`, the current user's first active event type is used.
+    """
+
+    def __init__(
+        self,
+        client: CalendlyClient,
+        event_type: str | None = None,
+        *,
+        slot_minutes: int = 30,
+        horizon_days: int = 28,
+        reconcile_interval: float = 300.0,
+        now: Callable[[], datetime] = lambda: datetime.now(UTC),
+    ):
+        if MINUTES_PER_DAY % slot_minutes or MINUTES_PER_DAY // slot_minutes >= 64:
+            raise ValueError(f"A day must split into fewer than 64 slots of {slot_minutes} minutes")
+        self.client = client
+        self.event_type = event_type
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = MINUTES_PER_DAY // slot_minutes
+        self.horizon_days = horizon_days
+        self.reconcile_interval = reconcile_interval
+        self.now = now
+        self.lock = threading.Lock()
+        self.origin = 0  # date ordinal of days[0]
+        self.days = array("Q")
+        self.events: dict[str, datetime] = {}  # active event URI -> start time
+        self.synced_at: float | None = None
+        self.reconciling = False
+        self.masks: dict[tuple, int] = {}
+        client.write_listeners.append(self.on_write)
+
+    @classmethod
+    def from_env(cls, client: CalendlyClient) -> "SlotCalendar":
+        """ACME_CALENDAR_HORIZON_DAYS and ACME_CALENDAR_RECONCILE_SECONDS override the defaults"""
+        return cls(
+            client,
+            horizon_days=int(os.getenv("ACME_CALENDAR_HORIZON_DAYS", 28)),
+            reconcile_interval=float(os.getenv("ACME_CALENDAR_RECONCILE_SECONDS", 300)),
+        )
+
+    # Slots
+
+    def locate(self, moment: datetime) -> tuple[int, int] | None:
+        """The day ordinal and slot index of a slot start, None when the moment is not on the slot grid"""
+        moment = moment.astimezone(UTC)
+        minutes = moment.hour * 60 + moment.minute
+        if minutes % self.slot_minutes or moment.second or moment.microsecond:
+            return None
+        return moment.date().toordinal(), minutes // self.slot_minutes
+
+    def mark(self, moment: datetime, free: bool) -> None:
+        if not (located := self.locate(moment)):
+            return
+        ordinal, slot = located
+        with self.lock:
+            index = ordinal - self.origin
+            if 0 <= index < len(self.days) and self.days[index] & SYNCED:
+                if free:
+                    self.days[index] |= 1 << slot
+                else:
+                    self.days[index] &= ~(1 << slot)
+
+    def start_of(self, ordinal: int, slot: int) -> datetime:
+        day = date.fromordinal(ordinal)
+        return datetime(day.year, day.month, day.day, tzinfo=UTC) + timedelta(minutes=slot * self.slot_minutes)
+
+    # Sync
+
+    def sync(self) -> None:
+        """Rebuilds the calendar from Calendly"""
+        with span("calendar_sync"):
+            user = self.client.get_current_user().get("resource", {})
+            user_uri, organization = user.get("uri"), user.get("current_organization")
+            if not self.event_type:
+                event_types = self.client.list_event_types(organization=organization, user=user_uri)
+                self.event_type = next((e["uri"] for e in event_types if e.get("active", True)), None)
+                if not self.event_type:
+                    raise ValueError(f"Calendly user {user_uri} has no active event type to find slots of")
+
+            now = self.now()
+            first = now.date().toordinal()
+            days = array("Q", [SYNCED]) * self.horizon_days
+            # Calendly serves at most a week of available times per request, starting in the future
+            for offset in range(0, self.horizon_days, 7):
+                start = now + timedelta(minutes=1) if not offset else self.start_of(first + offset, 0)
+                end = self.start_of(first + min(offset + 7, self.horizon_days), 0)
+                for slot in self.client.list_event_type_available_times(
+                    self.event_type, isoformat(start), isoformat(end)
+                ):
+                    located = self.locate(parse_time(slot["start_time"]))
+                    if (
+                        located
+                        and slot.get("status", "available") == "available"
+                        and 0 <= located[0] - first < len(days)
+                    ):
+                        days[located[0] - first] |= 1 << located[1]
+
+            scheduled = self.client.iter_scheduled_events(
+                user=user_uri, organization=organization, status="active", min_start_time=isoformat(now)
+            )
+            events = {e["uri"]: parse_time(e["start_time"]) for e in scheduled}
+            # Bookings made while the available times were being listed
+            for start_time in events.values():
+                if (located := self.locate(start_time)) and 0 <= located[0] - first < len(days):
+                    days[located[0] - first] &= ~(1 << located[1])
+
+        with self.lock:
+            self.origin, self.days, self.events = first, days, events
+            self.synced_at = time.monotonic()
+
+    def reconcile(self) -> None:
+        try:
+            self.sync()
+        except Exception:
+            logging.exception("Slot calendar reconciliation failed")
+        finally:
+            self.reconciling = False
+
+    def ensure_synced(self) -> None:
+        """Syncs on first use, later reconciles in the background once the calendar is older than the interval"""
+        if self.synced_at is None:
+            self.sync()
+            return
+        with self.lock:
+            if self.reconciling or time.monotonic() - self.synced_at < self.reconcile_interval:
+                return
+            self.reconciling = True
+        threading.Thread(target=self.reconcile, name="slot-calendar-reconcile", daemon=True).start()
+
+    def on_write(self, path: str, payload: dict[str, Any], response: dict[str, Any]) -> None:
+        """Applies a successful booking or cancellation made through the client"""
+        if self.synced_at is None:
+            return
+        if path == "/invitees" and (start_time := parse_time(payload.get("start_time"))):
+            self.mark(start_time, free=False)
+            if event := response.get("resource", {}).get("event"):
+                with self.lock:
+                    self.events[event] = start_time
+        elif path.endswith("/cancellation"):
+            event_uuid = path.split("/")[2]
+            with self.lock:
+                event = next((uri for uri in self.events if uri.rsplit("/", 1)[-1] == event_uuid), None)
+                start_time = self.events.pop(event) if event else None
+            if start_time is None:
+                # Not an event the calendar knows about, let the next query reconcile
+                self.synced_at = float("-inf")
+                return
+            if start_time > self.now():
+                self.mark(start_time, free=True)
+
+    # Queries
+
+    def mask(self, offset: int, weekday: int, weekdays: frozenset[int] | None, after: int, before: int) -> int:
+        """The slots of a UTC day starting on `weekday` that match the filters, for a timezone `offset` minutes ahead"""
+        key = (offset, weekday, weekdays, after, before)
+        if (mask := self.masks.get(key)) is None:
+            mask = 0
+            for slot in range(self.slots_per_day):
+                local = slot * self.slot_minutes + offset
+                minute_of_day = local % MINUTES_PER_DAY
+                local_weekday = (weekday + local // MINUTES_PER_DAY) % 7
+                if (weekdays is None or local_weekday in weekdays) and after <= minute_of_day:
+                    if minute_of_day + self.slot_minutes <= before:
+                        mask |= 1 << slot
+            self.masks[key] = mask
+        return mask
+
+    def find(
+        self,
+        *,
+        weekdays: Iterable[int] | None = None,
+        after: int = 0,
+        before: int = MINUTES_PER_DAY,
+        timezone: str = "UTC",
+        start: date | None = None,
+        days: int = 14,
+        limit: int = 5,
+    ) -> list[datetime]:
+        """
+        The earliest `limit` free slots within `days` days from `start` (today by default), in the patient's timezone,
+        on the given weekdays (0 is Monday) and between `after` and `before` minutes past local midnight.
+        """
+        self.ensure_synced()
+        tz = ZoneInfo(timezone)
+        now = self.now()
+        begin = now
+        if start:
+            begin = max(now, datetime(start.year, start.month, start.day, tzinfo=tz))
+        end = begin + timedelta(days=days)
+        weekdays = frozenset(weekdays) if weekdays is not None else None
+
+        with self.lock:
+            origin, words = self.origin, self.days
+        found: list[datetime] = []
+        for ordinal in range(begin.astimezone(UTC).date().toordinal(), end.astimezone(UTC).date().toordinal() + 1):
+            index = ordinal - origin
+            if not 0 <= index < len(words):
+                continue
+            # The UTC offset at noon stands for the whole day
+            noon = self.start_of(ordinal, 0) + timedelta(hours=12)
+            offset = int(noon.astimezone(tz).utcoffset().total_seconds()) // 60
+            bits = words[index] & self.mask(offset, noon.weekday(), weekdays, after, before)
+            while bits:
+                low = bits & -bits
+                bits ^= low
+                moment = self.start_of(ordinal, low.bit_length() - 1)
+                if begin <= moment < end:
+                    found.append(moment)
+                    if len(found) == limit:
+                        return found
+        return found
+
+    def synced_until(self) -> date | None:
+        with self.lock:
+            return date.fromordinal(self.origin + len(self.days) - 1) if self.days else None
@@ -0,0 +1,218 @@
+"""
+Multi-clinic tenancy.
+
+One process and one compiled graph serve every clinic of a `TenantRegistry` (config/tenants.toml). A conversation
+belongs to the tenant its thread id is prefixed with ("<tenant>:<conversation>"), or to the `tenant_id` of the graph
+config, and every graph node runs with that tenant current (`tenant_scope`): its tools call Calendly with the
+clinic's token and answer from the clinic's knowledge base, and its prompts and templates may be the clinic's own.
+The Calendly clients of all tenants share one HTTP connection pool, while their response caches and circuit breakers
+are their own, and so is the `LLMScheduler` their model calls are admitted by, so one clinic's traffic cannot use up
+another's model budget. Only the `max_active` most recently used tenants are kept, so memory stays bounded however many
+clinics are configured.
+"""
+
+import functools
+import json
+import os
+import threading
+import tomllib
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+import requests
+from langgraph.config import get_config
+from requests.adapters import HTTPAdapter
+
+from src.api.calendly import CalendlyClient
+from src.llm_scheduler import LLMScheduler
+from src.metrics import REGISTRY
+
+DEFAULT_TENANTS_CONFIG = os.path.join(os.path.dirname(__file__), "config", "tenants.toml")
+
+# Tenant settings -> LLMScheduler arguments
+SCHEDULER_SETTINGS = {"llm_concurrency": "max_concurrency", "llm_tokens_per_minute": "tokens_per_minute"}
+
+
+class UnknownTenantError(LookupError):
+    pass
+
+
+class Tenant:
+    """
+    A clinic's Calendly client, knowledge base and prompt overrides, the scheduler of its model calls, and what was
+    derived from them
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        calendly_client: CalendlyClient,
+        knowledge_base: dict[str, str] | None = None,
+        prompts_dir: str | None = None,
+        scheduler: LLMScheduler | None = None,
+    ):
+        self.tenant_id = tenant_id
+        self.calendly_client = calendly_client
+        self.knowledge_base = knowledge_base
+        self.prompts_dir = prompts_dir
+        self.scheduler = scheduler or LLMScheduler()
+        self.lock = threading.Lock()
+        self.derived: dict[str, Any] = {}
+
+    def memo(self, key: str, build: Callable[[], Any]) -> Any:
+        """The value built once per tenant for `key`, e.g. its tools or prompts"""
+        with self.lock:
+            if key not in self.derived:
+                self.derived[key] = build()
+            return self.derived[key]
+
+
+TENANT: ContextVar[Tenant | None] = ContextVar("tenant", default=None)
+
+
+def current_tenant() -> Tenant | None:
+    return TENANT.get()
+
+
+@contextmanager
+def tenant_scope(tenant: Tenant | None) -> Iterator[None]:
+    token = TENANT.set(tenant)
+    try:
+        yield
+    finally:
+        TENANT.reset(token)
+
+
+def tenant_file(name: str) -> str | None:
+    """The current tenant's own version of prompts/<name>, None without one"""
+    tenant = current_tenant()
+    if tenant is None or not tenant.prompts_dir:
+        return None
+    path = os.path.join(tenant.prompts_dir, name)
+    return path if os.path.exists(path) else None
+
+
+def thread_id(tenant_id: str, conversation_id: str) -> str:
+    """The thread id of a tenant's conversation"""
+    return f"{tenant_id}:{conversation_id}"
+
+
+def shared_session(pool_size: int = 32) -> requests.Session:
+    """One keep-alive connection pool for the Calendly requests of every tenant"""
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
+    return session
+
+
+class TenantRegistry:
+    """
+    Maps tenant ids to their settings: `calendly_token_env`, the environment variable holding the clinic's Calendly
+    token, and optionally `knowledge_base`, a JSON file of question -> answer replacing the built-in one, `prompts`, a
+    directory of files overriding src/prompts/<name>.txt (and responses/<name>.txt), and `llm_concurrency` and
+    `llm_tokens_per_minute`, the clinic's model call budget.
+    `client_factory` builds each tenant's CalendlyClient from its `api_token` and the shared `transport`, and
+    `scheduler_factory` its LLMScheduler from its budget, by default the ACME_LLM_* settings of every tenant.
+    """
+
+    def __init__(
+        self,
+        tenants: dict[str, dict[str, Any]],
+        default: str | None = None,
+        *,
+        client_factory: Callable[..., CalendlyClient] = CalendlyClient,
+        scheduler_factory: Callable[..., LLMScheduler] = LLMScheduler.from_env,
+        transport: Any = None,
+        max_active: int = 64,
+    ):
+        if not tenants:
+            raise ValueError("No tenants configured")
+        if default is not None and default not in tenants:
+            raise ValueError(f"Default tenant '{default}' is not configured")
+        self.tenants = tenants
+        self.default = default
+        self.client_factory = client_factory
+        self.scheduler_factory = scheduler_factory
+        self.transport = transport or shared_session()
+        self.max_active = max_active
+        self.lock = threading.Lock()
+        self.active: OrderedDict[str, Tenant] = OrderedDict()
+
+    @classmethod
+    def from_config(cls, path: str | None = None, **kwargs: Any) -> "TenantRegistry":
+        """
+        Loads config/tenants.toml, or the file ACME_TENANTS_CONFIG points at. Relative knowledge base and prompt
+        paths are relative to the file.
+        """
+        path = path or os.getenv("ACME_TENANTS_CONFIG") or DEFAULT_TENANTS_CONFIG
+        with open(path, "rb") as f:
+            config = tomllib.load(f)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        tenants = {
+            tenant_id: {
+                **spec,
+                **{key: os.path.join(base_dir, spec[key]) for key in ("knowledge_base", "prompts") if key in spec},
+            }
+            for tenant_id, spec in config.get("tenants", {}).items()
+        }
+        return cls(tenants, config.get("default"), **kwargs)
+
+    def _build(self, tenant_id: str) -> Tenant:
+        spec = self.tenants[tenant_id]
+        token_env = spec.get("calendly_token_env", "CALENDLY_API_TOKEN")
+        api_token = os.getenv(token_env)
+        if not api_token:
+            raise ValueError(f"Tenant '{tenant_id}': {token_env} is not set")
+        knowledge_base = None
+        if path := spec.get("knowledge_base"):
+            with open(path, encoding="utf-8") as f:
+                knowledge_base = json.load(f)
+        budget = {argument: spec[setting] for setting, argument in SCHEDULER_SETTINGS.items() if setting in spec}
+        return Tenant(
+            tenant_id,
+            self.client_factory(api_token=api_token, transport=self.transport),
+            knowledge_base,
+            spec.get("prompts"),
+            self.scheduler_factory(**budget),
+        )
+
+    def get(self, tenant_id: str) -> Tenant:
+        """The tenant, set up on first use and forgotten (caches included) when least recently used"""
+        if tenant_id not in self.tenants:
+            raise UnknownTenantError(f"Unknown tenant '{tenant_id}'")
+        with self.lock:
+            tenant = self.active.get(tenant_id)
+            if tenant is None:
+                tenant = self.active[tenant_id] = self._build(tenant_id)
+                while len(self.active) > self.max_active:
+                    self.active.popitem(last=False)
+                REGISTRY.set("tenants_active", len(self.active))
+            self.active.move_to_end(tenant_id)
+            return tenant
+
+    def default_tenant(self) -> Tenant:
+        return self.get(self.default or next(iter(self.tenants)))
+
+    def tenant_id(self, config: dict[str, Any]) -> str:
+        """The tenant of a graph config: its `tenant_id`, its thread id's prefix, or the default"""
+        configurable = config.get("configurable") or {}
+        if tenant_id := configurable.get("tenant_id"):
+            return tenant_id
+        prefix, separator, _ = str(configurable.get("thread_id", "")).partition(":")
+        if separator and prefix in self.tenants:
+            return prefix
+        if self.default is None:
+            raise UnknownTenantError(f"Thread '{configurable.get('thread_id')}' belongs to no tenant")
+        return self.default
+
+    def scoped(self, node: Callable) -> Callable:
+        """Wraps a graph node so it runs with the tenant of the running graph's config current"""
+
+        @functools.wraps(node)
+        def run(state, *args, **kwargs):
+            with tenant_scope(self.get(self.tenant_id(get_config()))):
+                return node(state, *args, **kwargs)
+
+        return run
@@ -14,6 +14,8 @@ from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 from src.agent import create_acme_dental_agent
 from src.api.calendly import CalendlyClient
+from src.bench.evals import JUDGE_MODEL, VerdictCache, cached_judge
+from src.cassette import Cassette
 from src.tools import (
     build_cancelling_tools_for_tests,
     build_questions_tools_for_tests,
@@ -25,8 +27,10 @@ from src.tools import (
 
 @pytest.fixture
 def calendly_agent():
+    """Set ACME_CASSETTE (and ACME_CASSETTE_MODE=record once) to run against recorded model exchanges"""
     load_dotenv()
-    calendly_client = CalendlyClient()
+    cassette = Cassette.from_env()
+    calendly_client = cassette.calendly_client() if cassette else CalendlyClient()
     intent_tool_sets = {
         "question": build_questions_tools_for_tests(),
         "schedule": build_scheduling_tools_for_tests(calendly_client),
@@ -35,15 +39,27 @@ def calendly_agent():
         "cancel": build_cancelling_tools_for_tests(calendly_client),
         "leave": {},
     }
-    return create_acme_dental_agent(intent_tool_sets=intent_tool_sets, greet=False)
+    yield create_acme_dental_agent(
+        intent_tool_sets=intent_tool_sets,
+        greet=False,
+        model_router=cassette.model_router() if cassette else None,
+    )
+    if cassette:
+        cassette.close()
 
 
 @pytest.fixture
 def trajectory_llm_evaluator():
-    return create_trajectory_llm_as_judge(
-        prompt=TRAJECTORY_ACCURACY_PROMPT_WITH_REFERENCE,
-        model="openai:o3-mini",
+    """The LLM-as-judge, with verdicts cached so unchanged trajectories are not judged again"""
+    cache = VerdictCache()
+    yield cached_judge(
+        create_trajectory_llm_as_judge(
+            prompt=TRAJECTORY_ACCURACY_PROMPT_WITH_REFERENCE,
+            model=JUDGE_MODEL,
+        ),
+        cache,
     )
+    cache.close()
 
 
 @pytest.fixture
@@ -0,0 +1,112 @@
+"""Background Tool Tests, using the scripted model and the in-process Calendly backend"""
+
+import threading
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.types import Command
+
+from src.background import INTERIM_MESSAGE, BackgroundTools
+from src.bench.fakes import build_offline_agent
+
+
+def start(agent, session_id: str, content: str) -> tuple[dict, dict]:
+    config = {"configurable": {"thread_id": session_id}}
+    agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+    return config, agent.invoke(Command(resume={"messages": [HumanMessage(content=content)]}), config=config)
+
+
+def reply(agent, config: dict, content: str) -> dict:
+    return agent.invoke(Command(resume={"messages": [HumanMessage(content=content)]}), config=config)
+
+
+def test_slow_lookup_is_merged_on_the_next_turn():
+    background = BackgroundTools(wait=0.0)
+    agent, calendly = build_offline_agent(calendly_latency=0.05, background=background)
+    booked = len(calendly.booked())
+
+    config, result = start(agent, "slow", "I want to book a check-up")
+
+    assert result["messages"][-1].content == INTERIM_MESSAGE
+    assert [t["name"] for t in result["background_tasks"]] == ["list_calendly_event_type_available_times"]
+    assert len(calendly.booked()) == booked
+
+    result = reply(agent, config, "ok")
+
+    assert not result["background_tasks"] and not background.tasks
+    assert len(calendly.booked()) == booked + 1
+    merged = [m for m in result["messages"] if isinstance(m, AIMessage) and m.response_metadata.get("background")]
+    assert [m.response_metadata["background"] for m in merged] == ["pending", "result"]
+
+
+def test_a_new_request_after_the_interim_message_is_classified_again():
+    background = BackgroundTools(wait=0.0, tools=frozenset({"list_calendly_event_type_available_times"}))
+    agent, calendly = build_offline_agent(calendly_latency=0.05, background=background)
+    booked = len(calendly.booked())
+    config, _ = start(agent, "changed", "I want to book a check-up")
+
+    result = reply(agent, config, "Actually, please cancel my appointment instead")
+
+    assert result["intent"]["intent"] == "cancel"
+    assert len(calendly.booked()) == booked - 1
+
+
+def test_hung_tasks_are_swept_and_results_kept_for_a_late_reply():
+    background = BackgroundTools(wait=0.0, timeout=0.05)
+    lookup = {"name": "list_calendly_event_type_available_times", "args": {}, "id": "1"}
+    release = threading.Event()
+    (hung, _), *_ = background.start([lookup], lambda call: release.wait())
+    (finished, future), *_ = background.start([lookup], lambda call: "slots")
+    future.result()
+
+    time.sleep(0.1)
+    (current, _), *_ = background.start([lookup], lambda call: "slots")
+    release.set()
+
+    assert set(background.tasks) == {finished, current}
+    assert background.collect(finished) == "slots"
+
+
+def test_results_nobody_collected_are_swept_after_the_retention():
+    background = BackgroundTools(wait=0.0, retention=0.05)
+    lookup = {"name": "list_calendly_event_type_available_times", "args": {}, "id": "1"}
+    (abandoned, future), *_ = background.start([lookup], lambda call: "slots")
+    future.result()
+
+    time.sleep(0.1)
+    (current, _), *_ = background.start([lookup], lambda call: "slots")
+
+    assert abandoned not in background.tasks and current in background.tasks
+
+
+def test_fast_lookup_stays_in_the_foreground():
+    agent, calendly = build_offline_agent(background=BackgroundTools(wait=5.0))
+    booked = len(calendly.booked())
+
+    _, result = start(agent, "fast", "I want to book a check-up")
+
+    assert result["messages"][-1].content != INTERIM_MESSAGE
+    assert len(calendly.booked()) == booked + 1
+
+
+def test_writes_are_never_deferred():
+    background = BackgroundTools(wait=0.0)
+    book = {"name": "create_calendly_invitee", "args": {}, "id": "1"}
+    lookup = {"name": "list_calendly_event_type_available_times", "args": {}, "id": "2"}
+
+    assert background.defers([lookup])
+    assert not background.defers([lookup, book])
+    assert not background.defers([])
+
+
+def test_unknown_task_fails_the_lookup():
+    background = BackgroundTools(wait=0.0)
+    agent, _ = build_offline_agent(calendly_latency=0.05, background=background)
+    config, _ = start(agent, "restarted", "I want to book a check-up")
+    # As if the conversation was resumed by another process
+    background.tasks.clear()
+
+    result = reply(agent, config, "ok")
+
+    merged = next(i for i, m in enumerate(result["messages"]) if m.response_metadata.get("background") == "result")
+    assert "tool failed" in str(result["messages"][merged + 1].content)
@@ -0,0 +1,47 @@
+"""Blob Store Tests"""
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agent import build_tool_node
+from src.blobs import BLOB_REF_KEY, EXPIRED_CONTENT, BlobStore
+from src.tools.kb import CheckWhatOtherQuestionsCanWeAnswer
+
+
+def run_tool_node(blob_store):
+    tool = CheckWhatOtherQuestionsCanWeAnswer()
+    tool_call = {"id": "call_1", "name": tool.name, "args": {"input_str": ""}}
+    state = {"messages": [HumanMessage(content="hi"), AIMessage(content="", tool_calls=[tool_call])]}
+    return build_tool_node({tool.name: tool}, blob_store)(state)["messages"][0]
+
+
+def test_large_results_are_stored_by_reference():
+    blob_store = BlobStore(":memory:", min_bytes=64)
+    message = run_tool_node(blob_store)
+    inline = run_tool_node(None)
+
+    assert message.additional_kwargs[BLOB_REF_KEY].startswith("sha256:")
+    assert len(message.content) < len(inline.content)
+    assert blob_store.resolve([message])[0].content == inline.content
+
+
+def test_small_results_stay_inline():
+    message = run_tool_node(BlobStore(":memory:", min_bytes=1024 * 1024))
+
+    assert BLOB_REF_KEY not in message.additional_kwargs
+
+
+def test_identical_results_share_a_blob():
+    blob_store = BlobStore(":memory:")
+
+    assert blob_store.put("x" * 2048) == blob_store.put("x" * 2048)
+    assert blob_store.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+
+
+def test_swept_blobs_resolve_to_an_expiry_notice():
+    now = [1000.0]
+    blob_store = BlobStore(":memory:", min_bytes=64, ttl_seconds=60, clock=lambda: now[0])
+    message = run_tool_node(blob_store)
+    now[0] += 120
+
+    assert blob_store.sweep() == 1
+    assert blob_store.resolve([message])[0].content == EXPIRED_CONTENT
@@ -0,0 +1,73 @@
+"""Record/Replay Cassette Tests"""
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from src.agent import create_acme_dental_agent
+from src.bench.fakes import FakeCalendly, ScriptedChatModel
+from src.cassette import Cassette, CassetteMiss, CassetteTransport
+from src.models import ModelRouter
+
+MODELS = {"default": {"model": "scripted"}}
+
+
+def converse(agent, content: str) -> list[str]:
+    config = {"configurable": {"thread_id": "cassette"}}
+    agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+    result = agent.invoke(Command(resume={"messages": [HumanMessage(content=content)]}), config=config)
+    return [str(m.content) for m in result["messages"]]
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / "visit.jsonl")
+    cassette = Cassette(path, mode="record")
+    model = ScriptedChatModel()
+    calendly = cassette.calendly_client(api_token="test")
+    calendly.transport = CassetteTransport(cassette, FakeCalendly())
+    agent = create_acme_dental_agent(
+        model_router=ModelRouter(MODELS, factory=cassette.model_factory(lambda **spec: model)),
+        calendly_client=calendly,
+    )
+    messages = converse(agent, "Please cancel my appointment")
+    cassette.close()
+    return path, messages
+
+
+def replay_agent(cassette: Cassette):
+    return create_acme_dental_agent(
+        model_router=ModelRouter(MODELS, factory=cassette.model_factory()),
+        calendly_client=cassette.calendly_client(),
+    )
+
+
+def test_replay_serves_the_recorded_conversation(recording):
+    path, recorded = recording
+    cassette = Cassette(path)
+
+    assert converse(replay_agent(cassette), "Please cancel my appointment") == recorded
+    assert cassette.misses == 0
+    assert cassette.played == len(cassette.entries)
+    assert {e["kind"] for e in cassette.entries} == {"model", "calendly"}
+
+
+def test_unrecorded_request_replays_the_next_exchange_of_the_node(recording):
+    path, recorded = recording
+    cassette = Cassette(path)
+
+    assert converse(replay_agent(cassette), "Could you cancel my appointment?")[-1] == recorded[-1]
+    assert cassette.misses > 0
+
+
+def test_running_out_of_exchanges_fails(recording):
+    path, _ = recording
+    cassette = Cassette(path)
+    agent = replay_agent(cassette)
+    converse(agent, "Please cancel my appointment")
+
+    with pytest.raises(CassetteMiss):
+        agent.invoke(
+            Command(resume={"messages": [HumanMessage(content="And another one")]}),
+            config={"configurable": {"thread_id": "cassette"}},
+        )
@@ -0,0 +1,106 @@
+"""Checkpointer Tests"""
+
+import sqlite3
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import START, StateGraph
+from langgraph.types import Command
+
+from src.agent import AssistantState, build_user_input_node
+from src.checkpoint import SQLiteSaver
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def build_echo_graph(checkpointer):
+    def echo(state: AssistantState):
+        return {"messages": [AIMessage(content=f"echo: {state['messages'][-1].content}")]}
+
+    builder = StateGraph(AssistantState)
+    builder.add_node("echo", echo)
+    builder.add_node("user_input", build_user_input_node())
+    builder.add_edge(START, "echo")
+    builder.add_edge("echo", "user_input")
+    builder.add_edge("user_input", "echo")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def chat(graph, thread_id: str, turns: int):
+    config = {"configurable": {"thread_id": thread_id}}
+    result = graph.invoke({"messages": [HumanMessage(content="hello")]}, config=config)
+    for turn in range(1, turns):
+        result = graph.invoke(Command(resume={"messages": [HumanMessage(content=f"turn {turn}")]}), config=config)
+    return result
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "checkpoints.sqlite")
+
+
+def test_conversation_survives_restart(db_path):
+    saver = SQLiteSaver(db_path)
+    chat(build_echo_graph(saver), "patient-1", turns=2)
+    saver.close()
+
+    graph = build_echo_graph(SQLiteSaver(db_path))
+    config = {"configurable": {"thread_id": "patient-1"}}
+    assert graph.get_state(config).interrupts
+    result = graph.invoke(Command(resume={"messages": [HumanMessage(content="still there?")]}), config=config)
+    assert [m.content for m in result["messages"]][-2:] == ["still there?", "echo: still there?"]
+
+
+def test_superseded_checkpoints_are_compacted(db_path):
+    saver = SQLiteSaver(db_path, keep_checkpoints=2)
+    chat(build_echo_graph(saver), "patient-1", turns=5)
+
+    assert len(list(saver.list({"configurable": {"thread_id": "patient-1"}}))) == 2
+
+
+def test_idle_threads_are_evicted(db_path):
+    clock = FakeClock()
+    saver = SQLiteSaver(db_path, ttl_seconds=60, sweep_interval=0, clock=clock)
+    graph = build_echo_graph(saver)
+    chat(graph, "idle", turns=1)
+    clock.now += 120
+    chat(graph, "active", turns=1)
+
+    assert saver.get_tuple({"configurable": {"thread_id": "idle"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "active"}}) is not None
+
+
+def test_size_cap_evicts_least_recently_active(db_path):
+    clock = FakeClock()
+    saver = SQLiteSaver(db_path, ttl_seconds=None, max_bytes=None, clock=clock)
+    graph = build_echo_graph(saver)
+    for thread_id in ["first", "second", "third"]:
+        clock.now += 1
+        chat(graph, thread_id, turns=2)
+
+    saver.max_bytes = saver.size_bytes() - 1
+    assert saver.sweep() == ["first"]
+    assert saver.size_bytes() <= saver.max_bytes
+
+
+def test_a_sweep_waits_for_another_process_writing_to_the_same_file(db_path):
+    clock = FakeClock()
+    saver = SQLiteSaver(db_path, ttl_seconds=60, sweep_interval=3600, clock=clock)
+    chat(build_echo_graph(saver), "idle", turns=1)
+    clock.now += 120
+
+    # Another worker's write, committed while the sweep waits for it
+    other = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    other.execute("INSERT INTO threads VALUES ('elsewhere', ?)", (clock.now,))
+    threading.Timer(0.3, other.execute, ("COMMIT",)).start()
+
+    assert saver.sweep() == ["idle"]
+    assert saver.get_tuple({"configurable": {"thread_id": "idle"}}) is None
@@ -0,0 +1,156 @@
+"""Per-Turn Deadline Tests, using the scripted model and the in-process Calendly backend"""
+
+import json
+import threading
+import time
+from typing import Any
+
+import pytest
+import requests
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.types import Command
+
+from src.agent import DEADLINE_RESULT, UNCONFIRMED_RESULT, build_tool_node, scheduled_call
+from src.api.calendly import CalendlyClient
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly, build_offline_agent
+from src.deadline import DEADLINE_MESSAGE, DeadlineExceeded, deadline_scope, with_deadline
+from src.llm_scheduler import LLMScheduler
+from src.tools.invitee import CreateCalendlyInviteeTool
+from src.tools.user import GetCalendlyUserTool
+
+
+class RecordingTransport:
+    """Calendly that records the timeout of every request"""
+
+    def __init__(self):
+        self.calendly = FakeCalendly(seed_events=0)
+        self.timeouts: list[float] = []
+
+    def get(self, url: str, timeout: float, **kwargs: Any):
+        self.timeouts.append(timeout)
+        return self.calendly.get(url, **kwargs)
+
+    def post(self, url: str, timeout: float, **kwargs: Any):
+        self.timeouts.append(timeout)
+        return self.calendly.post(url, **kwargs)
+
+
+def turn(agent, config: dict, content: str, budget: float | None) -> dict:
+    resume = Command(resume={"messages": [HumanMessage(content=content)]})
+    return agent.invoke(resume, config=with_deadline(config, budget))
+
+
+def test_a_turn_out_of_budget_ends_with_a_graceful_answer():
+    agent, _ = build_offline_agent(llm_latency=0.2)
+    config = {"configurable": {"thread_id": "deadline"}}
+    agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+
+    started = time.perf_counter()
+    result = turn(agent, config, "I'd like to book a check-up", budget=0.5)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.9
+    assert result["messages"][-1].content == DEADLINE_MESSAGE
+    assert agent.get_state(config).next == ("user_input",)
+
+    # The next turn gets a budget of its own
+    result = turn(agent, config, "I'd like to book a check-up", budget=30)
+    assert result["messages"][-1].content != DEADLINE_MESSAGE
+
+
+def test_calendly_reads_get_the_remaining_budget_as_timeout():
+    transport = RecordingTransport()
+    client = CalendlyClient(api_token="test", transport=transport, cache_ttl=0)
+
+    client.get_current_user()
+    with deadline_scope(time.monotonic() + 2):
+        client.get_current_user()
+
+    assert transport.timeouts[0] == 20
+    assert 1 < transport.timeouts[1] <= 2
+
+
+def test_no_calendly_request_starts_once_the_budget_is_spent():
+    transport = RecordingTransport()
+    client = CalendlyClient(api_token="test", transport=transport, cache_ttl=0)
+
+    with deadline_scope(time.monotonic() - 1):
+        with pytest.raises(DeadlineExceeded):
+            client.get_current_user()
+        with pytest.raises(DeadlineExceeded):
+            client.create_invitee(EVENT_TYPE_URI, "2030-01-01T10:00:00Z", {"name": "A", "email": "a@b.c"}, {})
+
+    assert transport.timeouts == []
+
+
+def test_tool_calls_are_not_run_once_the_budget_is_spent():
+    transport = RecordingTransport()
+    tool = GetCalendlyUserTool(CalendlyClient(api_token="test", transport=transport, cache_ttl=0))
+    call = {"name": tool.name, "args": {}, "id": "1"}
+
+    with deadline_scope(time.monotonic() - 1):
+        result = build_tool_node({tool.name: tool})({"messages": [AIMessage(content="", tool_calls=[call])]})
+
+    assert DEADLINE_RESULT in result["messages"][0].content
+    assert transport.timeouts == []
+
+
+def test_a_read_shared_with_a_slow_request_waits_only_the_remaining_budget():
+    client = CalendlyClient(api_token="test", transport=FakeCalendly(latency=1.0, seed_events=0), cache_ttl=30)
+    owner = threading.Thread(target=client.get_current_user)
+    owner.start()
+    time.sleep(0.1)
+
+    started = time.perf_counter()
+    with deadline_scope(time.monotonic() + 0.2):
+        with pytest.raises(DeadlineExceeded):
+            client.get_current_user()
+    elapsed = time.perf_counter() - started
+    owner.join()
+
+    assert elapsed < 0.5
+
+
+def test_calendly_writes_get_the_remaining_budget_as_timeout():
+    transport = RecordingTransport()
+    client = CalendlyClient(api_token="test", transport=transport, cache_ttl=0)
+
+    with deadline_scope(time.monotonic() + 2):
+        client.create_invitee(EVENT_TYPE_URI, "2030-01-01T10:00:00Z", {"name": "A", "email": "a@b.c"}, {})
+
+    assert 1 < transport.timeouts[0] <= 2
+
+
+def test_a_write_cut_short_is_reported_as_unconfirmed():
+    class TimingOut(RecordingTransport):
+        def post(self, url: str, timeout: float, **kwargs: Any):
+            raise requests.Timeout(f"{url} took more than {timeout}s")
+
+    client = CalendlyClient(api_token="test", transport=TimingOut(), cache_ttl=0)
+    tool = CreateCalendlyInviteeTool(client)
+    payload = {"event_type": EVENT_TYPE_URI, "start_time": "2030-01-01T10:00:00Z", "invitee": {"name": "A"}}
+    call = {"name": tool.name, "args": {"input_str": json.dumps(payload)}, "id": "1"}
+
+    with deadline_scope(time.monotonic() + 2):
+        result = build_tool_node({tool.name: tool})({"messages": [AIMessage(content="", tool_calls=[call])]})
+
+    assert UNCONFIRMED_RESULT in result["messages"][0].content
+
+
+def test_a_model_call_outlasting_the_budget_gives_its_scheduler_slot_back():
+    release = threading.Event()
+
+    class HangingModel:
+        def invoke(self, messages):
+            release.wait(5)
+            return AIMessage(content="too late")
+
+    scheduler = LLMScheduler(max_concurrency=1)
+    with deadline_scope(time.monotonic() + 0.2):
+        with pytest.raises(DeadlineExceeded):
+            scheduled_call(HangingModel(), [HumanMessage(content="hello")], "chat", scheduler)
+
+    assert scheduler.running == 0
+    with deadline_scope(time.monotonic() + 0.2):
+        release.set()
+        assert scheduled_call(HangingModel(), [HumanMessage(content="hello")], "chat", scheduler).content == "too late"
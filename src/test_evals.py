@@ -0,0 +1,46 @@
+"""Evaluation Runner Tests"""
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.bench.evals import VerdictCache, cached_judge, evaluate
+from src.bench.fakes import build_offline_agent
+from src.bench.scenarios import SCENARIOS
+
+
+def trajectory(call_id: str) -> list:
+    return [
+        HumanMessage(content="Can I walk in?"),
+        AIMessage(content="", tool_calls=[{"id": call_id, "name": "check_other_questions_we_can_answer", "args": {}}]),
+        ToolMessage(content="[]", tool_call_id=call_id),
+        AIMessage(content="No."),
+    ]
+
+
+def test_verdicts_are_cached_by_trajectory_not_ids(tmp_path):
+    calls = []
+
+    def judge(*, outputs, reference_outputs):
+        calls.append(outputs)
+        return {"key": "trajectory_accuracy", "score": True, "comment": "ok"}
+
+    cache = VerdictCache(str(tmp_path / "verdicts.sqlite"))
+    cached = cached_judge(judge, cache)
+
+    assert cached(outputs=trajectory("call_1"), reference_outputs=trajectory("ref"))["score"]
+    assert cached(outputs=trajectory("call_2"), reference_outputs=trajectory("ref"))["score"]
+    cached(outputs=trajectory("call_3")[:2], reference_outputs=trajectory("ref"))
+
+    assert len(calls) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_scenarios_run_concurrently_on_isolated_threads():
+    agent, _ = build_offline_agent(greet=False)
+
+    outcomes = await evaluate(agent, repeat=2, concurrency=4)
+
+    assert len(outcomes) == 2 * len(SCENARIOS)
+    assert all(o["intent_ok"] for o in outcomes)
+    assert all(o["tokens"][0] > 0 for o in outcomes)
@@ -0,0 +1,149 @@
+"""Event Mirror Tests, against the in-process Calendly backend and its webhook stand-in"""
+
+import json
+from datetime import UTC, datetime
+
+import pytest
+import pytest_asyncio
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.api.calendly import CalendlyClient
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly
+from src.bench.server import request
+from src.event_mirror import EventMirror, sign_webhook
+from src.server import ChatServer
+from src.test_checkpoint import build_echo_graph
+from src.tools.appointments import FindPatientAppointmentsTool
+
+NOW = datetime(2030, 1, 1, tzinfo=UTC)
+PATIENT = {"name": "Pat", "email": "Pat@Example.com"}
+
+
+@pytest.fixture
+def calendly():
+    return FakeCalendly(seed_events=250)
+
+
+def build_mirror(calendly: FakeCalendly) -> EventMirror:
+    return EventMirror(
+        CalendlyClient(api_token="test", transport=calendly, cache_ttl=0), page_size=100, now=lambda: NOW
+    )
+
+
+def other_client(calendly: FakeCalendly) -> CalendlyClient:
+    """Another Calendly user, e.g. the front desk, whose changes only reach the mirror as webhooks"""
+    return CalendlyClient(api_token="test", transport=calendly, cache_ttl=0)
+
+
+def gets(calendly: FakeCalendly, endpoint: str) -> int:
+    return sum(method == "GET" and url.endswith(endpoint) for method, url, _ in calendly.requests)
+
+
+def test_bulk_sync_pages_through_every_event(calendly):
+    mirror = build_mirror(calendly)
+
+    appointments = mirror.appointments("PATIENT7@example.com")
+
+    assert [e["start_time"] for e in appointments] == ["2030-01-01T12:30:00.000000Z"]
+    assert len(mirror.events) == 250
+    assert gets(calendly, "/scheduled_events") == 3
+    assert gets(calendly, "/invitees") == 250
+    assert mirror.at("2030-01-01T12:30:00Z") == [{k: v for k, v in appointments[0].items() if k != "invitees"}]
+
+
+def test_webhooks_keep_the_mirror_current_without_requests(calendly):
+    mirror = build_mirror(calendly)
+    calendly.webhooks.append(mirror.apply_webhook)
+    mirror.appointments("nobody@example.com")
+    synced = len(calendly.requests)
+
+    invitee = other_client(calendly).create_invitee(EVENT_TYPE_URI, "2030-03-01T10:00:00Z", PATIENT, {})["resource"]
+    assert [e["uri"] for e in mirror.appointments("pat@example.com")] == [invitee["event"]]
+
+    other_client(calendly).cancel_event(invitee["event"].rsplit("/", 1)[-1])
+    assert mirror.appointments("pat@example.com") == []
+    assert [method for method, _, _ in calendly.requests[synced:]] == ["POST", "POST"]
+
+
+def test_delta_reconciliation_only_fetches_changed_events(calendly):
+    mirror = build_mirror(calendly)
+    mirror.appointments("nobody@example.com")
+    # Missed webhooks
+    invitee = other_client(calendly).create_invitee(EVENT_TYPE_URI, "2030-03-01T10:00:00Z", PATIENT, {})["resource"]
+    other_client(calendly).cancel_event(mirror.appointments("patient0@example.com")[0]["uri"].rsplit("/", 1)[-1])
+    before = gets(calendly, "/invitees")
+
+    mirror.sync(delta=True)
+
+    assert gets(calendly, "/invitees") - before == 1
+    assert [e["uri"] for e in mirror.appointments("pat@example.com")] == [invitee["event"]]
+    assert mirror.appointments("patient0@example.com") == []
+
+
+def test_late_created_webhook_does_not_bring_back_a_cancellation(calendly):
+    mirror = build_mirror(calendly)
+    mirror.appointments("nobody@example.com")
+    captured = []
+    calendly.webhooks.append(captured.append)
+    invitee = other_client(calendly).create_invitee(EVENT_TYPE_URI, "2030-03-01T10:00:00Z", PATIENT, {})["resource"]
+    other_client(calendly).cancel_event(invitee["event"].rsplit("/", 1)[-1])
+
+    for body in reversed(captured):
+        mirror.apply_webhook(body)
+
+    assert mirror.appointments("pat@example.com") == []
+
+
+def test_tool_lists_the_patient_appointments(calendly):
+    tool = FindPatientAppointmentsTool(build_mirror(calendly))
+
+    result = tool.invoke({"input_str": json.dumps({"email": "patient3@example.com"})})
+
+    assert [(a["start_time"], a["invitees"][0]["name"]) for a in result] == [
+        ("2030-01-01T10:30:00.000000Z", "Patient 3")
+    ]
+
+
+@pytest_asyncio.fixture
+async def webhook_server(calendly):
+    server = ChatServer(build_echo_graph(MemorySaver()), event_mirror=build_mirror(calendly), webhook_signing_key="k")
+    await server.start("127.0.0.1", 0)
+    yield server
+    await server.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_server_applies_signed_webhooks_only(webhook_server, calendly):
+    captured = []
+    calendly.webhooks.append(captured.append)
+    other_client(calendly).create_invitee(EVENT_TYPE_URI, "2030-03-01T10:00:00Z", PATIENT, {})
+    body = json.dumps(captured[0]).encode()
+    port = webhook_server.server.sockets[0].getsockname()[1]
+
+    forged = await request(port, "POST", "/webhooks/calendly", body, headers={"Calendly-Webhook-Signature": "t=1,v1=x"})
+    signed = await request(
+        port, "POST", "/webhooks/calendly", body, headers={"Calendly-Webhook-Signature": sign_webhook(body, "k")}
+    )
+
+    assert forged[0] == 401
+    assert signed == (200, {"applied": True})
+    assert len(webhook_server.event_mirror.appointments("pat@example.com")) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("insecure, status", [(False, 401), (True, 200)])
+async def test_unsigned_webhooks_need_the_insecure_flag_without_a_key(calendly, insecure, status):
+    captured = []
+    calendly.webhooks.append(captured.append)
+    other_client(calendly).create_invitee(EVENT_TYPE_URI, "2030-03-01T10:00:00Z", PATIENT, {})
+    server = ChatServer(
+        build_echo_graph(MemorySaver()), event_mirror=build_mirror(calendly), insecure_webhooks=insecure
+    )
+    await server.start("127.0.0.1", 0)
+    try:
+        port = server.server.sockets[0].getsockname()[1]
+        response = await request(port, "POST", "/webhooks/calendly", json.dumps(captured[0]).encode())
+    finally:
+        await server.shutdown()
+
+    assert response[0] == status
@@ -0,0 +1,110 @@
+"""Usage Accounting and Limits Tests, using the scripted model and the in-process Calendly backend"""
+
+import uuid
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.config import get_config
+from langgraph.types import Command
+
+from src.agent import build_tool_node, create_acme_dental_agent
+from src.api.calendly import CalendlyClient
+from src.bench.fakes import SCHEDULED, FakeCalendly, ScriptedChatModel, build_offline_agent
+from src.limits import (
+    CONVERSATION_LIMIT_MESSAGE,
+    REPEATED_CALL_RESULT,
+    TURN_LIMIT_MESSAGE,
+    UsageLimits,
+    tool_call_signature,
+    usage_update,
+)
+from src.models import ModelRouter
+from src.tools.scheduled import ListCalendlyScheduledEventsTool
+
+
+class LoopingChatModel(ScriptedChatModel):
+    """Scripted model stuck listing the scheduled events when reviewing appointments"""
+
+    def respond(self, messages: list[BaseMessage]) -> AIMessage:
+        if get_config()["metadata"].get("langgraph_node") != "review":
+            return super().respond(messages)
+        name, args = SCHEDULED
+        return AIMessage(
+            content="", tool_calls=[{"id": f"call_{uuid.uuid4().hex}", "name": name, "args": args([], None)}]
+        )
+
+
+def start(agent, thread_id: str) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+    return config
+
+
+def reply(agent, config: dict, content: str) -> dict:
+    return agent.invoke(Command(resume={"messages": [HumanMessage(content=content)]}), config=config)
+
+
+def test_usage_is_accounted_per_turn_and_per_conversation():
+    agent, _ = build_offline_agent()
+    config = start(agent, "usage")
+
+    first = reply(agent, config, "What are my appointments?")
+    second = reply(agent, config, "What are my appointments?")
+
+    turn = second["turn_usage"]
+    assert turn["llm_calls"] == second["llm_calls"] - first["llm_calls"] > 1
+    assert turn["tool_calls"] == second["tool_calls"] - first["tool_calls"] > 0
+    assert turn["tokens"] == second["tokens"] - first["tokens"] > 0
+    assert sum(turn["calls"].values()) == turn["tool_calls"]
+
+
+def test_a_looping_model_is_stopped():
+    calendly = FakeCalendly()
+    model = LoopingChatModel()
+    agent = create_acme_dental_agent(
+        calendly_client=CalendlyClient(api_token="offline", transport=calendly, cache_ttl=30),
+        model_router=ModelRouter({"default": {"model": "scripted"}}, factory=lambda **spec: model),
+        limits=UsageLimits(turn_llm_calls=6, repeated_tool_calls=2),
+    )
+    config = start(agent, "loop")
+
+    result = reply(agent, config, "What are my appointments?")
+
+    assert result["messages"][-1].content == TURN_LIMIT_MESSAGE
+    assert result["turn_usage"]["llm_calls"] == 6
+    assert result["turn_usage"]["tool_calls"] == 2
+    assert sum("scheduled_events" in url for _, url, _ in calendly.requests) == 1  # the second one is cached
+    assert REPEATED_CALL_RESULT in str(result["messages"][-2].content)
+
+
+def test_repeated_identical_tool_calls_are_short_circuited():
+    calendly = FakeCalendly()
+    tool = ListCalendlyScheduledEventsTool(CalendlyClient(api_token="test", transport=calendly, cache_ttl=0))
+    calls = [{"name": tool.name, "args": {"input_str": "{}"}, "id": str(i)} for i in range(3)]
+    node = build_tool_node({tool.name: tool}, limits=UsageLimits(repeated_tool_calls=1))
+
+    result = node({"messages": [AIMessage(content="", tool_calls=calls)]})
+
+    assert [REPEATED_CALL_RESULT in str(m.content) for m in result["messages"]] == [False, True, True]
+    assert result["turn_usage"]["tool_calls"] == 1
+    assert len(calendly.requests) == 1
+
+
+def test_conversation_budget_answers_without_the_model():
+    agent, _ = build_offline_agent(limits=UsageLimits(conversation_tokens=1))
+    config = start(agent, "budget")
+
+    result = reply(agent, config, "What are my appointments?")
+
+    assert result["messages"][-1].content == CONVERSATION_LIMIT_MESSAGE
+    assert result["llm_calls"] == 1  # the greeting
+
+
+def test_usage_update_adds_to_both_counters():
+    state = usage_update({}, llm_calls=1, tokens=10)
+
+    call = {"name": "a", "args": {"email": "patient@example.com"}, "id": "1"}
+    state.update(usage_update(state, tool_calls=[call]))
+
+    assert (state["llm_calls"], state["tool_calls"], state["tokens"]) == (1, 1, 10)
+    assert state["turn_usage"]["calls"] == {tool_call_signature(call): 1}
+    assert len(tool_call_signature(call)) == 16
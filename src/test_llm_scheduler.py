@@ -0,0 +1,95 @@
+"""Model Call Scheduler Tests"""
+
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.bench.fakes import build_offline_agent
+from src.deadline import DeadlineExceeded, deadline_scope
+from src.llm_scheduler import LLMScheduler
+from src.metrics import REGISTRY
+
+MESSAGES = [HumanMessage(content="x" * 400)]
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def metrics():
+    REGISTRY.reset()
+    REGISTRY.enable()
+    yield REGISTRY
+    REGISTRY.disable()
+    REGISTRY.reset()
+
+
+def test_booking_calls_go_ahead_of_questions(metrics):
+    scheduler = LLMScheduler(max_concurrency=1)
+    busy, order = threading.Event(), []
+
+    def call(node: str):
+        return threading.Thread(target=scheduler.run, args=(node, MESSAGES, lambda: order.append(node)))
+
+    holder = threading.Thread(target=scheduler.run, args=("question", MESSAGES, lambda: busy.wait(5)))
+    holder.start()
+    question, booking = call("question"), call("schedule")
+    question.start()
+    while not scheduler.waiting:
+        time.sleep(0.001)
+    booking.start()
+    while len(scheduler.waiting) < 2:
+        time.sleep(0.001)
+    busy.set()
+    for thread in (holder, question, booking):
+        thread.join(5)
+
+    assert order == ["schedule", "question"]
+    assert {dict(k)["priority"] for k in metrics.histograms["llm_queue_wait_seconds"]} == {"booking", "chat"}
+
+
+def test_calls_past_the_token_budget_wait_within_the_deadline():
+    scheduler = LLMScheduler(tokens_per_minute=120)
+    used = AIMessage(content="", usage_metadata={"input_tokens": 100, "output_tokens": 20, "total_tokens": 120})
+
+    assert scheduler.run("question", MESSAGES, lambda: used) is used
+    with deadline_scope(time.monotonic() + 0.1), pytest.raises(DeadlineExceeded):
+        scheduler.run("question", MESSAGES, lambda: used)
+    assert not scheduler.waiting and scheduler.running == 0
+
+
+def test_rate_limited_calls_are_retried_with_backoff(metrics):
+    delays = []
+    scheduler = LLMScheduler(max_retries=2, backoff=0.5, sleep=delays.append)
+    attempts = iter([ProviderError(429), ProviderError(529), "answer"])
+
+    def call():
+        result = next(attempts)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    assert scheduler.run("schedule", MESSAGES, call) == "answer"
+    assert len(delays) == 2 and 0 <= delays[0] <= 0.5 and 0 <= delays[1] <= 1.0
+    assert metrics.counters["llm_retries_total"] == {
+        (("node", "schedule"), ("status", "429")): 1,
+        (("node", "schedule"), ("status", "529")): 1,
+    }
+    with pytest.raises(ProviderError):
+        scheduler.run("schedule", MESSAGES, lambda: (_ for _ in ()).throw(ProviderError(400)))
+    assert scheduler.running == 0
+
+
+def test_agent_model_calls_go_through_the_scheduler(metrics):
+    agent, _ = build_offline_agent(scheduler=LLMScheduler(max_concurrency=1))
+
+    agent.invoke({"messages": [HumanMessage(content="hi")]}, config={"configurable": {"thread_id": "scheduled"}})
+
+    assert sum(h.count for h in metrics.histograms["llm_queue_wait_seconds"].values()) == sum(
+        metrics.counters["llm_calls_total"].values()
+    )
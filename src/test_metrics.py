@@ -0,0 +1,79 @@
+"""Metrics Tests"""
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from src.metrics import REGISTRY, MetricsRegistry, endpoint_label, span
+from src.test_routing import build_agent, classification, invoke
+
+
+@pytest.fixture
+def metrics():
+    REGISTRY.reset()
+    REGISTRY.enable()
+    yield REGISTRY
+    REGISTRY.disable()
+    REGISTRY.reset()
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    registry.inc("calls_total", node="a")
+    registry.observe("latency_seconds", 0.1)
+
+    assert registry.prometheus() == "\n"
+    with span("noop"):
+        pass
+    assert not REGISTRY.enabled and not REGISTRY.histograms
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("calls_total", node="a")
+    registry.inc("calls_total", 2, node="a")
+    registry.observe("latency_seconds", 0.02, buckets=(0.01, 0.1), node="a")
+
+    assert registry.prometheus().splitlines() == [
+        "# TYPE acme_calls_total counter",
+        'acme_calls_total{node="a"} 3',
+        "# TYPE acme_latency_seconds histogram",
+        'acme_latency_seconds_bucket{node="a",le="0.01"} 0',
+        'acme_latency_seconds_bucket{node="a",le="0.1"} 1',
+        'acme_latency_seconds_bucket{node="a",le="+Inf"} 1',
+        'acme_latency_seconds_sum{node="a"} 0.02',
+        'acme_latency_seconds_count{node="a"} 1',
+    ]
+
+
+def test_span_counts_errors(metrics):
+    with pytest.raises(KeyError), span("tool_call", tool="lookup"):
+        raise KeyError("missing")
+
+    assert metrics.counters["tool_call_errors_total"] == {(("error", "KeyError"), ("tool", "lookup")): 1}
+    assert metrics.histograms["tool_call_seconds"][(("tool", "lookup"),)].count == 1
+
+
+def test_endpoint_label_collapses_ids():
+    assert endpoint_label("/scheduled_events/GBGBDCAADAEDCRZ2/invitees") == "/scheduled_events/{id}/invitees"
+    assert endpoint_label("/users/me") == "/users/me"
+
+
+def test_graph_counts_llm_calls_and_tokens(metrics):
+    usage = {"input_tokens": 100, "output_tokens": 5, "total_tokens": 105}
+    agent = build_agent(
+        [
+            AIMessage(content="", tool_calls=[classification("leave")], usage_metadata=usage),
+            AIMessage(content="Bye!", usage_metadata=usage),
+        ]
+    )
+
+    result = invoke(agent, "That's all, thanks")
+
+    assert result["llm_calls"] == 2
+    assert metrics.counters["llm_calls_total"] == {
+        (("model", "unknown"), ("node", "route")): 1,
+        (("model", "unknown"), ("node", "leave")): 1,
+    }
+    input_tokens = {k: v for k, v in metrics.counters["llm_tokens_total"].items() if ("kind", "input") in k}
+    assert sum(input_tokens.values()) == 200
+    assert {dict(k)["node"] for k in metrics.histograms["graph_node_seconds"]} == {"route", "leave"}
@@ -0,0 +1,58 @@
+"""Model Routing Tests"""
+
+import os
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.agent import create_acme_dental_agent
+from src.api.calendly import CalendlyClient
+from src.bench.fakes import FakeCalendly, ScriptedChatModel
+from src.models import ModelRouter, load_models_config
+
+CONFIG = {
+    "default": {"model": "big", "temperature": 0},
+    "nodes": {"detect_intent": {"model": "fast"}, "greet": {"model": "fast"}},
+}
+
+
+def test_nodes_override_the_default_and_share_identical_models():
+    router = ModelRouter(CONFIG, factory=lambda **spec: spec)
+
+    assert router.spec("detect_intent") == {"model": "fast", "temperature": 0}
+    assert router.spec("schedule") == {"model": "big", "temperature": 0}
+    assert router.for_node("detect_intent") is router.for_node("greet")
+    assert router.for_node("schedule") is router.for_node("cancel")
+
+
+def test_unknown_nodes_are_rejected():
+    router = ModelRouter({**CONFIG, "nodes": {"detect_intnet": {"model": "fast"}}}, factory=lambda **spec: spec)
+
+    with pytest.raises(ValueError, match="detect_intnet"):
+        router.validate(["detect_intent", "greet"])
+
+
+def test_models_are_created_on_their_nodes_first_call():
+    created = []
+
+    def factory(**spec):
+        created.append(spec["model"])
+        return ScriptedChatModel()
+
+    router = ModelRouter(CONFIG, factory=factory)
+    agent = create_acme_dental_agent(
+        calendly_client=CalendlyClient(api_token="offline", transport=FakeCalendly()), model_router=router
+    )
+    assert created == []
+
+    agent.invoke({"messages": [HumanMessage(content="hi")]}, config={"configurable": {"thread_id": "lazy"}})
+    assert created == ["fast"]
+    bound = router.lazy("schedule", lambda model: ("bound", model))
+    assert bound() is bound() and created == ["fast", "big"]
+
+
+@pytest.mark.parametrize("name", ["models.toml", "models.routing.toml"])
+def test_shipped_configs_load(name):
+    config = load_models_config(os.path.join(os.path.dirname(__file__), "config", name))
+
+    assert config["default"]["model"].startswith("claude-")
@@ -0,0 +1,99 @@
+"""Offline Agent Tests, using the scripted model and the in-process Calendly backend"""
+
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from src.bench import load, offline
+from src.bench.fakes import FakeCalendly, build_offline_agent
+from src.bench.scenarios import SCENARIOS
+
+
+def converse(agent, session_id: str, content: str) -> dict:
+    config = {"configurable": {"thread_id": session_id}}
+    agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+    return agent.invoke(Command(resume={"messages": [HumanMessage(content=content)]}), config=config)
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=[s["name"] for s in SCENARIOS])
+def test_scenarios_run_offline(scenario):
+    agent, _ = build_offline_agent()
+
+    result = converse(agent, scenario["name"], scenario["user_message"])
+
+    assert result["intent"]["intent"] == scenario["intent"]
+    assert "tool failed" not in str([m.content for m in result["messages"]])
+
+
+def test_offline_baseline_is_current():
+    """A change that moves a host independent gated metric must refresh src/bench/baselines/offline.json"""
+    with open(offline.DEFAULT_BASELINE) as f:
+        baseline = json.load(f)
+
+    for scenario in SCENARIOS:
+        result = offline.run(scenario, sessions=10, llm_latency=0, calendly_latency=0)
+        stored = baseline[scenario["name"]]
+        assert result["llm_calls_per_turn"] == pytest.approx(stored["llm_calls_per_turn"]), scenario["name"]
+        assert result["kb_per_session"] == pytest.approx(stored["kb_per_session"], rel=0.1), scenario["name"]
+
+
+def test_cancel_cancels_an_event():
+    agent, calendly = build_offline_agent()
+    active = sum(e["status"] == "active" for e in calendly.events.values())
+
+    converse(agent, "cancel", "Please cancel my appointment")
+
+    assert sum(e["status"] == "active" for e in calendly.events.values()) == active - 1
+    assert ("POST", "cancellation") in [(m, url.rsplit("/", 1)[-1]) for m, url, _ in calendly.requests]
+
+
+def test_fake_calendly_only_offers_free_slots():
+    calendly = FakeCalendly(seed_events=2)
+
+    slots = calendly.available_times("2030-01-01T00:00:00Z", "2030-01-01T23:59:59Z")
+
+    assert [s["start_time"][11:16] for s in slots][:2] == ["10:00", "10:30"]
+    assert len(slots) == 16 - 2
+
+
+def test_patients_claim_distinct_free_slots():
+    calendly = FakeCalendly(seed_events=1)
+    offered = [s["start_time"] for s in calendly.available_times("2030-01-01T00:00:00Z", "2030-01-01T23:59:59Z")]
+
+    first, second = calendly.claim(offered), calendly.claim(offered)
+
+    assert first == offered[0] and second == offered[1]
+    assert calendly.claim(["2030-01-01T09:00:00.000000Z"]) is None  # the seeded check-up
+
+
+@pytest.mark.asyncio
+async def test_load_generator_completes_every_conversation():
+    # Without the Calendly cache, as how many requests it saves depends on how the conversations interleave
+    result = await load.run(patients=10, llm_latency=0, calendly_latency=0, think_time=0, seed=0, cache_ttl=0)
+
+    assert sum(result["stats"].turns.values()) == 30
+    assert not any(result["stats"].errors.values())
+    assert result["calendly_requests"] == 36
+
+
+@pytest.mark.parametrize(
+    ("names", "cache_ttl", "requests"),
+    [
+        # Bookings and cancellations clear the cache, and with it on each of the 4 bookings checks its slot first
+        ([s["name"] for s in SCENARIOS] * 2, 0, 36),
+        ([s["name"] for s in SCENARIOS] * 2, 30, 38),
+        # The user and the event listing are fetched once, each patient lists the invitees of their own event
+        (["review_without_email"] * 3, 0, 9),
+        (["review_without_email"] * 3, 30, 5),
+    ],
+)
+def test_calendly_cache_saves_requests(names, cache_ttl, requests):
+    agent, calendly = build_offline_agent(cache_ttl=cache_ttl)
+    scenarios = {s["name"]: s for s in SCENARIOS}
+
+    for index, name in enumerate(names):
+        converse(agent, f"{name}-{index}", scenarios[name]["user_message"])
+
+    assert len(calendly.requests) == requests
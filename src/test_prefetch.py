@@ -0,0 +1,90 @@
+"""Calendly Cache and Prefetch Tests, against the in-process Calendly backend"""
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from src.api.calendly import CalendlyClient
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly, build_offline_agent
+from src.metrics import REGISTRY
+from src.prefetch import CalendlyPrefetcher
+
+
+@pytest.fixture
+def metrics():
+    REGISTRY.reset()
+    REGISTRY.enable()
+    yield REGISTRY
+    REGISTRY.disable()
+    REGISTRY.reset()
+
+
+def cache_results(registry) -> dict[str, float]:
+    results: dict[str, float] = {}
+    for labels, value in registry.counters.get("calendly_cache_total", {}).items():
+        result = dict(labels)["result"]
+        results[result] = results.get(result, 0) + value
+    return results
+
+
+def test_reads_are_cached_until_a_write():
+    calendly = FakeCalendly(seed_events=0)
+    client = CalendlyClient(api_token="test", transport=calendly, cache_ttl=30)
+
+    client.get_current_user()
+    client.get_current_user()
+    assert len(calendly.requests) == 1
+
+    client.create_invitee_no_show("https://api.calendly.com/invitees/X")
+    client.get_current_user()
+    assert [method for method, _, _ in calendly.requests] == ["GET", "POST", "GET"]
+
+
+def test_cached_entries_expire():
+    now = [0.0]
+    calendly = FakeCalendly(seed_events=0)
+    client = CalendlyClient(api_token="test", transport=calendly, cache_ttl=5, clock=lambda: now[0])
+
+    client.get_current_user()
+    now[0] = 6.0
+    client.get_current_user()
+
+    assert len(calendly.requests) == 2
+
+
+def test_availability_is_served_from_a_covering_window():
+    calendly = FakeCalendly(seed_events=0)
+    client = CalendlyClient(api_token="test", transport=calendly, cache_ttl=30)
+
+    week = client.list_event_type_available_times(EVENT_TYPE_URI, "2030-01-01T00:00:00Z", "2030-01-08T00:00:00Z")
+    day = client.list_event_type_available_times(EVENT_TYPE_URI, "2030-01-02T00:00:00Z", "2030-01-02T23:59:59Z")
+
+    assert len(calendly.requests) == 1
+    assert day == calendly.available_times("2030-01-02T00:00:00Z", "2030-01-02T23:59:59Z")
+    assert len(day) < len(week)
+
+
+def test_prefetch_warms_the_cache_for_the_scheduling_tools(metrics):
+    agent, calendly = build_offline_agent(llm_latency=0.1, prefetch=True, cache_ttl=30)
+    config = {"configurable": {"thread_id": "prefetch"}}
+    agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+
+    agent.invoke(Command(resume={"messages": [HumanMessage(content="I want to book a check-up")]}), config=config)
+
+    results = cache_results(metrics)
+    assert results["miss"] == 3
+    assert results.get("hit", 0) + results.get("window_hit", 0) == 3
+    # The prefetched reads, and the fresh check of the booked slot
+    assert [method for method, _, _ in calendly.requests].count("GET") == 4
+
+
+def test_wrong_prediction_cancels_the_prefetch():
+    calendly = FakeCalendly(latency=0.05, seed_events=0)
+    prefetcher = CalendlyPrefetcher(CalendlyClient(api_token="test", transport=calendly, cache_ttl=30))
+
+    prefetcher.on_intent("schedule")
+    prefetcher.on_intent("question")
+    prefetcher.close()
+
+    assert len(calendly.requests) <= 1
+    assert not prefetcher.running
@@ -0,0 +1,52 @@
+"""Calendly Records Tests"""
+
+import json
+
+import pytest
+
+from src.api.calendly import CalendlyClient
+from src.api.records import Invitee, ScheduledEvent, User, decode_response
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly
+from src.bench.records import invitee, scheduled_event
+
+WEEK = ("2030-01-01T00:00:00Z", "2030-01-08T00:00:00Z")
+
+
+class BytesResponse:
+    def __init__(self, payload: dict):
+        self.content = json.dumps(payload).encode()
+
+    def json(self) -> dict:
+        raise AssertionError("decoded from the raw bytes")
+
+
+def test_records_keep_the_fields_in_use_and_round_trip():
+    event = ScheduledEvent.from_api(scheduled_event(1))
+    person = Invitee.from_api(invitee(1))
+
+    assert event.location == "Acme Dental Lane"
+    assert "event_memberships" not in event.to_dict() and "tracking" not in person.to_dict()
+    assert ScheduledEvent.from_dict(event.to_dict()) == event
+    assert Invitee.from_dict(person.to_dict()) == person
+    assert not hasattr(event, "__dict__")
+    with pytest.raises(AttributeError):
+        event.status = "canceled"
+
+
+def test_responses_are_decoded_from_their_bytes():
+    assert decode_response(BytesResponse({"resource": {"uri": "u"}})) == {"resource": {"uri": "u"}}
+
+
+def test_client_returns_records():
+    client = CalendlyClient(api_token="test", transport=FakeCalendly(), cache_ttl=0)
+
+    user = client.current_user()
+    slots = client.available_times(EVENT_TYPE_URI, *WEEK)
+
+    assert isinstance(user, User) and user.current_organization
+    assert slots and all(slot.start_time for slot in slots)
+    assert all(isinstance(e, ScheduledEvent) for e in client.scheduled_events(user=user.uri))
+
+    booked = client.book_invitee(EVENT_TYPE_URI, slots[0].start_time, {"name": "Ann", "email": "ann@example.com"}, {})
+    assert isinstance(booked, Invitee) and booked.event and booked.email == "ann@example.com"
+    assert [i.uri for i in client.event_invitees(booked.event)] == [booked.uri]
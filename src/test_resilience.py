@@ -0,0 +1,136 @@
+"""Circuit Breaker and Hedging Tests, against the in-process Calendly backend"""
+
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from src.api.calendly import CalendlyAPIError, CalendlyClient
+from src.api.resilience import CircuitBreaker, CircuitOpenError, Hedger
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly, FakeResponse
+from src.metrics import REGISTRY
+
+
+class FlakyTransport:
+    """Calendly that answers with the scripted `outages` status codes first, after the scripted `delays`"""
+
+    def __init__(self, calendly: FakeCalendly):
+        self.calendly = calendly
+        self.outages: list[int] = []
+        self.delays: list[float] = []
+        self.lock = threading.Lock()
+        self.sent = 0
+
+    def get(self, url: str, **kwargs: Any) -> FakeResponse:
+        with self.lock:
+            self.sent += 1
+            status = self.outages.pop(0) if self.outages else None
+            delay = self.delays.pop(0) if self.delays else 0.0
+        time.sleep(delay)
+        return FakeResponse(status, {"title": "Unavailable"}) if status else self.calendly.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> FakeResponse:
+        return self.calendly.post(url, **kwargs)
+
+
+@pytest.fixture
+def metrics():
+    REGISTRY.reset()
+    REGISTRY.enable()
+    yield REGISTRY
+    REGISTRY.disable()
+    REGISTRY.reset()
+
+
+@pytest.fixture
+def transport():
+    return FlakyTransport(FakeCalendly(seed_events=0))
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=3, slow_call_seconds=0.2, reset_timeout=30, clock=lambda: clock[0])
+
+
+def build_client(transport: FlakyTransport, **kwargs: Any) -> CalendlyClient:
+    return CalendlyClient(api_token="test", transport=transport, cache_ttl=0, **kwargs)
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast(transport, breaker, metrics):
+    client = build_client(transport, breaker=breaker)
+    transport.outages = [503, 503, 503]
+
+    for _ in range(3):
+        with pytest.raises(CalendlyAPIError):
+            client.get_current_user()
+    with pytest.raises(CircuitOpenError):
+        client.get_current_user()
+
+    assert transport.sent == 3
+    assert metrics.gauges["calendly_breaker_state"] == {(): 2}
+    assert "acme_calendly_breaker_state 2" in metrics.prometheus()
+
+
+def test_half_open_probe_closes_or_reopens_the_breaker(transport, breaker, clock):
+    client = build_client(transport, breaker=breaker)
+    transport.outages = [503, 503, 503, 503]
+    for _ in range(3):
+        with pytest.raises(CalendlyAPIError):
+            client.get_current_user()
+
+    clock[0] = 31.0
+    with pytest.raises(CalendlyAPIError):
+        client.get_current_user()
+    assert breaker.state == "open"
+
+    clock[0] = 62.0
+    assert client.get_current_user()["resource"]
+    assert breaker.state == "closed"
+
+
+def test_slow_calls_open_the_breaker_and_client_errors_do_not(transport, breaker):
+    client = build_client(transport, breaker=breaker)
+    for _ in range(3):
+        with pytest.raises(CalendlyAPIError):
+            client.create_invitee(EVENT_TYPE_URI, "2030-01-01T03:00:00Z", {"name": "A", "email": "a@b.c"}, {})
+    assert breaker.state == "closed"
+
+    transport.delays = [0.3, 0.3, 0.3]
+    for _ in range(3):
+        client.get_current_user()
+    assert breaker.state == "open"
+
+
+def test_slow_reads_are_hedged_and_the_first_response_wins(transport, metrics):
+    hedger = Hedger(min_samples=3, min_delay=0.01)
+    for _ in range(3):
+        hedger.observe("/users/me", 0.02)
+    client = build_client(transport, hedger=hedger)
+    transport.delays = [2.0]
+
+    started = time.perf_counter()
+    user = client.get_current_user()
+    elapsed = time.perf_counter() - started
+    hedger.close()
+
+    assert user["resource"]
+    assert elapsed < 1.0
+    assert metrics.counters["calendly_hedge_wins_total"] == {(("endpoint", "/users/me"), ("winner", "hedge")): 1}
+
+
+def test_reads_are_not_hedged_until_latencies_are_known(transport):
+    hedger = Hedger(min_samples=3)
+    client = build_client(transport, hedger=hedger)
+
+    client.get_current_user()
+    client.get_current_user()
+    hedger.close()
+
+    assert transport.sent == 2
+    assert hedger.delay("/users/me") is None
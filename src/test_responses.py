@@ -0,0 +1,71 @@
+"""Templated Response Tests, using the scripted model and the in-process Calendly backend"""
+
+import json
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.types import Command
+
+from src.bench.fakes import ANSWERS, build_offline_agent
+from src.responses import Responder, local_time
+
+
+def converse(agent, thread_id: str, *contents: str) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    result = agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+    for content in contents:
+        result = agent.invoke(Command(resume={"messages": [HumanMessage(content=content)]}), config=config)
+    return result
+
+
+@pytest.fixture
+def responder():
+    return Responder.from_config()
+
+
+def test_greeting_and_farewell_need_no_model_call(responder):
+    agent, _ = build_offline_agent(responder=responder)
+
+    greeting = converse(agent, "greet")
+    farewell = converse(agent, "leave", "Thanks, bye")
+
+    assert greeting["messages"][-1].content.startswith("Hello and welcome to Acme Dental!")
+    assert greeting.get("llm_calls", 0) == 0
+    assert farewell["messages"][-1].content == responder.template("leave").template
+    assert farewell["llm_calls"] == 1  # detecting the intent
+
+
+def test_booking_is_confirmed_from_the_tool_result(responder):
+    agent, _ = build_offline_agent(responder=responder)
+    baseline, _ = build_offline_agent()
+
+    result = converse(agent, "book", "I'd like to book a check-up")
+
+    booking = next(m for m in reversed(result["messages"]) if getattr(m, "tool_calls", None)).tool_calls[0]
+    start_time = json.loads(booking["args"]["input_str"])["start_time"]
+    assert result["messages"][-1].content == (
+        f"You're all set, Test Test! Your appointment is booked for {local_time(start_time, 'UTC')}. "
+        "A confirmation has been sent to test@foo.com. Is there anything else I can help you with?"
+    )
+    # The greeting and the confirmation
+    assert result["llm_calls"] == converse(baseline, "book", "I'd like to book a check-up")["llm_calls"] - 2
+
+
+def test_failed_booking_is_left_to_the_model(responder):
+    agent, calendly = build_offline_agent(responder=responder)
+    calendly.is_free = lambda moment: False
+
+    result = converse(agent, "taken", "I'd like to book a check-up")
+
+    assert result["messages"][-1].content == ANSWERS["schedule"]
+    assert "template" not in result["messages"][-1].response_metadata
+
+
+def test_templates_missing_placeholders_are_not_rendered(responder):
+    assert responder.render("schedule", "booked", {"invitee_name": "Pat"}) is None
+    assert local_time("2030-01-01T10:00:00Z", "Europe/Malta") == "Tuesday 1 January 2030 at 11:00 (Europe/Malta)"
+
+
+def test_responses_for_unknown_nodes_fail_fast():
+    with pytest.raises(ValueError, match="greeting"):
+        build_offline_agent(responder=Responder({"nodes": {"greeting": {"template": "greet"}}}))
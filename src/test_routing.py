@@ -0,0 +1,107 @@
+"""Single-call Routing Tests"""
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.agent import INTENT_TOOL, ROUTE_TOOL, create_acme_dental_agent
+from src.api.calendly import CalendlyClient
+from src.models import ModelRouter
+from src.tools import build_questions_tools_for_tests, build_scheduling_tools_for_tests
+
+
+class FakeToolCallingModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def classification(intent: str, answer: str = "") -> dict:
+    args = {"intent": intent, "topic": "walk-ins", "summary": "...", "answer": answer}
+    return {"id": "route_1", "name": ROUTE_TOOL, "args": args}
+
+
+def build_agent(responses: list[AIMessage]):
+    model = FakeToolCallingModel(messages=iter(responses))
+    calendly_client = CalendlyClient(api_token="mock")
+    intent_tool_sets = {
+        "question": build_questions_tools_for_tests(),
+        "schedule": build_scheduling_tools_for_tests(calendly_client),
+        "leave": {},
+    }
+    return create_acme_dental_agent(
+        intent_tool_sets=intent_tool_sets,
+        greet=False,
+        model_router=ModelRouter({"default": {"model": "fake"}}, factory=lambda **spec: model),
+        single_call_routing=True,
+        calendly_api_token="mock",
+    )
+
+
+def invoke(agent, content: str) -> dict:
+    config = {"configurable": {"thread_id": "routing"}}
+    return agent.invoke({"messages": [HumanMessage(content=content)]}, config=config)
+
+
+def test_intent_and_first_tool_call_come_from_one_model_call():
+    agent = build_agent(
+        [
+            AIMessage(
+                content="",
+                tool_calls=[
+                    classification("question"),
+                    {"id": "call_1", "name": "check_other_questions_we_can_answer", "args": {"input_str": ""}},
+                    {"id": "call_2", "name": "get_calendly_current_user", "args": {}},
+                ],
+            ),
+            AIMessage(content="We do not accept walk-ins."),
+        ]
+    )
+
+    result = invoke(agent, "Can I just walk in?")
+    routed, tool_result, answer = result["messages"][1:]
+
+    assert result["intent"]["intent"] == "question"
+    assert [c["name"] for c in routed.tool_calls] == ["check_other_questions_we_can_answer"]
+    assert isinstance(tool_result, ToolMessage) and tool_result.tool_call_id == "call_1"
+    assert answer.content == "We do not accept walk-ins."
+
+
+def test_answer_without_tool_call_is_the_reply_of_a_single_call():
+    agent = build_agent([AIMessage(content="", tool_calls=[classification("question", "We open at 9am.")])])
+
+    result = invoke(agent, "When do you open?")
+
+    assert result["intent"] == {"intent": "question", "topic": "walk-ins", "summary": "..."}
+    assert [m.content for m in result["messages"]] == ["When do you open?", "We open at 9am."]
+    assert result["llm_calls"] == 1
+
+
+def test_classification_without_tool_call_or_answer_continues_in_the_intent_node():
+    agent = build_agent([AIMessage(content="", tool_calls=[classification("leave")]), AIMessage(content="Bye!")])
+
+    result = invoke(agent, "That's all, thanks")
+
+    assert [m.content for m in result["messages"]] == ["That's all, thanks", "Bye!"]
+
+
+def test_plain_answer_without_classification_is_the_reply():
+    agent = build_agent([AIMessage(content="Hello! How can I help?")])
+
+    result = invoke(agent, "Hi")
+
+    assert result["messages"][-1].content == "Hello! How can I help?"
+    assert result["llm_calls"] == 1
+
+
+def test_missing_classification_falls_back_to_detect_intent():
+    agent = build_agent(
+        [
+            AIMessage(content=""),
+            AIMessage(content="", tool_calls=[{**classification("leave"), "name": INTENT_TOOL}]),
+            AIMessage(content="Bye!"),
+        ]
+    )
+
+    result = invoke(agent, "That's all, thanks")
+
+    assert result["intent"]["intent"] == "leave"
+    assert result["messages"][-1].content == "Bye!"
@@ -0,0 +1,53 @@
+"""Chat Server Tests"""
+
+import pytest
+import pytest_asyncio
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.bench.server import request
+from src.server import ChatServer
+from src.test_checkpoint import build_echo_graph
+
+
+@pytest_asyncio.fixture
+async def server():
+    server = ChatServer(build_echo_graph(MemorySaver()))
+    await server.start("127.0.0.1", 0)
+    yield server
+    await server.shutdown()
+
+
+def port_of(server: ChatServer) -> int:
+    return server.server.sockets[0].getsockname()[1]
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_isolated_and_resume_after_interrupt(server):
+    port = port_of(server)
+    _, first = await request(port, "POST", "/sessions", {"timezone": "Europe/Dublin"})
+    _, second = await request(port, "POST", "/sessions", {"timezone": "Europe/Paris"})
+
+    status, reply = await request(port, "POST", f"/sessions/{first['session_id']}/messages", {"content": "hi"})
+
+    assert first["session_id"] != second["session_id"]
+    assert first["messages"] == ["echo: hello, my timezone is Europe/Dublin"]
+    assert status == 200
+    assert reply == {"session_id": first["session_id"], "messages": ["echo: hi"], "waiting": True}
+
+
+@pytest.mark.asyncio
+async def test_unknown_session_and_bad_requests_are_rejected(server):
+    port = port_of(server)
+
+    assert (await request(port, "POST", "/sessions/nope/messages", {"content": "hi"}))[0] == 404
+    assert (await request(port, "POST", "/sessions/nope/messages", {}))[0] == 400
+    assert (await request(port, "GET", "/nowhere"))[0] == 404
+
+
+@pytest.mark.asyncio
+async def test_turns_beyond_the_pending_limit_are_shed(server):
+    server.max_pending_turns = 0
+    status, body = await request(port_of(server), "POST", "/sessions", {})
+
+    assert status == 503
+    assert body == {"error": "server is busy"}
@@ -0,0 +1,123 @@
+"""Slot Calendar Tests, synced from the in-process Calendly backend"""
+
+import time
+from datetime import UTC, datetime
+
+import pytest
+
+from src.api.calendly import CalendlyClient
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly
+from src.slot_calendar import SlotCalendar
+from src.tools.slots import FindAvailableSlotsTool
+
+NOW = datetime(2030, 1, 1, tzinfo=UTC)  # a Tuesday
+
+
+@pytest.fixture
+def calendly():
+    # Books 09:00 and 09:30 on the first day
+    return FakeCalendly(seed_events=2)
+
+
+@pytest.fixture
+def client(calendly):
+    return CalendlyClient(api_token="test", transport=calendly, cache_ttl=0)
+
+
+def starts(slots: list[datetime]) -> list[str]:
+    return [s.strftime("%a %d %H:%M") for s in slots]
+
+
+def test_finds_the_earliest_slots_matching_weekday_and_time(client):
+    calendar = SlotCalendar(client, now=lambda: NOW)
+
+    slots = calendar.find(weekdays=[1], after=9 * 60, before=12 * 60, limit=7)
+
+    assert starts(slots) == [
+        "Tue 01 10:00",
+        "Tue 01 10:30",
+        "Tue 01 11:00",
+        "Tue 01 11:30",
+        "Tue 08 09:00",
+        "Tue 08 09:30",
+        "Tue 08 10:00",
+    ]
+    assert calendar.event_type == EVENT_TYPE_URI
+
+
+def test_time_window_is_in_the_patient_timezone(client):
+    calendar = SlotCalendar(client, now=lambda: NOW)
+
+    # 09:00 in New York is 14:00 UTC in January
+    slots = calendar.find(after=9 * 60, timezone="America/New_York", limit=1)
+
+    assert slots == [datetime(2030, 1, 1, 14, tzinfo=UTC)]
+
+
+def test_bookings_and_cancellations_update_the_calendar_without_a_sync(client, calendly):
+    calendar = SlotCalendar(client, now=lambda: NOW)
+    assert calendar.find(limit=1) == [datetime(2030, 1, 1, 10, tzinfo=UTC)]
+    synced_requests = len(calendly.requests)
+
+    invitee = client.create_invitee(EVENT_TYPE_URI, "2030-01-01T10:00:00Z", {"name": "A", "email": "a@b.c"}, {})
+    assert calendar.find(limit=1) == [datetime(2030, 1, 1, 10, 30, tzinfo=UTC)]
+
+    client.cancel_event(invitee["resource"]["event"].rsplit("/", 1)[-1])
+    assert calendar.find(limit=1) == [datetime(2030, 1, 1, 10, tzinfo=UTC)]
+    assert [method for method, _, _ in calendly.requests[synced_requests:]] == ["POST", "POST"]
+
+
+def test_a_failing_write_listener_does_not_fail_the_booking(client, calendly, caplog):
+    def broken(path, payload, response):
+        raise RuntimeError("calendar is broken")
+
+    client.write_listeners.append(broken)
+    invitee = client.create_invitee(EVENT_TYPE_URI, "2030-01-01T10:00:00Z", {"name": "A", "email": "a@b.c"}, {})
+
+    assert invitee["resource"]["event"]
+    assert "2030-01-01T10:00:00.000000Z" in calendly.booked()
+    assert "Write listener failed" in caplog.text
+
+
+def test_upcoming_bookings_are_found_behind_a_long_history():
+    # More past check-ups than a page of scheduled events holds
+    calendly = FakeCalendly(seed_events=150, start=datetime(2029, 11, 1, 9, tzinfo=UTC))
+    client = CalendlyClient(api_token="test", transport=calendly, cache_ttl=0)
+    invitee = client.create_invitee(EVENT_TYPE_URI, "2030-01-01T10:00:00Z", {"name": "A", "email": "a@b.c"}, {})
+    calendar = SlotCalendar(client, now=lambda: NOW)
+
+    calendar.find(limit=1)
+
+    assert list(calendar.events) == [invitee["resource"]["event"]]
+
+
+def test_a_user_without_an_active_event_type_gets_a_clear_error(client, monkeypatch):
+    monkeypatch.setattr(client, "list_event_types", lambda **kwargs: [{"uri": "old", "active": False}])
+
+    with pytest.raises(ValueError, match="no active event type"):
+        SlotCalendar(client, now=lambda: NOW).find(limit=1)
+
+
+def test_stale_calendar_is_reconciled_in_the_background(client, calendly):
+    calendar = SlotCalendar(client, now=lambda: NOW, reconcile_interval=0)
+    calendar.find(limit=1)
+    # Booked by someone else, directly in Calendly
+    calendly.book(datetime(2030, 1, 1, 10, tzinfo=UTC), {"name": "B", "email": "b@c.d"})
+
+    calendar.find(limit=1)
+    deadline = time.monotonic() + 5
+    while calendar.reconciling and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    calendar.reconcile_interval = 300
+    assert calendar.find(limit=1) == [datetime(2030, 1, 1, 10, 30, tzinfo=UTC)]
+
+
+def test_tool_reports_local_times(client):
+    tool = FindAvailableSlotsTool(SlotCalendar(client, now=lambda: NOW))
+
+    result = tool.invoke({"input_str": '{"weekdays": ["Wednesday"], "timezone": "Europe/Berlin", "limit": 1}'})
+
+    assert result["slots"] == [{"start_time": "2030-01-02T09:00:00Z", "local_time": "2030-01-02T10:00:00+01:00"}]
+    with pytest.raises(ValueError):
+        tool.invoke({"input_str": '{"weekdays": ["someday"]}'})
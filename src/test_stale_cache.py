@@ -0,0 +1,129 @@
+"""Stale-While-Revalidate Tests, against the in-process Calendly backend"""
+
+import json
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.types import Command
+
+from src.api.calendly import CalendlyClient, SlotUnavailableError, parse_max_stale, parse_time
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly, build_offline_agent
+from src.tools.availability import ListCalendlyEventTypeAvailableTimesTool
+from src.tools.invitee import SLOT_UNAVAILABLE_RESULT
+
+WEEK = ("2030-01-01T00:00:00Z", "2030-01-08T00:00:00Z")
+PATIENT = {"name": "Pat", "email": "pat@example.com"}
+
+
+@pytest.fixture
+def clock():
+    return [0.0]
+
+
+@pytest.fixture
+def calendly():
+    return FakeCalendly(seed_events=0)
+
+
+@pytest.fixture
+def client(calendly, clock):
+    max_stale = {"/event_types": 60.0, "/event_type_available_times": 60.0}
+    return CalendlyClient(
+        api_token="test", transport=calendly, cache_ttl=5, clock=lambda: clock[0], max_stale=max_stale
+    )
+
+
+def refreshed(client: CalendlyClient) -> None:
+    deadline = time.monotonic() + 5
+    while client.refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_max_stale_is_configured_per_endpoint():
+    assert parse_max_stale("/event_types=3600, /scheduled_events=60") == {
+        "/event_types": 3600.0,
+        "/scheduled_events": 60.0,
+    }
+
+
+def test_expired_reads_are_served_stale_and_refreshed_in_the_background(client, calendly, clock):
+    client.list_event_types()
+    calendly.latency = 0.3
+    clock[0] = 20.0
+
+    started = time.perf_counter()
+    stale = client.with_age(client.list_event_types())
+    elapsed = time.perf_counter() - started
+    refreshed(client)
+    fresh = client.with_age(client.list_event_types())
+
+    assert elapsed < 0.1
+    assert stale["stale"] and stale["age_seconds"] == 20.0
+    assert fresh == stale["collection"]
+    assert len(calendly.requests) == 2
+
+
+def test_reads_past_the_maximum_staleness_wait_for_calendly(client, calendly, clock):
+    client.list_event_types()
+    clock[0] = 100.0
+
+    assert isinstance(client.with_age(client.list_event_types()), list)
+    assert len(calendly.requests) == 2
+
+
+def test_endpoints_without_a_maximum_staleness_are_never_stale(client, calendly, clock):
+    client.get_current_user()
+    clock[0] = 6.0
+    client.get_current_user()
+
+    assert client.with_age([]) == []
+    assert len(calendly.requests) == 2
+
+
+def test_stale_availability_cannot_double_book(client, calendly, clock):
+    tool = ListCalendlyEventTypeAvailableTimesTool(client)
+    payload = {"event_type": EVENT_TYPE_URI, "start_time": WEEK[0], "end_time": WEEK[1]}
+    slot = tool.invoke({"input_str": json.dumps(payload)})[0]["start_time"]
+    # Booked by someone else, then the cached week goes stale
+    other = CalendlyClient(api_token="test", transport=calendly, cache_ttl=0)
+    other.create_invitee(EVENT_TYPE_URI, slot, {"name": "Other", "email": "other@example.com"}, {})
+    calendly.latency = 0.3
+    clock[0] = 10.0
+
+    offered = tool.invoke({"input_str": json.dumps(payload)})
+    with pytest.raises(SlotUnavailableError):
+        client.create_invitee(EVENT_TYPE_URI, slot, PATIENT, {})
+
+    assert offered["stale"] and offered["collection"][0]["start_time"] == slot
+    assert [method for method, _, _ in calendly.requests].count("POST") == 1
+
+
+def test_bookings_of_free_slots_pass_the_fresh_check(client, calendly):
+    slot = client.list_event_type_available_times(EVENT_TYPE_URI, *WEEK)[0]["start_time"]
+
+    invitee = client.create_invitee(EVENT_TYPE_URI, slot, PATIENT, {})
+
+    assert invitee["resource"]["email"] == PATIENT["email"]
+    assert slot in calendly.booked()
+
+
+def test_the_agent_is_told_when_the_slot_was_taken_in_the_meantime():
+    agent, calendly = build_offline_agent(cache_ttl=30)
+    claim, taken = calendly.claim, []
+
+    def claimed_and_taken_by_someone_else(offered: list[str]) -> str:
+        taken.append(claim(offered))
+        calendly.book(parse_time(taken[0]), {"name": "Someone Else", "email": "else@example.com"})
+        return taken[0]
+
+    calendly.claim = claimed_and_taken_by_someone_else
+    booked = len(calendly.booked())
+    config = {"configurable": {"thread_id": "taken"}}
+    agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+
+    result = agent.invoke(Command(resume={"messages": [HumanMessage(content="I want to book a check-up")]}), config)
+
+    booking = [m for m in result["messages"] if isinstance(m, ToolMessage)][-1]
+    assert SLOT_UNAVAILABLE_RESULT.format(start_time=taken[0]) in str(booking.content)
+    assert len(calendly.booked()) == booked + 1  # only the other patient's
@@ -0,0 +1,117 @@
+"""Multi-clinic Tenancy Tests, using the scripted model and the in-process Calendly backend"""
+
+import json
+from typing import Any
+
+import pytest
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.types import Command
+
+from src.agent import create_acme_dental_agent
+from src.bench.fakes import FakeCalendly, ScriptedChatModel
+from src.deadline import DEADLINE_MESSAGE, with_deadline
+from src.models import ModelRouter
+from src.tenants import TenantRegistry, UnknownTenantError, thread_id
+
+TENANTS = {
+    "acme": {"calendly_token_env": "ACME_TOKEN"},
+    "north": {"calendly_token_env": "NORTH_TOKEN"},
+}
+
+
+class TokenRecordingCalendly(FakeCalendly):
+    """In-process Calendly that records the API token of every request"""
+
+    def __init__(self):
+        super().__init__()
+        self.tokens: list[str] = []
+
+    def get(self, url: str, params: dict[str, Any] | None = None, **kwargs: Any):
+        self.tokens.append(kwargs["headers"]["Authorization"].removeprefix("Bearer "))
+        return super().get(url, params, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def tokens(monkeypatch):
+    monkeypatch.setenv("ACME_TOKEN", "acme-token")
+    monkeypatch.setenv("NORTH_TOKEN", "north-token")
+
+
+def test_tenants_are_resolved_from_the_config_then_the_thread_id_then_the_default():
+    registry = TenantRegistry(TENANTS, "acme", transport=FakeCalendly())
+
+    assert registry.tenant_id({"configurable": {"thread_id": "north:1", "tenant_id": "acme"}}) == "acme"
+    assert registry.tenant_id({"configurable": {"thread_id": thread_id("north", "1")}}) == "north"
+    assert registry.tenant_id({"configurable": {"thread_id": "elsewhere:1"}}) == "acme"
+    with pytest.raises(UnknownTenantError):
+        TenantRegistry(TENANTS, transport=FakeCalendly()).tenant_id({"configurable": {"thread_id": "1"}})
+    with pytest.raises(UnknownTenantError):
+        registry.get("elsewhere")
+
+
+def test_tenants_share_the_transport_and_the_least_recently_used_are_forgotten():
+    transport = FakeCalendly()
+    registry = TenantRegistry({**TENANTS, "south": TENANTS["north"]}, transport=transport, max_active=2)
+
+    acme, north = registry.get("acme"), registry.get("north")
+    registry.get("acme")
+    registry.get("south")
+
+    assert acme.calendly_client.transport is north.calendly_client.transport is transport
+    assert acme.calendly_client is not north.calendly_client
+    assert list(registry.active) == ["acme", "south"]
+    assert registry.get("north") is not north
+
+
+def test_one_graph_serves_each_thread_with_its_tenants_client_and_knowledge_base(tmp_path):
+    knowledge_base = tmp_path / "kb.json"
+    knowledge_base.write_text(json.dumps({"Do you accept walk-ins?": "Walk-ins are welcome until noon."}))
+    calendly = TokenRecordingCalendly()
+    registry = TenantRegistry(
+        {**TENANTS, "north": {**TENANTS["north"], "knowledge_base": str(knowledge_base)}}, "acme", transport=calendly
+    )
+    model = ScriptedChatModel()
+    agent = create_acme_dental_agent(
+        model_router=ModelRouter({"default": {"model": "scripted"}}, factory=lambda **spec: model), tenants=registry
+    )
+
+    def ask(thread: str, content: str) -> list:
+        config = {"configurable": {"thread_id": thread}}
+        agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config=config)
+        return agent.invoke(Command(resume={"messages": [HumanMessage(content=content)]}), config=config)["messages"]
+
+    north = ask("north:1", "Do you accept walk-ins?")
+    acme = ask("acme:1", "Do you accept walk-ins?")
+    ask("north:2", "I'd like to book a check-up")
+
+    assert "Walk-ins are welcome until noon." in str([m.content for m in north if isinstance(m, ToolMessage)])
+    assert "Walk-ins are welcome until noon." not in str([m.content for m in acme if isinstance(m, ToolMessage)])
+    assert set(calendly.tokens) == {"north-token"}
+
+
+def test_each_tenant_has_a_model_call_budget_of_its_own():
+    registry = TenantRegistry(
+        {tenant_id: {**spec, "llm_concurrency": 1} for tenant_id, spec in TENANTS.items()},
+        "acme",
+        transport=FakeCalendly(),
+    )
+    model = ScriptedChatModel()
+    agent = create_acme_dental_agent(
+        model_router=ModelRouter({"default": {"model": "scripted"}}, factory=lambda **spec: model), tenants=registry
+    )
+    acme, north = registry.get("acme"), registry.get("north")
+    assert acme.scheduler is not north.scheduler
+    assert acme.scheduler.max_concurrency == north.scheduler.max_concurrency == 1
+
+    def greeting(thread: str, budget: float) -> str:
+        config = with_deadline({"configurable": {"thread_id": thread}}, budget)
+        return agent.invoke({"messages": [HumanMessage(content="hello, my timezone is UTC")]}, config)["messages"][
+            -1
+        ].content
+
+    # Another conversation of acme holds its only model call slot
+    acme.scheduler.acquire("greet", 1)
+
+    assert greeting("north:1", budget=5) != DEADLINE_MESSAGE
+    assert greeting("acme:1", budget=0.3) == DEADLINE_MESSAGE
+    assert north.scheduler.running == 0
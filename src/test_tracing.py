@@ -0,0 +1,51 @@
+"""Debug Tracing Tests"""
+
+import json
+import logging
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.types import Command
+
+from src.tracing import Pretty, Tracer
+
+
+class Exploding:
+    def __repr__(self):
+        raise AssertionError("state was rendered")
+
+
+def test_state_is_not_rendered_below_debug_level(caplog):
+    caplog.set_level(logging.ERROR)
+
+    Tracer().node_start("assistant", {"messages": [Exploding()]})
+
+    assert not caplog.records
+
+
+def test_pretty_truncates_long_strings():
+    assert "[90 chars truncated]" in str(Pretty({"content": "x" * 100}, max_chars=10))
+
+
+def test_jsonl_sink_records_new_messages_only(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(str(path), max_chars=10)
+    history = [HumanMessage(content="hi"), AIMessage(content="hello")]
+
+    tracer.node_start("assistant", {"messages": history})
+    tracer.node_end("assistant", Command(update={"messages": [AIMessage(content="y" * 50)]}, goto="tools"), 0.5)
+    tracer.close()
+
+    start, end = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (start["event"], start["messages"]) == ("start", 2)
+    assert (end["event"], end["goto"], end["duration_s"]) == ("end", "tools", 0.5)
+    assert end["update"]["messages"] == [{"type": "ai", "content": "yyyyyyyyyy... [40 chars truncated]"}]
+
+
+def test_sampling_is_per_thread(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(str(path), sample_rate=0.0)
+
+    tracer.node_start("assistant", {"messages": []})
+    tracer.close()
+
+    assert path.read_text() == ""
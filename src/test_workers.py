@@ -0,0 +1,89 @@
+"""Worker Pool and Shared Cache Tests"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+import pytest_asyncio
+
+from src.api.calendly import CalendlyClient
+from src.bench.fakes import EVENT_TYPE_URI, FakeCalendly
+from src.bench.server import request
+from src.checkpoint import SQLiteSaver
+from src.server import ChatServer
+from src.shared_cache import SharedCache
+from src.test_checkpoint import build_echo_graph
+from src.workers import WorkerPool
+
+WEEK = ("2030-01-01T00:00:00Z", "2030-01-08T00:00:00Z")
+
+
+def build_echo_worker(workdir: str):
+    checkpointer = SQLiteSaver(os.path.join(workdir, "checkpoints.sqlite"))
+    leases = SharedCache(os.path.join(workdir, "shared.sqlite"))
+    return ChatServer(build_echo_graph(checkpointer), leases=leases), checkpointer.close
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    return str(tmp_path / "shared.sqlite")
+
+
+def test_processes_share_reads_and_a_write_clears_every_cache(shared_path):
+    calendly = FakeCalendly(seed_events=0)
+    first = CalendlyClient(api_token="test", transport=calendly, cache_ttl=30, shared_cache=SharedCache(shared_path))
+    second = CalendlyClient(api_token="test", transport=calendly, cache_ttl=30, shared_cache=SharedCache(shared_path))
+
+    def event_type_reads() -> int:
+        return sum(url.endswith("/event_types") for _, url, _ in calendly.requests)
+
+    first.list_event_types()
+    second.list_event_types()
+    assert event_type_reads() == 1
+
+    slot = first.list_event_type_available_times(EVENT_TYPE_URI, *WEEK)[0]["start_time"]
+    first.create_invitee(EVENT_TYPE_URI, slot, {"name": "Pat", "email": "pat@example.com"}, {})
+    second.list_event_types()
+    assert event_type_reads() == 2
+
+
+def test_a_lease_is_held_by_one_live_process_at_a_time(shared_path):
+    mine, other = SharedCache(shared_path), SharedCache(shared_path)
+    other.owner = os.getppid()
+
+    assert mine.lease("session:a", 60)
+    assert not other.lease("session:a", 60)
+    mine.release("session:a")
+    assert other.lease("session:a", 60)
+
+    exited = subprocess.Popen([sys.executable, "-c", ""])
+    exited.wait()
+    other.owner = exited.pid
+    assert other.lease("session:b", 60)
+    assert mine.lease("session:b", 60)
+
+
+@pytest_asyncio.fixture
+async def pool(tmp_path):
+    pool = WorkerPool("src.test_workers:build_echo_worker", (str(tmp_path),), 2, check_interval=60)
+    await pool.start("127.0.0.1", 0)
+    yield pool
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sessions_stick_to_their_worker_and_survive_its_death(pool):
+    port = pool.server.sockets[0].getsockname()[1]
+    _, created = await request(port, "POST", "/sessions", {"timezone": "UTC"})
+    session_id = created["session_id"]
+    await request(port, "POST", f"/sessions/{session_id}/messages", {"content": "hi"})
+    worker = pool.workers[pool.affinity[session_id]]
+
+    worker.process.kill()
+    worker.process.join()
+    status, reply = await request(port, "POST", f"/sessions/{session_id}/messages", {"content": "still there?"})
+
+    assert status == 200
+    assert reply["messages"] == ["echo: still there?"]
+    assert pool.workers[pool.affinity[session_id]] is not worker
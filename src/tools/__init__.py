@@ -3,6 +3,9 @@
 from langchain.tools import BaseTool
 
 from src.api.calendly import CalendlyClient
+from src.event_mirror import EventMirror
+from src.slot_calendar import SlotCalendar
+from src.tools.appointments import FindPatientAppointmentsTool
 from src.tools.availability import ListCalendlyEventTypeAvailableTimesTool, MockListCalendlyEventTypeAvailableTimesTool
 from src.tools.cancel import CancelCalendlyEventTool, MockCancelCalendlyEventTool
 from src.tools.event_invitees import ListCalendlyEventInviteesTool, MockListCalendlyEventInviteesTool
@@ -10,10 +13,13 @@ from src.tools.event_types import ListCalendlyEventTypesTool, MockListCalendlyEv
 from src.tools.invitee import CreateCalendlyInviteeTool, MockCreateCalendlyInviteeTool
 from src.tools.kb import CheckWhatOtherQuestionsCanWeAnswer, GetReadyAnswerToQuestions
 from src.tools.scheduled import ListCalendlyScheduledEventsTool, MockListCalendlyScheduledEventsTool
+from src.tools.slots import FindAvailableSlotsTool
 from src.tools.user import GetCalendlyUserTool, MockGetCalendlyUserTool
 
 
-def build_scheduling_tools(calendly_client: CalendlyClient) -> dict[str, BaseTool]:
+def build_scheduling_tools(
+    calendly_client: CalendlyClient, slot_calendar: SlotCalendar | None = None
+) -> dict[str, BaseTool]:
     tools: dict[str, BaseTool] = {}
     for cls in [
         GetCalendlyUserTool,
@@ -23,6 +29,9 @@ def build_scheduling_tools(calendly_client: CalendlyClient) -> dict[str, BaseToo
     ]:
         instance = cls(calendly_client)
         tools[instance.name] = instance
+    if slot_calendar:
+        instance = FindAvailableSlotsTool(slot_calendar)
+        tools[instance.name] = instance
     return tools
 
 
@@ -39,7 +48,9 @@ def build_scheduling_tools_for_tests(calendly_client: CalendlyClient) -> dict[st
     return tools
 
 
-def build_reviewing_tools(calendly_client: CalendlyClient) -> dict[str, BaseTool]:
+def build_reviewing_tools(
+    calendly_client: CalendlyClient, event_mirror: EventMirror | None = None
+) -> dict[str, BaseTool]:
     tools: dict[str, BaseTool] = {}
     for cls in [
         GetCalendlyUserTool,
@@ -49,6 +60,9 @@ def build_reviewing_tools(calendly_client: CalendlyClient) -> dict[str, BaseTool
     ]:
         instance = cls(calendly_client)
         tools[instance.name] = instance
+    if event_mirror:
+        instance = FindPatientAppointmentsTool(event_mirror)
+        tools[instance.name] = instance
     return tools
 
 
@@ -65,7 +79,11 @@ def build_reviewing_tools_for_tests(calendly_client: CalendlyClient) -> dict[str
     return tools
 
 
-def build_rescheduling_tools(calendly_client: CalendlyClient) -> dict[str, BaseTool]:
+def build_rescheduling_tools(
+    calendly_client: CalendlyClient,
+    slot_calendar: SlotCalendar | None = None,
+    event_mirror: EventMirror | None = None,
+) -> dict[str, BaseTool]:
     tools: dict[str, BaseTool] = {}
     for cls in [
         GetCalendlyUserTool,
@@ -78,6 +96,12 @@ def build_rescheduling_tools(calendly_client: CalendlyClient) -> dict[str, BaseT
     ]:
         instance = cls(calendly_client)
         tools[instance.name] = instance
+    if slot_calendar:
+        instance = FindAvailableSlotsTool(slot_calendar)
+        tools[instance.name] = instance
+    if event_mirror:
+        instance = FindPatientAppointmentsTool(event_mirror)
+        tools[instance.name] = instance
     return tools
 
 
@@ -97,7 +121,9 @@ def build_rescheduling_tools_for_tests(calendly_client: CalendlyClient) -> dict[
     return tools
 
 
-def build_cancelling_tools(calendly_client: CalendlyClient) -> dict[str, BaseTool]:
+def build_cancelling_tools(
+    calendly_client: CalendlyClient, event_mirror: EventMirror | None = None
+) -> dict[str, BaseTool]:
     tools: dict[str, BaseTool] = {}
     for cls in [
         GetCalendlyUserTool,
@@ -107,6 +133,9 @@ def build_cancelling_tools(calendly_client: CalendlyClient) -> dict[str, BaseToo
     ]:
         instance = cls(calendly_client)
         tools[instance.name] = instance
+    if event_mirror:
+        instance = FindPatientAppointmentsTool(event_mirror)
+        tools[instance.name] = instance
     return tools
 
 
@@ -123,13 +152,14 @@ def build_cancelling_tools_for_tests(calendly_client: CalendlyClient) -> dict[st
     return tools
 
 
-def build_questions_tools() -> dict[str, BaseTool]:
+def build_questions_tools(knowledge_base: dict[str, str] | None = None) -> dict[str, BaseTool]:
+    """Tools answering from the built-in knowledge base, or the given question -> answer one"""
     tools: dict[str, BaseTool] = {}
     for cls in [
         CheckWhatOtherQuestionsCanWeAnswer,
         GetReadyAnswerToQuestions,
     ]:
-        instance = cls()
+        instance = cls(knowledge_base=knowledge_base) if knowledge_base else cls()
         tools[instance.name] = instance
     return tools
 
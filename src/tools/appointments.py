@@ -0,0 +1,50 @@
+"""Tool that looks up a patient's appointments in the local event mirror"""
+
+import json
+from typing import Any
+
+from langchain.tools import BaseTool
+
+from src.event_mirror import EventMirror
+
+
+class FindPatientAppointmentsTool(BaseTool):
+    name: str = "find_patient_appointments"
+    description: str = (
+        "List a patient's upcoming appointments by their email, answered instantly from a local copy of the "
+        "calendar. Prefer it over listing scheduled events and their invitees. "
+        "Input should be a JSON string with key:\n"
+        "  - 'email' (required): the patient's email address."
+    )
+    event_mirror: EventMirror
+
+    def __init__(self, event_mirror: EventMirror, **data: Any) -> None:
+        super().__init__(event_mirror=event_mirror, **data)
+
+    def _run(self, input_str: str) -> list[dict[str, Any]]:
+        try:
+            payload = json.loads(input_str) if input_str else {}
+        except json.JSONDecodeError:
+            payload = {}
+
+        email = payload.get("email")
+        if not email:
+            raise ValueError("Missing required field: 'email' is required.")
+
+        return [
+            {
+                "uri": event["uri"],
+                "event_uuid": event["uri"].rsplit("/", 1)[-1],
+                "name": event.get("name"),
+                "start_time": event["start_time"],
+                "end_time": event.get("end_time"),
+                "location": event.get("location"),
+                "invitees": [
+                    {"uri": i["uri"], "name": i.get("name"), "email": i.get("email")} for i in event["invitees"]
+                ],
+            }
+            for event in self.event_mirror.appointments(email)
+        ]
+
+    async def _arun(self, input_str: str) -> list[dict[str, Any]]:
+        raise NotImplementedError("Async not implemented")
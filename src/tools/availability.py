@@ -24,7 +24,7 @@ class ListCalendlyEventTypeAvailableTimesTool(BaseTool):
     def __init__(self, calendly_client: CalendlyClient, **data: Any) -> None:
         super().__init__(calendly_client=calendly_client, **data)
 
-    def _run(self, input_str: str) -> list[dict[str, Any]]:
+    def _run(self, input_str: str) -> list[dict[str, Any]] | dict[str, Any]:
         try:
             payload = json.loads(input_str) if input_str else {}
         except json.JSONDecodeError:
@@ -44,13 +44,15 @@ class ListCalendlyEventTypeAvailableTimesTool(BaseTool):
             k: v for k, v in payload.items() if k not in {"event_type", "start_time", "end_time", "timezone"}
         }
 
-        return self.calendly_client.list_event_type_available_times(
+        slots = self.calendly_client.available_times(
             event_type=event_type,
             start_time=start_time,
             end_time=end_time,
             timezone=timezone,
             **extra_params,
         )
+        # Stale slots are fine to offer, the booking checks its slot with Calendly first
+        return self.calendly_client.with_age([slot.to_dict() for slot in slots])
 
     async def _arun(self, input_str: str) -> dict[str, Any]:
         raise NotImplementedError("Async not implemented")
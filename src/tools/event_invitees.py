@@ -16,7 +16,7 @@ class ListCalendlyEventInviteesTool(BaseTool):
         super().__init__(calendly_client=calendly_client, **data)
 
     def _run(self, event_uri: str) -> list[dict[str, Any]]:
-        return self.calendly_client.list_event_invitees(event_uri)
+        return [i.to_dict() for i in self.calendly_client.event_invitees(event_uri)]
 
     async def _arun(self, event_uri: str) -> Any:
         raise NotImplementedError("Async not implemented")
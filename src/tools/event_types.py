@@ -20,7 +20,7 @@ class ListCalendlyEventTypesTool(BaseTool):
     def __init__(self, calendly_client: CalendlyClient, **data: Any) -> None:
         super().__init__(calendly_client=calendly_client, **data)
 
-    def _run(self, input_str: str) -> list[dict[str, Any]]:
+    def _run(self, input_str: str) -> list[dict[str, Any]] | dict[str, Any]:
         try:
             data = json.loads(input_str) if input_str else {}
         except json.JSONDecodeError:
@@ -28,7 +28,8 @@ class ListCalendlyEventTypesTool(BaseTool):
 
         user = data.get("user")
         org = data.get("organization")
-        return self.calendly_client.list_event_types(organization=org, user=user)
+        event_types = self.calendly_client.event_types(organization=org, user=user)
+        return self.calendly_client.with_age([e.to_dict() for e in event_types])
 
     async def _arun(self, input_str: str) -> dict[str, Any]:
         raise NotImplementedError("Async not implemented")
@@ -3,7 +3,11 @@ from typing import Any
 
 from langchain.tools import BaseTool
 
-from src.api.calendly import CalendlyClient
+from src.api.calendly import CalendlyClient, SlotUnavailableError
+
+SLOT_UNAVAILABLE_RESULT = (
+    "not booked, the slot at {start_time} was taken in the meantime, tell the patient and offer other available times"
+)
 
 
 class CreateCalendlyInviteeTool(BaseTool):
@@ -25,7 +29,7 @@ class CreateCalendlyInviteeTool(BaseTool):
     def __init__(self, calendly_client: CalendlyClient, **data: Any) -> None:
         super().__init__(calendly_client=calendly_client, **data)
 
-    def _run(self, input_str: str) -> dict[str, Any]:
+    def _run(self, input_str: str) -> dict[str, Any] | str:
         import json
 
         try:
@@ -43,12 +47,16 @@ class CreateCalendlyInviteeTool(BaseTool):
                 "Missing required fields: 'event_type', 'start_time', 'invitee', and 'location' are all required."
             )
 
-        return self.calendly_client.create_invitee(
-            event_type=event_type,
-            start_time=start_time,
-            invitee=invitee,
-            location=location,
-        )
+        try:
+            booked = self.calendly_client.book_invitee(
+                event_type=event_type,
+                start_time=start_time,
+                invitee=invitee,
+                location=location,
+            )
+        except SlotUnavailableError:
+            return SLOT_UNAVAILABLE_RESULT.format(start_time=start_time)
+        return {"resource": booked.to_dict()}
 
     async def _arun(self, input_str: str) -> dict[str, Any]:
         raise NotImplementedError("Async not implemented")
@@ -171,9 +171,10 @@ DATA = {
 class CheckWhatOtherQuestionsCanWeAnswer(BaseTool):
     name: str = "check_other_questions_we_can_answer"
     description: str = "List a set of additional questions we have predefined answers to."
+    knowledge_base: dict[str, str] = DATA
 
     def _run(self, input_str: str) -> list[str]:
-        return DATA.keys()
+        return self.knowledge_base.keys()
 
     async def _arun(self, input_str: str) -> dict[str, Any]:
         raise NotImplementedError("Async not implemented")
@@ -187,6 +188,7 @@ class GetReadyAnswerToQuestions(BaseTool):
         "  - 'question' (required): One of the questions returned from check_other_questions_we_can_answer and\n"
         "    that matches the user question."
     )
+    knowledge_base: dict[str, str] = DATA
 
     def _run(self, input_str: str) -> str:
         try:
@@ -195,8 +197,8 @@ class GetReadyAnswerToQuestions(BaseTool):
             payload = {}
 
         question = payload.get("question")
-        if question in DATA:
-            return DATA[question]
+        if question in self.knowledge_base:
+            return self.knowledge_base[question]
         else:
             return "I'm afraid I have no answer to this."
 
@@ -21,7 +21,7 @@ class ListCalendlyScheduledEventsTool(BaseTool):
     def __init__(self, calendly_client: CalendlyClient, **data: Any) -> None:
         super().__init__(calendly_client=calendly_client, **data)
 
-    def _run(self, input_str: str) -> list[dict[str, Any]]:
+    def _run(self, input_str: str) -> list[dict[str, Any]] | dict[str, Any]:
         try:
             data = json.loads(input_str) if input_str else {}
         except json.JSONDecodeError:
@@ -29,12 +29,13 @@ class ListCalendlyScheduledEventsTool(BaseTool):
 
         user = data.get("user")
         org = data.get("organization")
-        return self.calendly_client.list_scheduled_events(
+        events = self.calendly_client.scheduled_events(
             user=user,
             organization=org,
             count=20,
             status="active",
         )
+        return self.calendly_client.with_age([e.to_dict() for e in events])
 
     async def _arun(self, input_str: str) -> Any:
         raise NotImplementedError("Async not implemented")
@@ -0,0 +1,70 @@
+"""Tool that searches the local slot calendar for free appointment slots"""
+
+import json
+from datetime import date
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from langchain.tools import BaseTool
+
+from src.slot_calendar import SlotCalendar, isoformat
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def minutes_past_midnight(value: str) -> int:
+    hours, _, minutes = value.partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class FindAvailableSlotsTool(BaseTool):
+    name: str = "find_available_slots"
+    description: str = (
+        "Find the earliest free appointment slots matching the patient's constraints, answered instantly from a "
+        "local copy of the calendar. Prefer it over listing available times. "
+        "Input should be a JSON string with optional keys:\n"
+        "  - 'weekdays': list of weekday names, e.g. ['tuesday']\n"
+        "  - 'after': earliest local start time, 'HH:MM'\n"
+        "  - 'before': latest local end time, 'HH:MM'\n"
+        "  - 'timezone': the patient's IANA timezone name, UTC by default\n"
+        "  - 'from_date': first local date to search, 'YYYY-MM-DD', today by default\n"
+        "  - 'days': number of days to search, 14 by default\n"
+        "  - 'limit': number of slots to return, 5 by default"
+    )
+    slot_calendar: SlotCalendar
+
+    def __init__(self, slot_calendar: SlotCalendar, **data: Any) -> None:
+        super().__init__(slot_calendar=slot_calendar, **data)
+
+    def _run(self, input_str: str = "") -> dict[str, Any]:
+        try:
+            payload = json.loads(input_str) if input_str else {}
+        except json.JSONDecodeError:
+            payload = {}
+
+        timezone = payload.get("timezone") or "UTC"
+        weekdays = payload.get("weekdays")
+        if weekdays is not None:
+            unknown = [day for day in weekdays if str(day).lower() not in WEEKDAYS]
+            if unknown:
+                raise ValueError(f"Unknown weekdays: {unknown}, expected names such as 'tuesday'")
+            weekdays = [WEEKDAYS.index(str(day).lower()) for day in weekdays]
+
+        slots = self.slot_calendar.find(
+            weekdays=weekdays,
+            after=minutes_past_midnight(payload["after"]) if payload.get("after") else 0,
+            before=minutes_past_midnight(payload["before"]) if payload.get("before") else 24 * 60,
+            timezone=timezone,
+            start=date.fromisoformat(payload["from_date"]) if payload.get("from_date") else None,
+            days=int(payload.get("days", 14)),
+            limit=int(payload.get("limit", 5)),
+        )
+        tz = ZoneInfo(timezone)
+        return {
+            "event_type": self.slot_calendar.event_type,
+            "slots": [{"start_time": isoformat(s), "local_time": s.astimezone(tz).isoformat()} for s in slots],
+            "calendar_ends": str(self.slot_calendar.synced_until()),
+        }
+
+    async def _arun(self, input_str: str = "") -> dict[str, Any]:
+        raise NotImplementedError("Async not implemented")
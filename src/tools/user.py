@@ -20,7 +20,7 @@ class GetCalendlyUserTool(BaseTool):
         super().__init__(calendly_client=calendly_client, **data)
 
     def _run(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
-        return self.calendly_client.get_current_user()
+        return {"resource": self.calendly_client.current_user().to_dict()}
 
     async def _arun(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
         raise NotImplementedError("Async not implemented")
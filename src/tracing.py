@@ -0,0 +1,137 @@
+"""
+Debug traces of the graph execution.
+
+Node inputs and outputs go to the `logging` debug level, rendered only when a handler actually emits them, and,
+when a trace path is configured (ACME_TRACE_PATH), to a rotating JSON lines file for offline analysis.
+The file records the messages each node adds, not the whole history, so a trace costs O(new messages) per node.
+Long strings are truncated and conversations can be sampled by thread id.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import time
+import zlib
+from pprint import pformat
+from typing import Any
+
+from langchain_core.messages import BaseMessage
+from langgraph.config import get_config
+from langgraph.types import Command
+
+DEFAULT_MAX_CHARS = 2000
+
+
+def truncate(value: Any, max_chars: int) -> Any:
+    """Returns a copy of the value with every string longer than max_chars cut short"""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return f"{value[:max_chars]}... [{len(value) - max_chars} chars truncated]"
+    if isinstance(value, dict):
+        return {k: truncate(v, max_chars) for k, v in value.items()}
+    if isinstance(value, list | tuple):
+        return [truncate(v, max_chars) for v in value]
+    if isinstance(value, BaseMessage):
+        return message_record(value, max_chars)
+    return value
+
+
+def message_record(message: BaseMessage, max_chars: int) -> dict[str, Any]:
+    record = {"type": message.type, "content": truncate(message.content, max_chars)}
+    if tool_calls := getattr(message, "tool_calls", None):
+        record["tool_calls"] = truncate(tool_calls, max_chars)
+    if tool_call_id := getattr(message, "tool_call_id", None):
+        record["tool_call_id"] = tool_call_id
+    return record
+
+
+class Pretty:
+    """Pretty-prints a value when (and only if) a log record is actually formatted"""
+
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value: Any, max_chars: int = DEFAULT_MAX_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        return pformat(truncate(self.value, self.max_chars))
+
+
+class Tracer:
+    """
+    Traces node executions. Without a path only the (lazy) debug logging is active.
+
+    - `max_bytes` and `backups` configure the rotation of the JSON lines file,
+    - `max_chars` truncates long strings such as tool payloads,
+    - `sample_rate` keeps that fraction of the conversations, all or nothing per thread.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        *,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        sample_rate: float = 1.0,
+    ):
+        self.max_chars = max_chars
+        self.sample_rate = sample_rate
+        self.sink: logging.Logger | None = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.sink = logging.getLogger(f"{__name__}.{path}")
+            self.sink.handlers = [handler]
+            self.sink.setLevel(logging.INFO)
+            self.sink.propagate = False
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        return cls(
+            os.getenv("ACME_TRACE_PATH") or None,
+            max_bytes=int(os.getenv("ACME_TRACE_MAX_BYTES", 10 * 1024 * 1024)),
+            max_chars=int(os.getenv("ACME_TRACE_MAX_CHARS", DEFAULT_MAX_CHARS)),
+            sample_rate=float(os.getenv("ACME_TRACE_SAMPLE_RATE", 1.0)),
+        )
+
+    def close(self) -> None:
+        if self.sink:
+            for handler in self.sink.handlers:
+                handler.close()
+            self.sink.handlers = []
+            self.sink = None
+
+    def sampled(self, thread_id: str) -> bool:
+        return zlib.crc32(thread_id.encode()) % 10_000 < self.sample_rate * 10_000
+
+    def write(self, node: str, event: str, **fields: Any) -> None:
+        try:
+            thread_id = str(get_config().get("configurable", {}).get("thread_id", ""))
+        except RuntimeError:
+            thread_id = ""
+        if not self.sampled(thread_id):
+            return
+        record = {"ts": time.time(), "thread_id": thread_id, "node": node, "event": event, **fields}
+        self.sink.info(json.dumps(record, default=str))
+
+    def node_start(self, node: str, state: dict[str, Any]) -> None:
+        logging.debug("%s <- %s", node, Pretty(state, self.max_chars))
+        if self.sink:
+            self.write(node, "start", messages=len(state.get("messages", [])))
+
+    def node_end(self, node: str, output: Any, duration: float) -> None:
+        logging.debug("%s -> %s", node, Pretty(output, self.max_chars))
+        if self.sink:
+            goto = None
+            if isinstance(output, Command):
+                output, goto = output.update, output.goto
+            update = truncate(output, self.max_chars) if isinstance(output, dict) else None
+            self.write(node, "end", duration_s=duration, goto=goto, update=update)
+
+
+TRACER = Tracer.from_env()
@@ -0,0 +1,349 @@
+"""
+Multi-process serving: a front process spreads the chat server's sessions over a pool of worker processes.
+
+Every worker is a full chat server (`ChatServer`) on a private port, built by a factory such as
+`src.server:build_worker`. The workers share the SQLite checkpointer and blob store, and a `SharedCache` holding
+the Calendly responses and the session leases, so a conversation does not depend on the process that started it:
+
+- affinity: the front sends every request of a session to the worker that created it, which keeps the worker's
+  in-process caches and background lookups useful,
+- handoff: sessions the front does not know (e.g. after a restart) or whose worker died go to the live worker their
+  id hashes to (rendezvous hashing), which resumes them from the shared checkpoints,
+- safety: a turn takes the session's lease first, so two workers never run turns of one session at once, and the
+  lease of a dead worker is taken over at once.
+
+Dead workers are restarted. Calendly webhooks are sent to every worker, so their event mirrors stay current.
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import logging
+import multiprocessing
+import re
+import signal
+from collections import OrderedDict
+from collections.abc import Callable
+from http import HTTPStatus
+from multiprocessing.connection import Connection
+from typing import Any
+
+from src.metrics import REGISTRY
+
+SESSION_ID = re.compile(rb'"session_id": "([^"]+)"')
+HOP_BY_HOP = {"connection", "content-length", "host", "keep-alive", "transfer-encoding"}
+MAX_HEAD_BYTES = 64 * 1024
+MAX_BODY_BYTES = 64 * 1024
+
+
+def load_factory(factory: str) -> Callable[..., Any]:
+    """Resolves "module:function" """
+    module, _, name = factory.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def worker_main(factory: str, factory_args: tuple, conn: Connection) -> None:
+    """Entry point of a worker process: builds its chat server, reports its port and serves until terminated"""
+    asyncio.run(run_worker(load_factory(factory), factory_args, conn))
+
+
+async def run_worker(build: Callable[..., Any], factory_args: tuple, conn: Connection) -> None:
+    server, close = build(*factory_args)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    listener = await server.start("127.0.0.1", 0)
+    conn.send(listener.sockets[0].getsockname()[1])
+    conn.close()
+    await stop.wait()
+    await server.shutdown()
+    close()
+
+
+def head(status: HTTPStatus, body: bytes) -> bytes:
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", "Connection: close", "Content-Type: application/json"]
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process: multiprocessing.process.BaseProcess | None = None
+        self.port: int | None = None
+        self.in_flight = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.port is not None and self.process is not None and self.process.is_alive()
+
+
+class WorkerPool:
+    """
+    Runs `workers` processes, each serving the chat server `factory(*factory_args)` returns along with the function
+    closing it, and proxies HTTP requests to them. The front remembers the worker of up to `affinity_entries`
+    sessions and checks on the workers every `check_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        factory: str,
+        factory_args: tuple = (),
+        workers: int = 2,
+        *,
+        affinity_entries: int = 100_000,
+        check_interval: float = 1.0,
+        start_timeout: float = 60.0,
+    ):
+        if workers < 1:
+            raise ValueError("A pool needs at least one worker")
+        self.factory = factory
+        self.factory_args = factory_args
+        self.workers = [Worker(index) for index in range(workers)]
+        self.affinity: OrderedDict[str, int] = OrderedDict()
+        self.affinity_entries = affinity_entries
+        self.check_interval = check_interval
+        self.start_timeout = start_timeout
+        self.context = multiprocessing.get_context("spawn")
+        self.server: asyncio.Server | None = None
+        self.supervisor: asyncio.Task | None = None
+        self.accepting = True
+
+    # Workers
+
+    async def spawn(self, worker: Worker) -> None:
+        receiver, sender = self.context.Pipe(duplex=False)
+        worker.port = None
+        worker.process = self.context.Process(
+            target=worker_main,
+            args=(self.factory, self.factory_args, sender),
+            name=f"acme-worker-{worker.index}",
+        )
+        worker.process.start()
+        sender.close()
+        loop = asyncio.get_running_loop()
+        ready = await loop.run_in_executor(None, receiver.poll, self.start_timeout)
+        if not ready:
+            worker.process.kill()
+            raise RuntimeError(f"Worker {worker.index} did not start within {self.start_timeout} seconds")
+        worker.port = receiver.recv()
+        receiver.close()
+        logging.info(f"Worker {worker.index} (pid {worker.process.pid}) serving on port {worker.port}")
+
+    async def supervise(self) -> None:
+        """Restarts workers that died, their sessions are handed off meanwhile"""
+        while self.accepting:
+            await asyncio.sleep(self.check_interval)
+            for worker in self.workers:
+                if self.accepting and worker.process and not worker.process.is_alive():
+                    logging.error(f"Worker {worker.index} exited with {worker.process.exitcode}, restarting it")
+                    REGISTRY.inc("worker_restarts_total")
+                    try:
+                        await self.spawn(worker)
+                    except (RuntimeError, EOFError) as e:
+                        logging.error(f"Restarting worker {worker.index} failed: {e}")
+
+    def live(self) -> list[Worker]:
+        return [worker for worker in self.workers if worker.alive]
+
+    # Routing
+
+    def worker_for(self, session_id: str, unreachable: Worker | None = None) -> Worker | None:
+        """The session's worker: the one it ran on while alive, otherwise the live worker its id hashes to"""
+        index = self.affinity.get(session_id)
+        if index is not None and self.workers[index].alive and self.workers[index] is not unreachable:
+            self.affinity.move_to_end(session_id)
+            return self.workers[index]
+        live = [worker for worker in self.live() if worker is not unreachable]
+        if not live:
+            return None
+        worker = max(live, key=lambda w: hashlib.blake2b(f"{w.index}:{session_id}".encode(), digest_size=8).digest())
+        if index is not None:
+            REGISTRY.inc("session_handoffs_total")
+        self.remember(session_id, worker)
+        return worker
+
+    def remember(self, session_id: str, worker: Worker) -> None:
+        self.affinity[session_id] = worker.index
+        self.affinity.move_to_end(session_id)
+        while len(self.affinity) > self.affinity_entries:
+            self.affinity.popitem(last=False)
+
+    def least_busy(self) -> Worker | None:
+        return min(self.live(), key=lambda w: w.in_flight, default=None)
+
+    # HTTP
+
+    @staticmethod
+    async def read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, path, _ = request_line.split(" ", 2)
+        headers: dict[str, str] = {}
+        size = 0
+        while line := (await reader.readline()).decode("latin-1").strip():
+            size += len(line)
+            if size > MAX_HEAD_BYTES:
+                raise ValueError("request head too large")
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        return method, path, headers, await reader.readexactly(length) if length else b""
+
+    @staticmethod
+    def encode_request(method: str, path: str, headers: dict[str, str], body: bytes) -> bytes:
+        lines = [f"{method} {path} HTTP/1.1", "Host: 127.0.0.1", "Connection: close", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in headers.items() if name not in HOP_BY_HOP]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    @staticmethod
+    async def connect(worker: Worker) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Raises OSError when the worker is unreachable"""
+        return await asyncio.open_connection("127.0.0.1", worker.port)
+
+    async def relay(
+        self,
+        worker: Worker,
+        upstream: tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        request: bytes,
+        writer: asyncio.StreamWriter,
+        learn_session: bool = False,
+    ) -> None:
+        """Sends the request to the worker and streams its response back"""
+        upstream_reader, upstream_writer = upstream
+        worker.in_flight += 1
+        try:
+            upstream_writer.write(request)
+            await upstream_writer.drain()
+            seen = b""
+            while chunk := await upstream_reader.read(64 * 1024):
+                if learn_session:
+                    seen += chunk
+                    if match := SESSION_ID.search(seen):
+                        self.remember(match.group(1).decode(), worker)
+                        learn_session = False
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            worker.in_flight -= 1
+            upstream_writer.close()
+
+    async def broadcast(self, request: bytes, writer: asyncio.StreamWriter) -> None:
+        """Sends the request to every live worker, answering with the first worker's response"""
+
+        async def send(worker: Worker) -> bytes:
+            reader, upstream = await self.connect(worker)
+            upstream.write(request)
+            await upstream.drain()
+            response = await reader.read()
+            upstream.close()
+            return response
+
+        responses = await asyncio.gather(*(send(worker) for worker in self.live()), return_exceptions=True)
+        first = next((r for r in responses if isinstance(r, bytes)), None)
+        if first is None:
+            raise OSError("no worker reachable")
+        writer.write(first)
+        await writer.drain()
+
+    async def write_json(self, writer: asyncio.StreamWriter, status: HTTPStatus, payload: Any) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(head(status, body) + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, path, headers, body = await self.read_request(reader)
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            await self.write_json(writer, HTTPStatus.BAD_REQUEST, {"error": "malformed request"})
+            writer.close()
+            return
+        try:
+            await self.route(method, path, headers, body, writer)
+        except ConnectionError:
+            pass
+        except Exception as e:
+            logging.exception(e)
+            await self.write_json(writer, HTTPStatus.BAD_GATEWAY, {"error": "worker failed"})
+        finally:
+            writer.close()
+
+    async def route(
+        self, method: str, path: str, headers: dict[str, str], body: bytes, writer: asyncio.StreamWriter
+    ) -> None:
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        request = self.encode_request(method, path, headers, body)
+
+        if not self.accepting:
+            await self.write_json(writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": "server is shutting down"})
+        elif method == "GET" and parts == ["healthz"]:
+            health = {
+                "workers": len(self.workers),
+                "live": len(self.live()),
+                "sessions": len(self.affinity),
+                "in_flight": sum(w.in_flight for w in self.workers),
+            }
+            await self.write_json(writer, HTTPStatus.OK, health)
+        elif method == "POST" and parts == ["webhooks", "calendly"]:
+            await self.broadcast(request, writer)
+        elif len(parts) >= 2 and parts[0] == "sessions":
+            worker = self.worker_for(parts[1])
+            try:
+                upstream = await self.connect(worker) if worker else None
+            except OSError:
+                # Handed off to another worker, the request has not reached the first one
+                logging.warning(f"Worker {worker.index} unreachable, handing off session {parts[1]}")
+                worker = self.worker_for(parts[1], unreachable=worker)
+                upstream = await self.connect(worker) if worker else None
+            if upstream:
+                await self.relay(worker, upstream, request, writer)
+            else:
+                await self.write_json(writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": "no worker available"})
+        elif worker := self.least_busy():
+            learn_session = method == "POST" and parts == ["sessions"]
+            await self.relay(worker, await self.connect(worker), request, writer, learn_session)
+        else:
+            await self.write_json(writer, HTTPStatus.SERVICE_UNAVAILABLE, {"error": "no worker available"})
+
+    # Lifecycle
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.Server:
+        await asyncio.gather(*(self.spawn(worker) for worker in self.workers))
+        self.supervisor = asyncio.create_task(self.supervise())
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """Stops accepting requests, then lets every worker drain its running turns and exit"""
+        self.accepting = False
+        if self.supervisor:
+            self.supervisor.cancel()
+        if self.server:
+            self.server.close()
+        processes = [worker.process for worker in self.workers if worker.process]
+        for process in processes:
+            process.terminate()
+        loop = asyncio.get_running_loop()
+        for process in processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                process.kill()
+
+    def run(self, host: str, port: int) -> None:
+        async def serve() -> None:
+            stop = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop.set)
+            await self.start(host, port)
+            logging.info(f"Serving on http://{host}:{port} with {len(self.workers)} workers")
+            await stop.wait()
+            await self.shutdown()
+
+        asyncio.run(serve())